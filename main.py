@@ -7,9 +7,10 @@
 """
 
 import sys
-import time
+import copy
 import signal
 import asyncio
+import threading
 from pathlib import Path
 
 # 添加src目录到Python路径
@@ -17,11 +18,9 @@ src_path = Path(__file__).parent / 'src'
 sys.path.insert(0, str(src_path))
 
 from config_manager import ConfigManager
-from wechat_monitor import WeChatMonitor
-from web_ui import WebUI
-from onebot_converter import OneBotV11Converter
-from websocket_client import WebSocketClient
-from message_handler import MessageHandler
+
+# 其余组件依赖Flask、websocket-client、wxauto等较重的库，
+# 延迟到initialize_components中再导入，避免插件扫描等场景的启动开销
 
 # AstrBot插件相关导入（如果可用）
 try:
@@ -30,13 +29,26 @@ try:
     ASTRBOT_AVAILABLE = True
 except ImportError:
     ASTRBOT_AVAILABLE = False
-    # 在独立运行模式下，创建一个简单的日志记录器
-    class SimpleLogger:
-        def info(self, msg): print(f"[INFO] {msg}")
-        def error(self, msg): print(f"[ERROR] {msg}")
-        def warning(self, msg): print(f"[WARNING] {msg}")
-        def debug(self, msg): print(f"[DEBUG] {msg}")
-    logger = SimpleLogger()
+    # 在独立运行模式下，使用标准库logging输出到stderr
+    import logging
+    logger = logging.getLogger('wxauto_repost')
+    if not logger.handlers:
+        _handler = logging.StreamHandler()
+        _handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
+        logger.addHandler(_handler)
+        logger.setLevel(logging.INFO)
+
+# 预先绑定常用日志方法，省去调用处的属性查找
+log_info = logger.info
+log_error = logger.error
+log_warning = logger.warning
+log_debug = logger.debug
+
+# 启动/重启时频繁读取的配置路径
+_WS_URL_PATH = ('onebot', 'ws_url')
+_MONITOR_USERS_PATH = ('wechat', 'monitor_users')
+_WEBUI_PORT_PATH = ('webui', 'port')
+_ACCESS_TOKEN_PATH = ('onebot', 'access_token')
 
 class WxAutoOneBotApp:
     """微信消息转发应用主类"""
@@ -57,6 +69,18 @@ class WxAutoOneBotApp:
         
         # 运行状态
         self.is_running = False
+        self._stop_event = threading.Event()
+        
+        # 上次启动服务时使用的相关配置，用于判断重启是否必要
+        self._last_applied = None
+        
+    def _snapshot_service_config(self):
+        """获取影响微信监听器和WebSocket客户端的配置快照"""
+        return {
+            'ws_url': self.config_manager.get_path(_WS_URL_PATH, ''),
+            'access_token': self.config_manager.get_path(_ACCESS_TOKEN_PATH, ''),
+            'monitor_users': copy.deepcopy(self.config_manager.get_path(_MONITOR_USERS_PATH, []))
+        }
         
     def initialize_components(self):
         """初始化所有组件"""
@@ -64,15 +88,19 @@ class WxAutoOneBotApp:
             logger.info("初始化组件...")
             
             # 初始化OneBotV11转换器
+            from onebot_converter import OneBotV11Converter
             self.onebot_converter = OneBotV11Converter(self.config_manager)
             
             # 初始化微信监听器
+            from wechat_monitor import WeChatMonitor
             self.wechat_monitor = WeChatMonitor(self.config_manager)
             
             # 初始化WebSocket客户端
+            from websocket_client import WebSocketClient
             self.websocket_client = WebSocketClient(self.config_manager, self.onebot_converter)
             
             # 初始化消息处理器
+            from message_handler import MessageHandler
             self.message_handler = MessageHandler(
                 self.config_manager,
                 self.wechat_monitor,
@@ -81,6 +109,7 @@ class WxAutoOneBotApp:
             )
             
             # 初始化Web UI
+            from web_ui import WebUI
             self.web_ui = WebUI(
                 self.config_manager,
                 self.wechat_monitor,
@@ -96,59 +125,62 @@ class WxAutoOneBotApp:
             return True
             
         except Exception as e:
-            logger.error(f"初始化组件失败: {e}")
+            logger.error("初始化组件失败: %s", e)
             return False
         
     def start(self):
         """启动应用"""
         try:
-            logger.info("🚀 启动微信消息转发框架...")
+            log_info("🚀 启动微信消息转发框架...")
             
             # 初始化组件
             if not self.initialize_components():
                 return False
                 
             self.is_running = True
+            self._last_applied = self._snapshot_service_config()
             
             # 启动消息处理器
             if self.message_handler:
                 self.message_handler.start()
                 
             # 启动WebSocket客户端（如果配置了地址）
-            ws_url = self.config_manager.get('onebot.ws_url', '')
+            ws_url = self.config_manager.get_path(_WS_URL_PATH, '')
             if ws_url and self.websocket_client:
-                logger.info(f"🔗 启动WebSocket客户端: {ws_url}")
+                log_info("🔗 启动WebSocket客户端: %s", ws_url)
                 self.websocket_client.start()
             else:
-                logger.warning("⚠️  未配置WebSocket地址，跳过客户端启动")
+                log_warning("⚠️  未配置WebSocket地址，跳过客户端启动")
                 
             # 启动微信监听器（如果有监听用户）
-            monitored_users = self.config_manager.get('wechat.monitor_users', [])
+            monitored_users = self.config_manager.get_path(_MONITOR_USERS_PATH, [])
             if monitored_users and self.wechat_monitor:
-                logger.info(f"👂 启动微信监听器，监听用户: {[user.get('nickname') if isinstance(user, dict) else user for user in monitored_users]}")
+                names = ', '.join(user['nickname'] for user in monitored_users)
+                log_info("👂 启动微信监听器，监听用户: [%s]", names)
                 self.wechat_monitor.start()
             else:
-                logger.warning("⚠️  未配置监听用户，跳过监听器启动")
+                log_warning("⚠️  未配置监听用户，跳过监听器启动")
                 
             # 启动Web UI（最后启动，避免输出被覆盖）
             if self.web_ui:
-                web_port = self.config_manager.get('webui.port', 10001)
-                logger.info(f"🌐 启动Web UI，端口: {web_port}")
-                logger.info("📝 注意：Web UI启动后，日志输出可能会被Flask覆盖")
+                web_port = self.config_manager.get_path(_WEBUI_PORT_PATH, 10001)
+                log_info("🌐 启动Web UI，端口: %s", web_port)
+                log_info("📝 注意：Web UI启动后，日志输出可能会被Flask覆盖")
                 self.web_ui.start()
                 
             return True
             
         except Exception as e:
-            logger.error(f"❌ 启动应用失败: {e}")
+            log_error("❌ 启动应用失败: %s", e)
             return False
             
     def stop(self):
         """停止应用"""
         try:
-            logger.info("🛑 停止微信消息转发框架...")
+            log_info("🛑 停止微信消息转发框架...")
             
             self.is_running = False
+            self._stop_event.set()
             
             # 停止各个组件
             if self.wechat_monitor:
@@ -163,38 +195,49 @@ class WxAutoOneBotApp:
             if self.web_ui:
                 self.web_ui.stop()
             
-            logger.info("✅ 应用已停止")
+            log_info("✅ 应用已停止")
             
         except Exception as e:
-            logger.error(f"❌ 停止应用失败: {e}")
+            log_error("❌ 停止应用失败: %s", e)
             
     def restart_services(self):
-        """重启服务（配置更新后）"""
+        """重启服务（配置更新后）
+        
+        只重启相关配置发生变化的组件
+        """
         try:
-            logger.info("重启服务...")
+            current = self._snapshot_service_config()
+            last = self._last_applied or {}
             
-            # 停止相关服务
-            if self.wechat_monitor:
+            restart_ws = (current['ws_url'] != last.get('ws_url') or
+                          current['access_token'] != last.get('access_token'))
+            restart_wechat = current['monitor_users'] != last.get('monitor_users')
+            
+            if not restart_ws and not restart_wechat:
+                log_info("相关配置未变化，跳过服务重启")
+                return
+                
+            log_info("重启服务...")
+            
+            # 停止相关服务（stop()内部会等待各自的后台线程结束）
+            if restart_wechat and self.wechat_monitor:
                 self.wechat_monitor.stop()
                 
-            if self.websocket_client:
+            if restart_ws and self.websocket_client:
                 self.websocket_client.stop()
                 
-            time.sleep(2)  # 等待服务完全停止
-            
             # 重新启动服务
-            ws_url = self.config_manager.get('onebot.ws_url', '')
-            if ws_url and self.websocket_client:
+            if restart_ws and current['ws_url'] and self.websocket_client:
                 self.websocket_client.start()
                 
-            monitored_users = self.config_manager.get('wechat.monitor_users', [])
-            if monitored_users and self.wechat_monitor:
+            if restart_wechat and current['monitor_users'] and self.wechat_monitor:
                 self.wechat_monitor.start()
                 
-            logger.info("服务重启完成")
+            self._last_applied = current
+            log_info("服务重启完成")
             
         except Exception as e:
-            logger.error(f"重启服务失败: {e}")
+            log_error("重启服务失败: %s", e)
             
     def get_status(self):
         """获取应用状态"""
@@ -208,7 +251,9 @@ class WxAutoOneBotApp:
             
     def signal_handler(self, signum, frame):
         """信号处理器"""
-        logger.info(f"\n收到信号 {signum}，正在停止应用...")
+        logger.info("\n收到信号 %s，正在停止应用...", signum)
+        self.is_running = False
+        self._stop_event.set()
         self.stop()
         sys.exit(0)
 
@@ -221,6 +266,7 @@ if ASTRBOT_AVAILABLE:
         def __init__(self, context: Context):
             super().__init__(context)
             self.app = None
+            self._start_task = None
             logger.info("微信消息转发框架插件已加载")
             
         async def initialize(self):
@@ -238,17 +284,15 @@ if ASTRBOT_AVAILABLE:
                         else:
                             logger.error("❌ 微信消息转发框架启动失败")
                     except Exception as e:
-                        logger.error(f"微信消息转发框架启动异常: {e}")
+                        logger.error("微信消息转发框架启动异常: %s", e)
                 
-                # 使用线程池在后台启动，避免阻塞
-                import threading
-                start_thread = threading.Thread(target=start_app, daemon=True)
-                start_thread.start()
+                # 使用事件循环默认线程池在后台启动，避免阻塞；保留任务引用防止被回收
+                self._start_task = asyncio.create_task(asyncio.to_thread(start_app))
                 
                 logger.info("微信消息转发框架正在后台启动...")
                     
             except Exception as e:
-                logger.error(f"微信消息转发框架初始化失败: {e}")
+                logger.error("微信消息转发框架初始化失败: %s", e)
                 
         async def terminate(self):
             """插件卸载时调用"""
@@ -285,9 +329,10 @@ def main():
             logger.info("  3️⃣  启动微信监听和WebSocket连接")
             logger.info("  4️⃣  框架将自动转发消息")
             
-            # 保持应用运行
-            while app.is_running:
-                time.sleep(1)
+            # 保持应用运行，直到stop()或信号处理器设置停止事件
+            # Windows下无超时的wait()无法被Ctrl+C打断，需分段等待让主线程有机会处理信号
+            while not app._stop_event.wait(1.0):
+                pass
         else:
             logger.error("❌ 应用启动失败")
             sys.exit(1)
@@ -296,7 +341,7 @@ def main():
         logger.info("\n⏹️  用户中断，正在停止应用...")
         app.stop()
     except Exception as e:
-        logger.error(f"❌ 应用运行异常: {e}")
+        logger.error("❌ 应用运行异常: %s", e)
         app.stop()
         sys.exit(1)
 
@@ -5,23 +5,71 @@
 负责配置文件的读取、写入和管理
 """
 
+import copy
+import hashlib
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 import threading
 
 # 尝试导入AstrBot日志记录器
 try:
     from astrbot.api import logger
 except ImportError:
-    # 在独立运行模式下，创建一个简单的日志记录器
-    class SimpleLogger:
-        def info(self, msg): print(f"[INFO] {msg}")
-        def error(self, msg): print(f"[ERROR] {msg}")
-        def warning(self, msg): print(f"[WARNING] {msg}")
-        def debug(self, msg): print(f"[DEBUG] {msg}")
-    logger = SimpleLogger()
+    # 在独立运行模式下，使用标准库logging输出到stderr
+    import logging
+    logger = logging.getLogger('wxauto_repost')
+    if not logger.handlers:
+        _handler = logging.StreamHandler()
+        _handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
+        logger.addHandler(_handler)
+        logger.setLevel(logging.INFO)
+
+# orjson为可选依赖，未安装时回退到标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 默认配置（只读模板，使用时通过 copy.deepcopy 获取副本）
+DEFAULT_CONFIG = {
+    "webui": {
+        "host": "0.0.0.0",
+        "port": 10001,
+        "debug": False
+    },
+    "wechat": {
+        "enabled": False,
+        "monitor_users": [],  # 监听的用户昵称列表
+        "check_interval": 1.0,  # 检查消息间隔(秒)
+        "worker_threads": 1,  # 消息处理线程数，大于1时消息转发顺序不再有保证
+        "auto_reply": False  # 是否自动回复
+    },
+    "onebot": {
+        "enabled": False,
+        "ws_url": "ws://localhost:10001/ws",  # 反向WebSocket地址
+        "access_token": "",  # 访问令牌
+        "reconnect_interval": 5,  # 重连间隔(秒)，每次重连的最短等待时间，之后按指数退避递增至60秒
+        "heartbeat_interval": 30,  # 心跳间隔(秒)
+        "self_id": "wxauto_bot"  # 机器人ID
+    },
+    "message": {
+        "max_length": 4096,  # 最大消息长度
+        "enable_image": True,  # 启用图片消息
+        "enable_file": True,  # 启用文件消息
+        "enable_voice": False,  # 启用语音消息
+        "image_cache_dir": "cache/images",  # 图片缓存目录
+        "file_cache_dir": "cache/files"  # 文件缓存目录
+    },
+    "logging": {
+        "level": "INFO",
+        "file": "logs/app.log",
+        "max_size": "10MB",
+        "backup_count": 5
+    }
+}
 
 class ConfigManager:
     """配置管理器"""
@@ -40,95 +88,124 @@ class ConfigManager:
             config_file = config_dir / "config.json"
             
         self.config_file = Path(config_file)
-        self.config_data = {}
         self._lock = threading.Lock()
+        # 串行化配置文件写入，与保护内存配置的锁分开
+        self._io_lock = threading.Lock()
+        
+        # 配置版本号，配置变化时递增，派生缓存据此失效
+        self._version = 0
+        # 点号键 -> 路径元组。只缓存键的拆分结果，值每次沿路径从当前配置读取，
+        # 调用方原地修改了get()返回的嵌套字典时也不会读到旧值
+        self._split_cache: Dict[str, Tuple[str, ...]] = {}
         
-        # 默认配置
-        self.default_config = {
-            "webui": {
-                "host": "0.0.0.0",
-                "port": 10001,
-                "debug": False
-            },
-            "wechat": {
-                "enabled": False,
-                "monitor_users": [],  # 监听的用户昵称列表
-                "check_interval": 1.0,  # 检查消息间隔(秒)
-                "auto_reply": False  # 是否自动回复
-            },
-            "onebot": {
-                "enabled": False,
-                "ws_url": "ws://localhost:10001/ws",  # 反向WebSocket地址
-                "access_token": "",  # 访问令牌
-                "reconnect_interval": 5,  # 重连间隔(秒)
-                "heartbeat_interval": 30,  # 心跳间隔(秒)
-                "self_id": "wxauto_bot"  # 机器人ID
-            },
-            "message": {
-                "max_length": 4096,  # 最大消息长度
-                "enable_image": True,  # 启用图片消息
-                "enable_file": True,  # 启用文件消息
-                "enable_voice": False,  # 启用语音消息
-                "image_cache_dir": "cache/images",  # 图片缓存目录
-                "file_cache_dir": "cache/files"  # 文件缓存目录
-            },
-            "logging": {
-                "level": "INFO",
-                "file": "logs/app.log",
-                "max_size": "10MB",
-                "backup_count": 5
-            }
-        }
+        # 监听用户昵称 -> 列表下标索引，按需重建
+        self._monitor_index: Optional[Dict[str, int]] = None
+        # (版本号, 序列化结果)
+        self._json_cache: Optional[Tuple[int, bytes]] = None
+        self.config_data = {}
+        
+        # 上次写入磁盘内容的摘要，内容未变化时跳过写文件
+        self._last_saved_hash: Optional[bytes] = None
+        # 已写入磁盘的配置版本号，较旧的快照不会覆盖较新的文件
+        self._saved_version = -1
         
         # 加载配置文件
         self.load_config()
         
+    @property
+    def config_data(self) -> Dict[str, Any]:
+        """当前配置字典"""
+        return self._config_data
+        
+    @config_data.setter
+    def config_data(self, value: Dict[str, Any]):
+        # 整体替换配置时同样需要使查询缓存失效
+        self._config_data = value
+        self._invalidate()
+        
+    @property
+    def version(self) -> int:
+        """配置版本号，配置每次变化后递增，可用于判断派生缓存是否过期"""
+        return self._version
+        
+    def _invalidate(self):
+        """使点号键查询缓存和监听用户索引失效"""
+        self._version += 1
+        self._monitor_index = None
+        
     def load_config(self) -> Dict[str, Any]:
         """加载配置文件
         
         Returns:
             配置字典
         """
-        with self._lock:
-            try:
-                if self.config_file.exists():
-                    with open(self.config_file, 'r', encoding='utf-8') as f:
-                        loaded_config = json.load(f)
-                    
-                    # 合并默认配置和加载的配置
-                    self.config_data = self._merge_config(self.default_config, loaded_config)
-                else:
-                    # 如果配置文件不存在，使用默认配置
-                    self.config_data = self.default_config.copy()
-                    self.save_config()
-                    
-                return self.config_data.copy()
+        try:
+            # 在锁外读取文件，只在替换配置时持有锁
+            if self.config_file.exists():
+                with open(self.config_file, 'rb') as f:
+                    raw = f.read()
+                loaded_config = orjson.loads(raw) if orjson else json.loads(raw.decode('utf-8'))
                 
-            except Exception as e:
-                logger.error(f"加载配置文件失败: {e}")
-                self.config_data = self.default_config.copy()
-                return self.config_data.copy()
+                # 合并默认配置和加载的配置
+                with self._lock:
+                    self.config_data = self._merge_config(copy.deepcopy(DEFAULT_CONFIG), loaded_config)
+                    self._normalize_monitor_users()
+            else:
+                # 如果配置文件不存在，使用默认配置
+                with self._lock:
+                    self.config_data = copy.deepcopy(DEFAULT_CONFIG)
+                self.save_config()
                 
+            return self.config_data.copy()
+            
+        except Exception as e:
+            logger.error("加载配置文件失败: %s", e)
+            with self._lock:
+                self.config_data = copy.deepcopy(DEFAULT_CONFIG)
+            return self.config_data.copy()
+            
     def save_config(self) -> bool:
         """保存配置到文件
         
         Returns:
             是否保存成功
         """
-        with self._lock:
-            try:
+        try:
+            # 锁内只做序列化并记录对应的版本号，磁盘I/O在锁外进行
+            with self._lock:
+                version = self._version
+                if orjson:
+                    data = orjson.dumps(self.config_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+                else:
+                    data = json.dumps(self.config_data, ensure_ascii=False, indent=2).encode('utf-8')
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            
+            with self._io_lock:
+                # 多个保存者并发时，序列化较早的快照可能后拿到写锁，此时文件已是更新版本的内容。
+                # 同版本的快照仍按摘要判断，原地修改配置而未改变版本号时不会漏写
+                if version < self._saved_version and self.config_file.exists():
+                    return True
+                if digest == self._last_saved_hash and self.config_file.exists():
+                    self._saved_version = version
+                    return True  # 内容未变化
+                
                 # 确保配置目录存在
                 self.config_file.parent.mkdir(parents=True, exist_ok=True)
                 
-                with open(self.config_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.config_data, f, ensure_ascii=False, indent=2)
-                    
-                return True
-                
-            except Exception as e:
-                logger.error(f"保存配置文件失败: {e}")
-                return False
+                # 先写临时文件再替换，避免写入中途被读取到不完整的配置
+                tmp_file = self.config_file.with_suffix('.json.tmp')
+                with open(tmp_file, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_file, self.config_file)
                 
+                self._last_saved_hash = digest
+                self._saved_version = version
+            return True
+            
+        except Exception as e:
+            logger.error("保存配置文件失败: %s", e)
+            return False
+            
     def get(self, key: str, default: Any = None) -> Any:
         """获取配置值
         
@@ -139,11 +216,25 @@ class ConfigManager:
         Returns:
             配置值
         """
-        keys = key.split('.')
+        path = self._split_cache.get(key)
+        if path is None:
+            path = self._split_cache.setdefault(key, tuple(key.split('.')))
+        return self.get_path(path, default)
+        
+    def get_path(self, path: Tuple[str, ...], default: Any = None) -> Any:
+        """按预先拆分好的路径元组获取配置值
+        
+        Args:
+            path: 路径元组，如 ('onebot', 'ws_url')
+            default: 默认值
+            
+        Returns:
+            配置值
+        """
         value = self.config_data
         
         try:
-            for k in keys:
+            for k in path:
                 value = value[k]
             return value
         except (KeyError, TypeError):
@@ -172,10 +263,11 @@ class ConfigManager:
                     
                 # 设置值
                 config[keys[-1]] = value
+                self._invalidate()
                 return True
                 
             except Exception as e:
-                logger.error(f"设置配置值失败: {e}")
+                logger.error("设置配置值失败: %s", e)
                 return False
                 
     def update(self, updates: Dict[str, Any]) -> bool:
@@ -189,19 +281,52 @@ class ConfigManager:
         """
         with self._lock:
             try:
-                self.config_data = self._merge_config(self.config_data, updates)
+                # 直接在现有配置上合并，避免每次更新都重建整棵配置树
+                self._merge_config_inplace(self.config_data, updates)
+                self._normalize_monitor_users()
+                self._invalidate()
                 return True
             except Exception as e:
-                logger.error(f"批量更新配置失败: {e}")
+                logger.error("批量更新配置失败: %s", e)
                 return False
                 
     def get_all(self) -> Dict[str, Any]:
         """获取所有配置
         
         Returns:
-            配置字典的副本
+            配置字典的深拷贝，调用方可自由修改
+        """
+        with self._lock:
+            return copy.deepcopy(self.config_data)
+            
+    def get_all_view(self) -> Mapping[str, Any]:
+        """获取配置的只读视图（不复制）
+        
+        Returns:
+            配置字典的只读映射
+        """
+        return MappingProxyType(self.config_data)
+        
+    def get_all_json_bytes(self) -> bytes:
+        """获取序列化后的整份配置
+        
+        结果按配置版本号缓存，配置未变化时直接复用
+        
+        Returns:
+            UTF-8编码的JSON字节串
         """
-        return self.config_data.copy()
+        cached = self._json_cache
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+            
+        with self._lock:
+            version = self._version
+            if orjson:
+                data = orjson.dumps(self.config_data, option=orjson.OPT_NON_STR_KEYS)
+            else:
+                data = json.dumps(self.config_data, ensure_ascii=False).encode('utf-8')
+        self._json_cache = (version, data)
+        return data
         
     def reset_to_default(self) -> bool:
         """重置为默认配置
@@ -209,14 +334,43 @@ class ConfigManager:
         Returns:
             是否重置成功
         """
-        with self._lock:
-            try:
-                self.config_data = self.default_config.copy()
-                return self.save_config()
-            except Exception as e:
-                logger.error(f"重置配置失败: {e}")
-                return False
+        try:
+            with self._lock:
+                self.config_data = copy.deepcopy(DEFAULT_CONFIG)
+            return self.save_config()
+        except Exception as e:
+            logger.error("重置配置失败: %s", e)
+            return False
                 
+    def _normalize_monitor_users(self):
+        """将旧格式的字符串监听用户统一转换为字典格式
+
+        统一为 {'nickname': ..., 'user_id': ...} 后，各处无需再区分两种格式
+        """
+        wechat = self.config_data.get('wechat')
+        if not isinstance(wechat, dict):
+            return
+        monitor_users = wechat.get('monitor_users')
+        if not isinstance(monitor_users, list):
+            return
+        for i, user in enumerate(monitor_users):
+            if isinstance(user, str):
+                monitor_users[i] = {'nickname': user}
+                
+    def _rebuild_monitor_index(self) -> Dict[str, int]:
+        """重建监听用户昵称索引
+        
+        Returns:
+            昵称到列表下标的映射
+        """
+        index = {}
+        for i, user in enumerate(self.get('wechat.monitor_users', [])):
+            nickname = user.get('nickname')
+            # 保留第一次出现的位置，与原先的线性查找行为一致
+            index.setdefault(nickname, i)
+        self._monitor_index = index
+        return index
+        
     def add_monitor_user(self, user_data) -> bool:
         """添加监听用户
         
@@ -226,27 +380,27 @@ class ConfigManager:
         Returns:
             是否添加成功
         """
-        monitor_users = self.get('wechat.monitor_users', [])
-        
-        # 检查是否已存在
+        # 统一存储为字典格式
         if isinstance(user_data, str):
-            # 字符串格式
-            if user_data not in monitor_users:
-                monitor_users.append(user_data)
-                return self.set('wechat.monitor_users', monitor_users)
-        else:
-            # 字典格式
-            nickname = user_data.get('nickname')
-            # 检查是否已存在相同昵称的用户
-            for user in monitor_users:
-                if isinstance(user, dict) and user.get('nickname') == nickname:
-                    return True  # 已存在
-                elif isinstance(user, str) and user == nickname:
-                    return True  # 已存在
+            user_data = {'nickname': user_data}
             
-            monitor_users.append(user_data)
-            return self.set('wechat.monitor_users', monitor_users)
+        monitor_users = self.get('wechat.monitor_users', [])
+        index = self._monitor_index
+        if index is None:
+            index = self._rebuild_monitor_index()
         
+        # 检查是否已存在相同昵称的用户
+        nickname = user_data.get('nickname')
+        if nickname in index:
+            return True  # 已存在
+            
+        monitor_users.append(user_data)
+        index[nickname] = len(monitor_users) - 1
+        if not self.set('wechat.monitor_users', monitor_users):
+            return False
+            
+        # set() 会使索引失效，这里新索引已包含新增用户，直接复用
+        self._monitor_index = index
         return True
         
     def remove_monitor_user(self, username: str) -> bool:
@@ -258,24 +412,24 @@ class ConfigManager:
         Returns:
             是否移除成功
         """
+        index = self._monitor_index
+        if index is None:
+            index = self._rebuild_monitor_index()
+            
+        idx = index.get(username)
+        if idx is None:
+            return False  # 未找到匹配的用户
+            
         monitor_users = self.get('wechat.monitor_users', [])
-        
-        # 查找并移除匹配的用户
-        for i, user in enumerate(monitor_users):
-            if isinstance(user, str) and user == username:
-                monitor_users.pop(i)
-                return self.set('wechat.monitor_users', monitor_users)
-            elif isinstance(user, dict) and user.get('nickname') == username:
-                monitor_users.pop(i)
-                return self.set('wechat.monitor_users', monitor_users)
-        
-        return False  # 未找到匹配的用户
+        monitor_users.pop(idx)
+        # 后续下标已变化，索引在 set() 中失效并于下次使用时重建
+        return self.set('wechat.monitor_users', monitor_users)
         
     def get_monitor_users(self) -> List:
         """获取监听用户列表
         
         Returns:
-            用户列表，可能包含字符串（昵称）或字典（包含nickname和user_id）
+            用户列表，每项为包含nickname（及可选user_id）的字典
         """
         return self.get('wechat.monitor_users', [])
         
@@ -299,28 +453,67 @@ class ConfigManager:
                 
         return result
         
-    def validate_config(self) -> List[str]:
+    def _merge_config_inplace(self, base: Dict[str, Any], updates: Dict[str, Any]):
+        """递归地将更新配置原地合并到基础配置中
+        
+        Args:
+            base: 基础配置（会被直接修改）
+            updates: 更新配置
+        """
+        for key, value in updates.items():
+            current = base.get(key)
+            if isinstance(current, dict) and isinstance(value, dict):
+                self._merge_config_inplace(current, value)
+            else:
+                base[key] = value
+                
+    def validate(self, updates: Dict[str, Any]) -> List[str]:
+        """验证将updates合并到当前配置后的结果，不修改当前配置
+        
+        Args:
+            updates: 待验证的配置更新
+            
+        Returns:
+            错误信息列表，空列表表示配置有效
+        """
+        # _merge_config只复制更新路径上的字典，未改动的部分与当前配置共享（只读）
+        with self._lock:
+            candidate = self._merge_config(self.config_data, updates)
+        return self.validate_config(candidate)
+        
+    def validate_config(self, config: Optional[Dict[str, Any]] = None) -> List[str]:
         """验证配置的有效性
         
+        Args:
+            config: 要验证的配置字典，默认为当前配置
+            
         Returns:
             错误信息列表，空列表表示配置有效
         """
         errors = []
         
+        # 一次性取出各配置段，避免逐项按点号键查找
+        cfg = self.config_data if config is None else config
+        webui = cfg.get('webui')
+        onebot = cfg.get('onebot')
+        wechat = cfg.get('wechat')
+        webui = webui if isinstance(webui, dict) else {}
+        onebot = onebot if isinstance(onebot, dict) else {}
+        wechat = wechat if isinstance(wechat, dict) else {}
+        
         # 验证WebUI配置
-        port = self.get('webui.port')
+        port = webui.get('port')
         if not isinstance(port, int) or port < 1 or port > 65535:
             errors.append("WebUI端口必须是1-65535之间的整数")
             
         # 验证OneBot配置
-        if self.get('onebot.enabled'):
-            ws_url = self.get('onebot.ws_url')
-            if not ws_url or not ws_url.startswith(('ws://', 'wss://')):
+        if onebot.get('enabled'):
+            ws_url = onebot.get('ws_url')
+            if not isinstance(ws_url, str) or not ws_url.startswith(('ws://', 'wss://')):
                 errors.append("OneBot WebSocket地址格式不正确")
                 
         # 验证监听用户
-        monitor_users = self.get('wechat.monitor_users', [])
-        if not isinstance(monitor_users, list):
+        if not isinstance(wechat.get('monitor_users', []), list):
             errors.append("监听用户列表格式不正确")
             
-        return errors
\ No newline at end of file
+        return errors
@@ -5,26 +5,45 @@
 负责处理从后端接收到的消息并发送给对应的微信用户
 """
 
-import json
+import os
+import re
+import shutil
+import hashlib
 import time
 import threading
+import itertools
 from typing import Dict, Any, List, Optional
 from pathlib import Path
-import base64
+from urllib.parse import unquote
 import requests
-from queue import Queue, Empty
+from requests.adapters import HTTPAdapter
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # 尝试导入AstrBot日志记录器
 try:
     from astrbot.api import logger
 except ImportError:
-    # 在独立运行模式下，创建一个简单的日志记录器
-    class SimpleLogger:
-        def info(self, msg): print(f"[INFO] {msg}")
-        def error(self, msg): print(f"[ERROR] {msg}")
-        def warning(self, msg): print(f"[WARNING] {msg}")
-        def debug(self, msg): print(f"[DEBUG] {msg}")
-    logger = SimpleLogger()
+    # 在独立运行模式下，使用标准库logging输出到stderr
+    import logging
+    logger = logging.getLogger('wxauto_repost')
+    if not logger.handlers:
+        _handler = logging.StreamHandler()
+        _handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
+        logger.addHandler(_handler)
+        logger.setLevel(logging.INFO)
+
+# CQ码正则表达式，如 [CQ:image,file=xxx]
+_CQ_RE = re.compile(r'\[CQ:([^,\]]+)(?:,([^\]]+))?\]')
+
+# Content-Length不超过该值时预分配缓冲区一次读入，更大的文件仍流式写盘
+_PREALLOC_MAX = 8 * 1024 * 1024
+
+# Windows文件名中不允许出现的字符
+_UNSAFE_FILENAME_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+# 每次下载独立的子目录名：URL摘要_序号
+_DOWNLOAD_DIR_RE = re.compile(r'^[0-9a-f]{16}_\d+$')
 
 class MessageHandler:
     """消息回复处理器"""
@@ -43,22 +62,56 @@ class MessageHandler:
         self.onebot_converter = onebot_converter
         self.websocket_client = websocket_client
         
-        # 消息处理队列
-        self.message_queue = Queue()
+        # 消息处理队列（deque + Condition，比queue.Queue的锁开销更小）
+        self.message_queue = deque()
+        self._queue_cond = threading.Condition()
+        self.batch_size = 64  # 每次从队列取出的最大消息数
+        
+        # 登录信息不随请求变化，构造一次后复用
+        self._login_info = {
+            "user_id": onebot_converter.self_id,
+            "nickname": "WxAuto Bot"
+        }
         
         # 处理线程
         self.handler_thread = None
         self.is_running = False
         
         # 消息缓存（用于去重和追踪）
-        self.sent_messages = {}  # message_id -> timestamp
+        self.sent_messages = OrderedDict()  # message_id -> timestamp，按发送时间排序
+        self._sent_max = 10000  # 最多保留的消息记录数
         self.cache_cleanup_interval = 300  # 5分钟清理一次缓存
-        self.last_cleanup = time.time()
+        self.last_cleanup = time.monotonic()  # 单调时钟，不受系统时间调整影响
         
-        # 文件下载缓存目录
-        project_root = Path(__file__).parent.parent
-        self.download_cache_dir = project_root / self.config_manager.get('message.file_cache_dir', 'cache/downloads')
-        self.download_cache_dir.mkdir(parents=True, exist_ok=True)
+        # 发送去重：短时间内重复的发送请求直接返回上次的message_id
+        self._send_dedupe = OrderedDict()  # key -> (发送时间, message_id)，按发送时间排序
+        self._send_dedupe_max = 512
+        self._send_dedupe_ttl = 5.0
+        
+        # 配置快照（监听用户查找表、下载缓存目录），配置版本变化时重建
+        self._config_version = None
+        self._monitored_nicknames = frozenset()
+        self._id_to_nick = {}
+        self.download_cache_dir = None
+        self._rebuild_from_config()
+        
+        # 复用HTTP连接，避免每次下载都重新建立TCP/TLS连接
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self._http.mount('http://', adapter)
+        self._http.mount('https://', adapter)
+        
+        # 下载线程池（start时创建），以及按URL合并的进行中下载任务
+        self._dl_pool: Optional[ThreadPoolExecutor] = None
+        self._dl_inflight: Dict[str, Future] = {}
+        self._dl_lock = threading.Lock()
+        self._file_seq = itertools.count()  # 下载子目录的序号，next()在GIL下是原子的
+        self._download_ttl = 3600  # 下载的文件保留1小时，之后由_cleanup_cache删除
+        
+        # 用户映射变更后延迟保存配置，合并短时间内的多次写入
+        self._save_delay = 0.5
+        self._save_timer: Optional[threading.Timer] = None
+        self._save_lock = threading.Lock()
         
     def start(self) -> bool:
         """启动消息处理器
@@ -71,6 +124,13 @@ class MessageHandler:
             
             self.is_running = True
             
+            # 创建下载线程池
+            if self._dl_pool is None:
+                self._dl_pool = ThreadPoolExecutor(
+                    max_workers=self.config_manager.get('message.download_workers', 8),
+                    thread_name_prefix='dl'
+                )
+            
             # 启动处理线程
             self.handler_thread = threading.Thread(target=self._message_handler_loop, daemon=True)
             self.handler_thread.start()
@@ -85,7 +145,7 @@ class MessageHandler:
             return True
             
         except Exception as e:
-            logger.error(f"启动消息处理器失败: {e}")
+            logger.error("启动消息处理器失败: %s", e)
             return False
             
     def stop(self):
@@ -94,10 +154,23 @@ class MessageHandler:
         
         self.is_running = False
         
+        # 唤醒正在等待消息的处理线程
+        with self._queue_cond:
+            self._queue_cond.notify_all()
+        
         # 等待处理线程结束
         if self.handler_thread and self.handler_thread.is_alive():
             self.handler_thread.join(timeout=2)
             
+        # 关闭下载线程池并释放HTTP连接池
+        if self._dl_pool:
+            self._dl_pool.shutdown(wait=False)
+            self._dl_pool = None
+        self._http.close()
+        
+        # 写入尚未保存的配置变更
+        self._flush_save()
+            
     def handle_wechat_message(self, wechat_msg: Dict[str, Any]):
         """处理微信消息（转发到后端）
         
@@ -105,40 +178,26 @@ class MessageHandler:
             wechat_msg: 微信消息
         """
         try:
-            logger.info(f"🔄 处理消息: {wechat_msg.get('user_name', 'unknown')} [{wechat_msg.get('message_type', 'text')}]")
+            logger.debug("🔄 处理消息: %s [%s]", wechat_msg.get('user_name', 'unknown'), wechat_msg.get('message_type', 'text'))
             
             # 检查是否是监听的用户
             user_name = wechat_msg.get('user_name', '')
-            monitored_users = self.config_manager.get('wechat.monitor_users', [])
+            self._ensure_config_snapshot()
             
-            # 支持两种格式：字符串列表和对象列表
-            is_monitored = False
-            for user in monitored_users:
-                if isinstance(user, str):
-                    # 字符串格式
-                    if user == user_name:
-                        is_monitored = True
-                        break
-                elif isinstance(user, dict):
-                    # 对象格式
-                    if user.get('nickname') == user_name:
-                        is_monitored = True
-                        break
-            
-            if not is_monitored:
-                print(f"⚠️  用户 {user_name} 不在监听列表，忽略消息")
+            if user_name not in self._monitored_nicknames:
+                logger.debug("⚠️  用户 %s 不在监听列表，忽略消息", user_name)
                 return
                 
             # 发送到WebSocket后端
             success = self.websocket_client.send_wechat_message(wechat_msg)
             
             if success:
-                print(f"✅ 消息已转发: {user_name}")
+                logger.debug("✅ 消息已转发: %s", user_name)
             else:
-                print(f"❌ 转发失败: {user_name}")
+                logger.warning("❌ 转发失败: %s", user_name)
                 
         except Exception as e:
-            print(f"❌ 处理微信消息失败: {e}")
+            logger.error("❌ 处理微信消息失败: %s", e)
             
     def _on_websocket_message(self, message: Dict[str, Any]):
         """WebSocket消息回调
@@ -148,39 +207,68 @@ class MessageHandler:
         """
         try:
             # 将消息加入处理队列
-            self.message_queue.put(message)
+            with self._queue_cond:
+                self.message_queue.append(message)
+                self._queue_cond.notify()
             
         except Exception as e:
-            print(f"WebSocket消息回调失败: {e}")
+            logger.error("WebSocket消息回调失败: %s", e)
             
     def _on_websocket_connect(self):
         """WebSocket连接回调"""
-        print("🔗 WebSocket已连接，消息处理器就绪")
+        logger.info("🔗 WebSocket已连接，消息处理器就绪")
         
     def _on_websocket_disconnect(self):
         """WebSocket断开连接回调"""
-        print("🔌 WebSocket连接断开，消息处理器暂停")
+        logger.info("🔌 WebSocket连接断开，消息处理器暂停")
         
     def _message_handler_loop(self):
         """消息处理循环"""
+        # 缓存清理按截止时间调度，而不是每秒轮询一次
+        next_cleanup = self.last_cleanup + self.cache_cleanup_interval
+        
+        # 循环内反复使用的属性和方法提前绑定为局部变量
+        monotonic = time.monotonic
+        queue = self.message_queue
+        popleft = queue.popleft
+        cond = self._queue_cond
+        batch_size = self.batch_size
+        process = self._process_message
+        prefetch = self._prefetch_batch
+        cleanup = self._cleanup_cache
+        inflight = self._dl_inflight
+        dl_lock = self._dl_lock
+        
         while self.is_running:
             try:
-                # 获取待处理的消息
-                try:
-                    message = self.message_queue.get(timeout=1)
-                except Empty:
+                timeout = next_cleanup - monotonic()
+                if timeout <= 0:
                     # 定期清理缓存
-                    self._cleanup_cache()
+                    cleanup()
+                    next_cleanup = monotonic() + self.cache_cleanup_interval
                     continue
                     
+                # 获取待处理的消息，一次取出当前积压的一批
+                with cond:
+                    if not queue and self.is_running:
+                        cond.wait(timeout)
+                    batch = [popleft() for _ in range(min(len(queue), batch_size))]
+                    
+                # 先为整批消息提交附件下载，后续消息的下载与前面消息的发送重叠进行
+                if len(batch) > 1:
+                    prefetch(batch)
+                    
                 # 处理消息
-                self._process_message(message)
-                
-                # 标记任务完成
-                self.message_queue.task_done()
+                try:
+                    for message in batch:
+                        process(message)
+                finally:
+                    # 下载任务只在本批次内复用
+                    with dl_lock:
+                        inflight.clear()
                 
             except Exception as e:
-                print(f"❌ 消息处理循环异常: {e}")
+                logger.error("❌ 消息处理循环异常: %s", e)
                 time.sleep(1)
                 
     def _process_message(self, message: Dict[str, Any]):
@@ -196,7 +284,7 @@ class MessageHandler:
                 self._handle_api_request(message)
             elif message.get('post_type') == 'message':
                 # 消息事件（通常不会收到，因为这是我们发送的）
-                print(f"收到消息事件: {message}")
+                logger.debug("收到消息事件: %s", message)
             elif 'echo' in message:
                 # API响应
                 self._handle_api_response(message)
@@ -205,55 +293,75 @@ class MessageHandler:
                 self._handle_reply_message(message)
                 
         except Exception as e:
-            logger.error(f"处理消息失败: {e}")
+            logger.error("处理消息失败: %s", e)
             
+    # API名称 -> 处理方法名，处理方法签名均为 (params, echo)
+    _ACTION_TABLE = {
+        'send_private_msg': '_handle_send_private_msg',
+        'send_group_msg': '_handle_send_group_msg',
+        'send_msg': '_handle_send_msg',
+        'get_login_info': '_handle_get_login_info',
+        'get_status': '_handle_get_status',
+    }
+    
     def _handle_api_request(self, request: Dict[str, Any]):
         """处理API请求
         
         Args:
             request: API请求
         """
+        echo = ''
         try:
             action = request.get('action', '')
             params = request.get('params', {})
             echo = request.get('echo', '')
             
-            logger.info(f"处理API请求: {action}")
+            logger.debug("处理API请求: %s", action)
             
-            if action == 'send_private_msg':
-                # 发送私聊消息
-                self._handle_send_private_msg(params, echo)
-            elif action == 'send_group_msg':
-                # 发送群消息（暂不支持群聊）
-                logger.warning(f"群消息发送暂不支持: group_id={params.get('group_id', '')}")
-                self.websocket_client.send_api_response(echo, None, 1404, "group message not supported")
-            elif action == 'send_msg':
-                # 通用发送消息接口
-                self._handle_send_msg(params, echo)
-            elif action == 'get_login_info':
-                # 获取登录信息
-                data = {
-                    "user_id": self.onebot_converter.self_id,
-                    "nickname": "WxAuto Bot"
-                }
-                self.websocket_client.send_api_response(echo, data)
-            elif action == 'get_status':
-                # 获取状态
-                data = {
-                    "online": self.websocket_client.is_connected,
-                    "good": True
-                }
-                self.websocket_client.send_api_response(echo, data)
+            handler_name = self._ACTION_TABLE.get(action)
+            if handler_name:
+                getattr(self, handler_name)(params, echo)
             else:
                 # 未支持的API
-                logger.warning(f"未支持的API请求: {action}")
+                logger.warning("未支持的API请求: %s", action)
                 self.websocket_client.send_api_response(echo, None, 1404, "failed")
                 
         except Exception as e:
-            logger.error(f"处理API请求失败: {e}")
-            if 'echo' in locals():
-                self.websocket_client.send_api_response(echo, None, 1500, "failed")
-                
+            logger.error("处理API请求失败: %s", e)
+            self.websocket_client.send_api_response(echo, None, 1500, "failed")
+            
+    def _handle_send_group_msg(self, params: Dict[str, Any], echo: str):
+        """处理发送群消息请求（暂不支持群聊）
+        
+        Args:
+            params: API参数
+            echo: 回声标识
+        """
+        logger.warning("群消息发送暂不支持: group_id=%s", params.get('group_id', ''))
+        self.websocket_client.send_api_response(echo, None, 1404, "group message not supported")
+        
+    def _handle_get_login_info(self, params: Dict[str, Any], echo: str):
+        """处理获取登录信息请求
+        
+        Args:
+            params: API参数
+            echo: 回声标识
+        """
+        self.websocket_client.send_api_response(echo, self._login_info)
+        
+    def _handle_get_status(self, params: Dict[str, Any], echo: str):
+        """处理获取状态请求
+        
+        Args:
+            params: API参数
+            echo: 回声标识
+        """
+        data = {
+            "online": self.websocket_client.is_connected,
+            "good": True
+        }
+        self.websocket_client.send_api_response(echo, data)
+        
     def _handle_send_msg(self, params: Dict[str, Any], echo: str):
         """处理通用发送消息请求
         
@@ -271,15 +379,15 @@ class MessageHandler:
             elif message_type == 'group':
                 # 群消息（暂不支持）
                 group_id = params.get('group_id', '')
-                logger.warning(f"群消息发送暂不支持: group_id={group_id}")
+                logger.warning("群消息发送暂不支持: group_id=%s", group_id)
                 self.websocket_client.send_api_response(echo, None, 1404, "group message not supported")
             else:
                 # 未知消息类型
-                logger.warning(f"未知消息类型: {message_type}")
+                logger.warning("未知消息类型: %s", message_type)
                 self.websocket_client.send_api_response(echo, None, 1400, "invalid message_type")
                 
         except Exception as e:
-            logger.error(f"处理send_msg请求失败: {e}")
+            logger.error("处理send_msg请求失败: %s", e)
             self.websocket_client.send_api_response(echo, None, 1500, str(e))
     
     def _handle_send_private_msg(self, params: Dict[str, Any], echo: str):
@@ -305,13 +413,24 @@ class MessageHandler:
             # 查找对应的微信用户
             target_user = self._find_user_by_id(user_id)
             if not target_user:
-                logger.warning(f"⚠️  未找到用户ID: {user_id}")
+                logger.warning("⚠️  未找到用户ID: %s", user_id)
                 self.websocket_client.send_api_response(echo, None, 1404, "user not found")
                 return
                 
             # 解析消息内容
             wechat_msg = self._parse_onebot_message_content(message, user_id, auto_escape)
             
+            # 重复的发送请求（重试、回显风暴）不再驱动微信UI自动化
+            dedupe_key = self._send_dedupe_key(target_user, wechat_msg)
+            message_id = self._lookup_recent_send(dedupe_key)
+            if message_id is not None:
+                logger.debug("跳过重复发送: %s", target_user)
+                self.websocket_client.send_api_response(echo, {"message_id": message_id})
+                return
+                
+            # 提前并发下载消息中的远程文件
+            self._prefetch_files(wechat_msg)
+            
             # 发送消息到微信
             success = self._send_to_wechat(target_user, wechat_msg)
             
@@ -320,14 +439,22 @@ class MessageHandler:
                 message_id = int(time.time() * 1000)  # 使用毫秒时间戳
                 self.websocket_client.send_api_response(echo, {"message_id": message_id})
                 
-                # 记录已发送的消息
-                self.sent_messages[message_id] = time.time()
+                self._send_dedupe[dedupe_key] = (time.monotonic(), message_id)
+                self._send_dedupe.move_to_end(dedupe_key)
+                if len(self._send_dedupe) > self._send_dedupe_max:
+                    self._send_dedupe.popitem(last=False)
+                
+                # 记录已发送的消息，超出上限时淘汰最早的记录
+                self.sent_messages[message_id] = time.monotonic()
+                self.sent_messages.move_to_end(message_id)
+                if len(self.sent_messages) > self._sent_max:
+                    self.sent_messages.popitem(last=False)
             else:
                 # 发送失败响应
                 self.websocket_client.send_api_response(echo, None, 1500, "send failed")
                 
         except Exception as e:
-            logger.error(f"处理发送私聊消息失败: {e}")
+            logger.error("处理发送私聊消息失败: %s", e)
             self.websocket_client.send_api_response(echo, None, 1500, str(e))
             
     def _handle_api_response(self, response: Dict[str, Any]):
@@ -341,10 +468,10 @@ class MessageHandler:
             status = response.get('status', 'unknown')
             retcode = response.get('retcode', -1)
             
-            logger.info(f"收到API响应: echo={echo}, status={status}, retcode={retcode}")
+            logger.debug("收到API响应: echo=%s, status=%s, retcode=%s", echo, status, retcode)
             
         except Exception as e:
-            logger.error(f"处理API响应失败: {e}")
+            logger.error("处理API响应失败: %s", e)
             
     def _handle_reply_message(self, message: Dict[str, Any]):
         """处理回复消息
@@ -361,7 +488,7 @@ class MessageHandler:
                 # 查找对应的微信用户
                 target_user = self._find_user_by_id(user_id)
                 if not target_user:
-                    logger.warning(f"⚠️  未找到用户ID: {user_id}")
+                    logger.warning("⚠️  未找到用户ID: %s", user_id)
                     return
                     
                 # 构造微信消息
@@ -374,11 +501,50 @@ class MessageHandler:
                 # 发送到微信
                 self._send_to_wechat(target_user, wechat_msg)
             else:
-                logger.warning(f"⚠️  无法解析回复消息: {message}")
+                logger.warning("⚠️  无法解析回复消息: %s", message)
                 
         except Exception as e:
-            logger.error(f"❌ 处理回复消息失败: {e}")
+            logger.error("❌ 处理回复消息失败: %s", e)
             
+    def _send_dedupe_key(self, target_user: str, wechat_msg: Dict[str, Any]) -> tuple:
+        """计算发送去重的键（不含时间戳）
+        
+        Args:
+            target_user: 目标用户昵称
+            wechat_msg: 微信消息
+            
+        Returns:
+            去重键
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(str(wechat_msg.get('content', '')).encode('utf-8'))
+        for file_path in wechat_msg.get('files', []):
+            digest.update(b'\0')
+            digest.update(str(file_path).encode('utf-8'))
+        return (target_user, digest.digest(), wechat_msg.get('message_type'))
+        
+    def _lookup_recent_send(self, key: tuple) -> Optional[int]:
+        """查找去重窗口内的相同发送，顺带淘汰过期记录
+        
+        Args:
+            key: 去重键
+            
+        Returns:
+            上次发送的message_id，不存在时返回None
+        """
+        dedupe = self._send_dedupe
+        expire_time = time.monotonic() - self._send_dedupe_ttl
+        
+        # 记录按发送时间有序，只需从头部弹出过期项
+        while dedupe:
+            sent_at, _ = next(iter(dedupe.values()))
+            if sent_at >= expire_time:
+                break
+            dedupe.popitem(last=False)
+            
+        entry = dedupe.get(key)
+        return entry[1] if entry else None
+        
     def _find_user_by_id(self, user_id: str) -> Optional[str]:
         """根据用户ID查找微信用户昵称
         
@@ -389,20 +555,50 @@ class MessageHandler:
             微信用户昵称，如果未找到则返回None
         """
         try:
-            # 从配置中查找用户映射
-            monitored_users = self.config_manager.get('wechat.monitor_users', [])
-            
-            for user in monitored_users:
-                if isinstance(user, dict) and user.get('user_id') == user_id:
-                    return user.get('nickname')
-                    
-            # 如果没有找到映射，尝试直接使用user_id作为昵称
-            return user_id
+            # 从用户映射表中查找，没有找到时直接使用user_id作为昵称
+            self._ensure_config_snapshot()
+            return self._id_to_nick.get(user_id, user_id)
             
         except Exception as e:
-            logger.error(f"查找用户失败: {e}")
+            logger.error("查找用户失败: %s", e)
             return None
             
+    def _rebuild_from_config(self):
+        """根据配置重建监听用户昵称集合、用户ID到昵称的映射和下载缓存目录"""
+        config_manager = self.config_manager
+        nickname_set = set()
+        id_to_nick = {}
+        
+        for user in config_manager.get('wechat.monitor_users', []):
+            # 支持两种格式：字符串和对象
+            if isinstance(user, str):
+                nickname_set.add(user)
+            elif isinstance(user, dict):
+                nickname = user.get('nickname')
+                nickname_set.add(nickname)
+                user_id = user.get('user_id')
+                if user_id is not None:
+                    # 与原先的线性查找一致，保留第一次出现的映射
+                    id_to_nick.setdefault(user_id, nickname)
+                    
+        # 冻结为不可变集合，消息处理线程只做一次哈希探测
+        self._monitored_nicknames = frozenset(nickname_set)
+        self._id_to_nick = id_to_nick
+        
+        # 文件下载缓存目录，只在路径变化时创建
+        project_root = Path(__file__).parent.parent
+        download_cache_dir = project_root / config_manager.get('message.file_cache_dir', 'cache/downloads')
+        if download_cache_dir != self.download_cache_dir:
+            download_cache_dir.mkdir(parents=True, exist_ok=True)
+            self.download_cache_dir = download_cache_dir
+            
+        self._config_version = config_manager.version
+        
+    def _ensure_config_snapshot(self):
+        """配置发生变化时重建配置快照"""
+        if self._config_version != self.config_manager.version:
+            self._rebuild_from_config()
+            
     def _send_to_wechat(self, target_user: str, wechat_msg: Dict[str, Any]) -> bool:
         """发送消息到微信
         
@@ -424,8 +620,8 @@ class MessageHandler:
             elif message_type == 'image':
                 # 发送图片消息
                 files = wechat_msg.get('files', [])
-                if files:
-                    image_path = files[0]
+                image_path = self._resolve_file(files[0]) if files else None
+                if image_path:
                     success = self.wechat_monitor.send_image(target_user, image_path)
                 else:
                     logger.warning("图片消息缺少文件路径")
@@ -434,8 +630,8 @@ class MessageHandler:
             elif message_type == 'file':
                 # 发送文件消息
                 files = wechat_msg.get('files', [])
-                if files:
-                    file_path = files[0]
+                file_path = self._resolve_file(files[0]) if files else None
+                if file_path:
                     success = self.wechat_monitor.send_file(target_user, file_path)
                 else:
                     logger.warning("文件消息缺少文件路径")
@@ -444,8 +640,8 @@ class MessageHandler:
             elif message_type == 'voice':
                 # 发送语音消息
                 files = wechat_msg.get('files', [])
-                if files:
-                    voice_path = files[0]
+                voice_path = self._resolve_file(files[0]) if files else None
+                if voice_path:
                     success = self.wechat_monitor.send_message(target_user, voice_path, msg_type='voice')
                 else:
                     logger.warning("语音消息缺少文件路径")
@@ -457,16 +653,144 @@ class MessageHandler:
                 success = self.wechat_monitor.send_message(target_user, content)
                 
             if success:
-                logger.info(f"✅ 消息已发送: {target_user}")
+                logger.debug("✅ 消息已发送: %s", target_user)
             else:
-                logger.error(f"❌ 发送失败: {target_user}")
+                logger.error("❌ 发送失败: %s", target_user)
                 
             return success
             
         except Exception as e:
-            logger.error(f"❌ 发送消息到微信失败: {e}")
+            logger.error("❌ 发送消息到微信失败: %s", e)
             return False
             
+    def _submit_download(self, url: str) -> Future:
+        """提交下载任务，相同URL的并发请求共用同一个任务
+        
+        Args:
+            url: 文件URL
+            
+        Returns:
+            结果为本地文件路径（失败时为None）的Future
+        """
+        with self._dl_lock:
+            future = self._dl_inflight.get(url)
+            if future is not None:
+                return future
+                
+            if self._dl_pool is None:
+                # 线程池未启动时同步下载
+                future = Future()
+                future.set_result(self._download_file(url))
+                return future
+                
+            # 已完成的任务保留到当前批次处理结束，避免预取结果被重复下载
+            future = self._dl_pool.submit(self._download_file, url)
+            self._dl_inflight[url] = future
+            
+        return future
+        
+    def _prefetch_batch(self, batch: List[Dict[str, Any]]):
+        """为一批API请求中的远程图片/语音提前提交下载任务
+        
+        同一批次的下载并发执行，依赖_download_path为每个下载生成唯一的路径；
+        _dl_inflight只按URL合并，不能防止末段相同的不同URL写入同一路径
+        
+        Args:
+            batch: 待处理的消息列表
+        """
+        submit = self._submit_download
+        
+        for request in batch:
+            if request.get('action') not in ('send_msg', 'send_private_msg'):
+                continue
+                
+            params = request.get('params') or {}
+            message = params.get('message')
+            if isinstance(message, str):
+                if params.get('auto_escape') or 'http' not in message:
+                    continue
+                message = self._parse_cq_code(message)
+            if not isinstance(message, list):
+                continue
+                
+            for segment in message:
+                if not isinstance(segment, dict) or segment.get('type') not in ('image', 'record'):
+                    continue
+                file_data = (segment.get('data') or {}).get('file')
+                if isinstance(file_data, str) and file_data.startswith(('http://', 'https://')):
+                    submit(file_data)
+        
+    def _prefetch_files(self, wechat_msg: Dict[str, Any]):
+        """为消息中的远程文件提前提交下载任务
+        
+        Args:
+            wechat_msg: 微信消息
+        """
+        for file_path in wechat_msg.get('files', []):
+            if isinstance(file_path, str) and file_path.startswith(('http://', 'https://')):
+                self._submit_download(file_path)
+                
+    def _resolve_file(self, file_path: str) -> Optional[str]:
+        """获取可直接发送的本地文件路径，远程文件会先下载
+        
+        Args:
+            file_path: 本地路径或URL
+            
+        Returns:
+            本地文件路径，如果下载失败则返回None
+        """
+        if isinstance(file_path, str) and file_path.startswith(('http://', 'https://')):
+            return self._submit_download(file_path).result()
+        return file_path
+        
+    def _download_path(self, url: str, filename: str = None) -> Path:
+        """为下载生成唯一的本地路径，文件名保持不变
+        
+        不同URL的末段常常相同（如CDN的download、0），下载又在线程池中并发执行，
+        直接写入缓存目录会让多个下载写入同一路径。每次下载放在独立的子目录
+        （URL摘要加自增序号）中，微信收到的仍是原始文件名
+        
+        Args:
+            url: 文件URL
+            filename: 文件名（可选），默认取URL末段
+            
+        Returns:
+            本地文件路径
+        """
+        if not filename:
+            # 从URL中提取文件名
+            filename = unquote(url.split('?', 1)[0].split('#', 1)[0].rsplit('/', 1)[-1])
+        filename = _UNSAFE_FILENAME_RE.sub('_', filename).strip(' .')
+        if not filename:
+            filename = f"download_{int(time.time())}"
+            
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).hexdigest()
+        download_dir = self.download_cache_dir / f"{digest}_{next(self._file_seq)}"
+        download_dir.mkdir(parents=True, exist_ok=True)
+        return download_dir / filename
+        
+    def _cleanup_downloads(self) -> int:
+        """删除超过保留时间的下载子目录
+        
+        Returns:
+            删除的目录数
+        """
+        download_cache_dir = self.download_cache_dir
+        if download_cache_dir is None or not download_cache_dir.is_dir():
+            return 0
+            
+        expire_time = time.time() - self._download_ttl
+        removed = 0
+        with os.scandir(download_cache_dir) as it:
+            for entry in it:
+                # 只处理_download_path创建的子目录，不碰缓存目录中的其他文件
+                if not _DOWNLOAD_DIR_RE.match(entry.name) or not entry.is_dir(follow_symlinks=False):
+                    continue
+                if entry.stat().st_mtime < expire_time:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+        return removed
+        
     def _download_file(self, url: str, filename: str = None) -> Optional[str]:
         """下载文件到本地
         
@@ -477,29 +801,45 @@ class MessageHandler:
         Returns:
             本地文件路径，如果下载失败则返回None
         """
+        file_path = None
         try:
-            if not filename:
-                # 从URL中提取文件名
-                filename = url.split('/')[-1]
-                if '?' in filename:
-                    filename = filename.split('?')[0]
-                if not filename:
-                    filename = f"download_{int(time.time())}"
-                    
-            file_path = self.download_cache_dir / filename
-            
-            # 下载文件
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
+            self._ensure_config_snapshot()
+            file_path = self._download_path(url, filename)
             
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
+            with self._http.get(url, timeout=(5, 30), stream=True) as response:
+                response.raise_for_status()
                 
-            logger.info(f"文件下载成功: {file_path}")
+                content_length = int(response.headers.get('Content-Length') or 0)
+                if 0 < content_length <= _PREALLOC_MAX and not response.headers.get('Content-Encoding'):
+                    # 长度已知的小文件：一次分配缓冲区，直接读入，避免分块拼接
+                    buf = bytearray(content_length)
+                    view = memoryview(buf)
+                    offset = 0
+                    readinto = response.raw.readinto
+                    while offset < content_length:
+                        n = readinto(view[offset:])
+                        if not n:
+                            break
+                        offset += n
+                    if offset != content_length:
+                        # 连接中途断开，urllib3 1.x不会校验Content-Length
+                        raise IOError(f"下载不完整: {offset}/{content_length} 字节")
+                    with open(file_path, 'wb') as f:
+                        f.write(view[:offset])
+                else:
+                    # 流式下载文件，内存占用与文件大小无关
+                    with open(file_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=65536):
+                            f.write(chunk)
+                
+            logger.info("文件下载成功: %s", file_path)
             return str(file_path)
             
         except Exception as e:
-            logger.error(f"下载文件失败: {e}")
+            logger.error("下载文件失败: %s", e)
+            # 删除不完整的文件，避免被当作附件发送
+            if file_path is not None:
+                shutil.rmtree(file_path.parent, ignore_errors=True)
             return None
             
     def _parse_onebot_message_content(self, message, user_id: str, auto_escape: bool = False) -> Dict[str, Any]:
@@ -537,7 +877,7 @@ class MessageHandler:
             return wechat_msg
             
         except Exception as e:
-            logger.error(f"❌ 解析OneBotV11消息失败: {e}")
+            logger.error("❌ 解析OneBotV11消息失败: %s", e)
             # 返回错误消息
             return {
                 'content': f'[消息解析失败: {e}]',
@@ -554,39 +894,39 @@ class MessageHandler:
         Returns:
             OneBotV11消息段数组
         """
-        import re
-        
+        # 纯文本消息是绝大多数，不含CQ码时跳过正则匹配
+        if '[CQ:' not in message:
+            return [{
+                'type': 'text',
+                'data': {'text': message}
+            }]
+            
         segments = []
+        append = segments.append
         last_end = 0
         
-        # CQ码正则表达式
-        cq_pattern = r'\[CQ:([^,\]]+)(?:,([^\]]+))?\]'
-        
-        for match in re.finditer(cq_pattern, message):
+        for match in _CQ_RE.finditer(message):
             start, end = match.span()
             
             # 添加CQ码前的文本
             if start > last_end:
-                text = message[last_end:start]
-                if text:
-                    segments.append({
-                        'type': 'text',
-                        'data': {'text': text}
-                    })
+                append({
+                    'type': 'text',
+                    'data': {'text': message[last_end:start]}
+                })
             
             # 解析CQ码
-            cq_type = match.group(1)
-            cq_params_str = match.group(2) or ''
+            cq_type, cq_params_str = match.groups()
             
-            # 解析参数
+            # 解析参数，partition只扫描一次字符串
             cq_data = {}
             if cq_params_str:
                 for param in cq_params_str.split(','):
-                    if '=' in param:
-                        key, value = param.split('=', 1)
+                    key, sep, value = param.partition('=')
+                    if sep:
                         cq_data[key] = value
             
-            segments.append({
+            append({
                 'type': cq_type,
                 'data': cq_data
             })
@@ -614,30 +954,36 @@ class MessageHandler:
     def _cleanup_cache(self):
         """清理过期的消息缓存"""
         try:
-            current_time = time.time()
+            current_time = time.monotonic()
             
             # 检查是否需要清理
             if current_time - self.last_cleanup < self.cache_cleanup_interval:
                 return
                 
-            # 清理过期的消息记录（保留1小时）
+            # 清理过期的消息记录（保留1小时），记录按时间有序，只需从头部弹出
             expire_time = current_time - 3600
-            expired_keys = []
+            sent_messages = self.sent_messages
+            expired_count = 0
             
-            for message_id, timestamp in self.sent_messages.items():
-                if timestamp < expire_time:
-                    expired_keys.append(message_id)
-                    
-            for key in expired_keys:
-                del self.sent_messages[key]
+            while sent_messages:
+                timestamp = next(iter(sent_messages.values()))
+                if timestamp >= expire_time:
+                    break
+                sent_messages.popitem(last=False)
+                expired_count += 1
+                
+            if expired_count:
+                logger.info("清理了 %s 条过期消息记录", expired_count)
                 
-            if expired_keys:
-                logger.info(f"清理了 {len(expired_keys)} 条过期消息记录")
+            # 清理过期的下载文件，避免缓存目录无限增长
+            removed = self._cleanup_downloads()
+            if removed:
+                logger.info("清理了 %s 个过期下载文件", removed)
                 
             self.last_cleanup = current_time
             
         except Exception as e:
-            logger.error(f"清理缓存失败: {e}")
+            logger.error("清理缓存失败: %s", e)
             
     def get_status(self) -> Dict[str, Any]:
         """获取消息处理器状态
@@ -647,9 +993,10 @@ class MessageHandler:
         """
         return {
             'is_running': self.is_running,
-            'message_queue_size': self.message_queue.qsize(),
+            'message_queue_size': len(self.message_queue),
             'sent_messages_count': len(self.sent_messages),
-            'last_cleanup': self.last_cleanup
+            # 内部使用单调时钟，对外换算为墙钟时间戳
+            'last_cleanup': time.time() - (time.monotonic() - self.last_cleanup)
         }
         
     def add_user_mapping(self, user_id: str, nickname: str):
@@ -665,9 +1012,13 @@ class MessageHandler:
             # 检查是否已存在
             for user in monitored_users:
                 if user.get('user_id') == user_id:
+                    if user.get('nickname') == nickname:
+                        # 映射未变化，无需写配置
+                        return
                     user['nickname'] = nickname
-                    self.config_manager.save_config()
-                    logger.info(f"更新用户映射: {user_id} -> {nickname}")
+                    self.config_manager.set('wechat.monitor_users', monitored_users)
+                    self._schedule_save()
+                    logger.info("更新用户映射: %s -> %s", user_id, nickname)
                     return
                     
             # 添加新映射
@@ -678,9 +1029,28 @@ class MessageHandler:
             })
             
             self.config_manager.set('wechat.monitor_users', monitored_users)
-            self.config_manager.save_config()
+            self._schedule_save()
             
-            logger.info(f"添加用户映射: {user_id} -> {nickname}")
+            logger.info("添加用户映射: %s -> %s", user_id, nickname)
             
         except Exception as e:
-            logger.error(f"添加用户映射失败: {e}")
\ No newline at end of file
+            logger.error("添加用户映射失败: %s", e)
+            
+    def _schedule_save(self):
+        """延迟保存配置，窗口期内的多次变更只写一次文件"""
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self._save_delay, self._flush_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+            
+    def _flush_save(self):
+        """立即保存待写入的配置变更"""
+        with self._save_lock:
+            if self._save_timer is None:
+                return
+            self._save_timer.cancel()
+            self._save_timer = None
+            
+        self.config_manager.save_config()
\ No newline at end of file
@@ -5,27 +5,92 @@ OneBotV11消息格式转换器
 负责微信消息与OneBotV11协议格式之间的转换
 """
 
-import json
+import os
 import time
-import base64
 import hashlib
+import tempfile
+import zlib
 from typing import Dict, Any, List, Optional
 from pathlib import Path
-import mimetypes
 
 try:
     from astrbot.api import logger
 except ImportError:
-    # 独立运行模式的简单日志记录器
-    class SimpleLogger:
-        def info(self, msg): print(f"[INFO] {msg}")
-        def error(self, msg): print(f"[ERROR] {msg}")
-        def warning(self, msg): print(f"[WARNING] {msg}")
-    logger = SimpleLogger()
+    # 在独立运行模式下，使用标准库logging输出到stderr
+    import logging
+    logger = logging.getLogger('wxauto_repost')
+    if not logger.handlers:
+        _handler = logging.StreamHandler()
+        _handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
+        logger.addHandler(_handler)
+        logger.setLevel(logging.INFO)
+
+# pybase64为可选依赖（SIMD加速的base64），未安装时回退到标准库base64
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# 项目根目录，媒体缓存目录相对于此解析
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 消息类型判断用的文件扩展名
+_IMAGE_EXTS = frozenset(('.jpg', '.jpeg', '.png', '.gif', '.bmp'))
+_VOICE_EXTS = frozenset(('.wav', '.mp3', '.amr', '.silk'))
+
+# 文件大小单位
+_SIZE_UNITS = ("B", "KB", "MB", "GB")
+
+# base64数据地址前缀
+_BASE64_PREFIX = 'base64://'
+_BASE64_PREFIX_LEN = len(_BASE64_PREFIX)
+
+# 分块base64编码的读取大小（48KiB，3的倍数）
+_B64_CHUNK_SIZE = 48 * 1024
+
+def _text_payload(text: str) -> Dict[str, Any]:
+    """构造纯文本消息的message/raw_message字段
+    
+    所有键均为ASCII字符串、嵌套不超过两层，orjson等序列化器可走快速路径
+    
+    Args:
+        text: 文本内容
+        
+    Returns:
+        OneBotV11消息片段
+    """
+    return {"message": [{"type": "text", "data": {"text": text}}], "raw_message": text}
 
 class OneBotV11Converter:
     """OneBotV11协议消息转换器"""
     
+    # 消息结构模板，字段顺序与协议示例一致，每条消息复制后只填充变化的字段
+    _ONEBOT_TEMPLATE = {
+        "time": 0,
+        "self_id": "",
+        "post_type": "message",
+        "message_type": "private",  # 默认为私聊
+        "sub_type": "friend",
+        "message_id": 0,
+        "user_id": "",
+        "message": None,
+        "raw_message": "",
+        "font": 0,
+        "sender": None
+    }
+    
+    _SENDER_TEMPLATE = {
+        "user_id": "",
+        "nickname": "",
+        "card": "",
+        "sex": "unknown",
+        "age": 0,
+        "area": "",
+        "level": "1",
+        "role": "member",
+        "title": ""
+    }
+    
     def __init__(self, config_manager):
         """初始化转换器
         
@@ -35,6 +100,31 @@ class OneBotV11Converter:
         self.config_manager = config_manager
         self.self_id = config_manager.get('onebot.self_id', 'wxauto_bot')
         
+        # 微信消息类型 -> 转换方法
+        self._converters = {
+            'text': self._convert_text_message,
+            'image': self._convert_image_message,
+            'file': self._convert_file_message,
+            'voice': self._convert_voice_message,
+        }
+        
+        # 消息段类型 -> 处理方法（返回该段的文本内容）
+        self._segment_handlers = {
+            'text': self._seg_text,
+            'image': self._seg_image,
+            'record': self._seg_record,
+            'at': self._seg_at,
+            'face': self._seg_face,
+        }
+        
+        # 配置快照（媒体缓存目录、心跳间隔），配置版本变化时重新解析
+        self._config_version = None
+        self._image_cache_dir = None
+        self._voice_cache_dir = None
+        self._heartbeat_ms = 30000
+        self._heartbeat_base = None
+        self._ensure_config_snapshot()
+        
     def wechat_to_onebot(self, wechat_msg: Dict[str, Any]) -> Dict[str, Any]:
         """将微信消息转换为OneBotV11格式
         
@@ -44,53 +134,34 @@ class OneBotV11Converter:
         Returns:
             OneBotV11格式的消息
         """
-        try:
-            # 基础消息结构
-            onebot_msg = {
-                "time": wechat_msg.get('timestamp', int(time.time())),
-                "self_id": self.self_id,
-                "post_type": "message",
-                "message_type": "private",  # 默认为私聊
-                "sub_type": "friend",
-                "message_id": self._generate_message_id(wechat_msg),
-                "user_id": wechat_msg.get('user_id', ''),
-                "message": [],
-                "raw_message": "",
-                "font": 0,
-                "sender": {
-                    "user_id": wechat_msg.get('user_id', ''),
-                    "nickname": wechat_msg.get('user_name', ''),
-                    "card": "",
-                    "sex": "unknown",
-                    "age": 0,
-                    "area": "",
-                    "level": "1",
-                    "role": "member",
-                    "title": ""
-                }
-            }
-            
-            # 根据消息类型转换内容
-            msg_type = wechat_msg.get('message_type', 'text')
-            
-            if msg_type == 'text':
-                onebot_msg.update(self._convert_text_message(wechat_msg))
-            elif msg_type == 'image':
-                onebot_msg.update(self._convert_image_message(wechat_msg))
-            elif msg_type == 'file':
-                onebot_msg.update(self._convert_file_message(wechat_msg))
-            elif msg_type == 'voice':
-                onebot_msg.update(self._convert_voice_message(wechat_msg))
-            else:
-                # 未知类型，当作文本处理
-                onebot_msg.update(self._convert_text_message(wechat_msg))
-                
+        # 基础消息结构（只有字典读取和构造，不会抛出异常）
+        onebot_msg = self._new_onebot_msg(
+            wechat_msg,
+            wechat_msg.get('timestamp', int(time.time())),
+            self._generate_message_id(wechat_msg)
+        )
+        
+        # 根据消息类型转换内容
+        msg_type = wechat_msg.get('message_type', 'text')
+        
+        if msg_type == 'text':
+            # 纯文本是最常见的类型，直接填充字段，省去中间字典和update
+            # text与raw_message引用同一个不可变的str对象，不产生拷贝
+            content = wechat_msg.get('content', '')
+            onebot_msg["message"] = [{"type": "text", "data": {"text": content}}]
+            onebot_msg["raw_message"] = content
             return onebot_msg
             
+        # 未知类型当作文本处理；只有涉及文件读取的转换才需要异常保护
+        converter = self._converters.get(msg_type, self._convert_text_message)
+        try:
+            onebot_msg.update(converter(wechat_msg))
         except Exception as e:
-            logger.error(f"❌ 转换微信消息到OneBotV11格式失败: {e}")
+            logger.error("❌ 转换微信消息到OneBotV11格式失败: %s", e)
             return self._create_error_message(wechat_msg, str(e))
             
+        return onebot_msg
+            
     def onebot_to_wechat(self, onebot_msg: Dict[str, Any]) -> Dict[str, Any]:
         """将OneBotV11消息转换为微信格式
         
@@ -122,7 +193,7 @@ class OneBotV11Converter:
             return wechat_msg
             
         except Exception as e:
-            logger.error(f"❌ 转换OneBotV11消息到微信格式失败: {e}")
+            logger.error("❌ 转换OneBotV11消息到微信格式失败: %s", e)
             return {
                 'user_id': onebot_msg.get('user_id', ''),
                 'content': f'[消息解析失败: {e}]',
@@ -144,11 +215,15 @@ class OneBotV11Converter:
         user_id = wechat_msg.get('user_id', '')
         message_id = wechat_msg.get('message_id', '')
         
-        # 使用MD5哈希生成稳定的消息ID
-        hash_input = f"{timestamp}_{user_id}_{message_id}"
-        md5_hash = hashlib.md5(hash_input.encode('utf-8')).hexdigest()
-        # 取前8位转换为整数，确保为正数
-        return int(md5_hash[:8], 16) & 0x7FFFFFFF
+        if not isinstance(timestamp, (int, float)):
+            # 非数值时间戳同样参与散列，保证此方法不会抛出异常
+            timestamp = zlib.crc32(str(timestamp).encode('utf-8'))
+            
+        # 时间戳乘法散列后与用户ID、消息ID的CRC32混合
+        # （不用内置hash()：字符串哈希每次进程启动都会变化，ID将不再稳定）
+        id_hash = zlib.crc32(str(message_id).encode('utf-8'), zlib.crc32(str(user_id).encode('utf-8')))
+        # 截断为31位，确保为正数
+        return ((int(timestamp) * 2654435761) ^ id_hash) & 0x7FFFFFFF
         
     def _convert_text_message(self, wechat_msg: Dict[str, Any]) -> Dict[str, Any]:
         """转换文本消息
@@ -159,19 +234,7 @@ class OneBotV11Converter:
         Returns:
             OneBotV11消息片段
         """
-        content = wechat_msg.get('content', '')
-        
-        return {
-            "message": [
-                {
-                    "type": "text",
-                    "data": {
-                        "text": content
-                    }
-                }
-            ],
-            "raw_message": content
-        }
+        return _text_payload(wechat_msg.get('content', ''))
         
     def _convert_image_message(self, wechat_msg: Dict[str, Any]) -> Dict[str, Any]:
         """转换图片消息
@@ -188,15 +251,12 @@ class OneBotV11Converter:
         # 构建图片消息
         image_data = {}
         
-        if image_path and Path(image_path).exists():
+        if image_path and os.path.isfile(image_path):
             # 如果有本地路径，转换为base64
             try:
-                with open(image_path, 'rb') as f:
-                    image_bytes = f.read()
-                    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                    image_data['file'] = f"base64://{image_base64}"
+                image_data['file'] = self._file_to_base64_uri(image_path)
             except Exception as e:
-                logger.error(f"读取图片文件失败: {e}")
+                logger.error("读取图片文件失败: %s", e)
                 image_data['file'] = image_path
         elif image_url:
             image_data['file'] = image_url
@@ -229,21 +289,18 @@ class OneBotV11Converter:
         # 这里先转换为文本消息，包含文件信息
         content = f"[文件: {file_name}]"
         
-        if file_path and Path(file_path).exists():
-            file_size = Path(file_path).stat().st_size
+        # getsize只做一次stat并直接返回大小，文件不存在时抛出OSError
+        file_size = None
+        if file_path:
+            try:
+                file_size = os.path.getsize(file_path)
+            except OSError:
+                pass
+                
+        if file_size is not None:
             content = f"[文件: {file_name}, 大小: {self._format_file_size(file_size)}]"
             
-        return {
-            "message": [
-                {
-                    "type": "text",
-                    "data": {
-                        "text": content
-                    }
-                }
-            ],
-            "raw_message": content
-        }
+        return _text_payload(content)
         
     def _convert_voice_message(self, wechat_msg: Dict[str, Any]) -> Dict[str, Any]:
         """转换语音消息
@@ -259,14 +316,11 @@ class OneBotV11Converter:
         # 构建语音消息
         voice_data = {}
         
-        if voice_path and Path(voice_path).exists():
+        if voice_path and os.path.isfile(voice_path):
             try:
-                with open(voice_path, 'rb') as f:
-                    voice_bytes = f.read()
-                    voice_base64 = base64.b64encode(voice_bytes).decode('utf-8')
-                    voice_data['file'] = f"base64://{voice_base64}"
+                voice_data['file'] = self._file_to_base64_uri(voice_path)
             except Exception as e:
-                logger.error(f"读取语音文件失败: {e}")
+                logger.error("读取语音文件失败: %s", e)
                 voice_data['file'] = voice_path
         else:
             voice_data['file'] = "[语音]"  # 占位符
@@ -281,6 +335,22 @@ class OneBotV11Converter:
             "raw_message": "[CQ:record,file={}]".format(voice_data.get('file', ''))
         }
         
+    def _file_to_base64_uri(self, file_path: str) -> str:
+        """分块读取文件并编码为base64://地址，不在内存中保留整个原始文件
+        
+        Args:
+            file_path: 本地文件路径
+            
+        Returns:
+            base64://开头的字符串
+        """
+        out = bytearray(_BASE64_PREFIX.encode('ascii'))
+        with open(file_path, 'rb') as f:
+            # 块大小是3的倍数，分块编码结果中间不会出现填充符
+            for chunk in iter(lambda: f.read(_B64_CHUNK_SIZE), b''):
+                out += base64.b64encode(chunk)
+        return out.decode('ascii')
+        
     def _parse_onebot_message(self, message: List[Dict[str, Any]]) -> Dict[str, Any]:
         """解析OneBotV11消息数组
         
@@ -296,64 +366,70 @@ class OneBotV11Converter:
             'files': []  # 存储文件路径
         }
         
-        content_parts = []
+        # 每个消息段恰好产生一段内容，按长度预分配后按下标填充
+        content_parts = [''] * len(message)
+        handlers = self._segment_handlers
+        has_plain_text = False
         
-        for segment in message:
+        for i, segment in enumerate(message):
             seg_type = segment.get('type', 'text')
-            seg_data = segment.get('data', {})
+            handler = handlers.get(seg_type)
             
-            if seg_type == 'text':
-                text = seg_data.get('text', '')
-                content_parts.append(text)
-                
-            elif seg_type == 'image':
-                image_file = seg_data.get('file', '')
-                image_path = self._process_image_file(image_file)
-                
-                if image_path:
-                    result['message_type'] = 'image'
-                    result['files'].append(image_path)
-                    content_parts.append('[图片]')
-                else:
-                    content_parts.append('[图片]')
-                    
-            elif seg_type == 'record':
-                voice_file = seg_data.get('file', '')
-                voice_path = self._process_voice_file(voice_file)
-                
-                if voice_path:
-                    result['message_type'] = 'voice'
-                    result['files'].append(voice_path)
-                    content_parts.append('[语音]')
-                else:
-                    content_parts.append('[语音]')
-                    
-            elif seg_type == 'at':
-                qq = seg_data.get('qq', '')
-                content_parts.append(f'@{qq}')
-                
-            elif seg_type == 'face':
-                face_id = seg_data.get('id', '')
-                content_parts.append(f'[表情{face_id}]')
-                
-            else:
+            if handler is None:
                 # 其他类型的消息段
-                content_parts.append(f'[{seg_type}]')
+                part = f'[{seg_type}]'
+            else:
+                part = handler(segment.get('data', {}), result)
+                # 非空且不以[开头的内容计为正文
+                if not has_plain_text and part.strip() and not part.startswith('['):
+                    has_plain_text = True
+            content_parts[i] = part
                 
         result['content'] = ''.join(content_parts)
         
         # 如果只有一个文件且没有文本，设置为对应的消息类型
-        if len(result['files']) == 1 and not any(part.strip() and not part.startswith('[') for part in content_parts):
+        if len(result['files']) == 1 and not has_plain_text:
             file_path = result['files'][0]
-            if file_path.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp')):
+            ext = os.path.splitext(file_path)[1].lower()
+            if ext in _IMAGE_EXTS:
                 result['message_type'] = 'image'
-            elif file_path.lower().endswith(('.wav', '.mp3', '.amr', '.silk')):
+            elif ext in _VOICE_EXTS:
                 result['message_type'] = 'voice'
             else:
                 result['message_type'] = 'file'
                 
         return result
         
+    def _seg_text(self, seg_data: Dict[str, Any], result: Dict[str, Any]) -> str:
+        """处理文本消息段"""
+        return seg_data.get('text', '')
+        
+    def _seg_image(self, seg_data: Dict[str, Any], result: Dict[str, Any]) -> str:
+        """处理图片消息段"""
+        image_path = self._process_image_file(seg_data.get('file', ''))
+        
+        if image_path:
+            result['message_type'] = 'image'
+            result['files'].append(image_path)
+        return '[图片]'
+        
+    def _seg_record(self, seg_data: Dict[str, Any], result: Dict[str, Any]) -> str:
+        """处理语音消息段"""
+        voice_path = self._process_voice_file(seg_data.get('file', ''))
+        
+        if voice_path:
+            result['message_type'] = 'voice'
+            result['files'].append(voice_path)
+        return '[语音]'
+        
+    def _seg_at(self, seg_data: Dict[str, Any], result: Dict[str, Any]) -> str:
+        """处理@消息段"""
+        return f"@{seg_data.get('qq', '')}"
+        
+    def _seg_face(self, seg_data: Dict[str, Any], result: Dict[str, Any]) -> str:
+        """处理表情消息段"""
+        return f"[表情{seg_data.get('id', '')}]"
+        
     def _process_image_file(self, file_data: str) -> Optional[str]:
         """处理图片文件
         
@@ -364,36 +440,25 @@ class OneBotV11Converter:
             本地文件路径
         """
         try:
-            if file_data.startswith('base64://'):
-                # Base64编码的图片
-                base64_data = file_data[9:]  # 去掉 'base64://' 前缀
-                image_bytes = base64.b64decode(base64_data)
-                
-                # 保存到缓存目录
-                project_root = Path(__file__).parent.parent
-                cache_dir = project_root / self.config_manager.get('message.image_cache_dir', 'cache/images')
-                cache_dir.mkdir(parents=True, exist_ok=True)
-                
-                timestamp = int(time.time())
-                file_path = cache_dir / f"received_image_{timestamp}.jpg"
+            if file_data.startswith(_BASE64_PREFIX):
+                # Base64编码的图片，保存到缓存目录
+                self._ensure_config_snapshot()
+                cache_dir = self._image_cache_dir
                 
-                with open(file_path, 'wb') as f:
-                    f.write(image_bytes)
-                    
-                return str(file_path)
+                return self._save_base64_file(file_data, cache_dir, 'received_image_', '.jpg')
                 
             elif file_data.startswith(('http://', 'https://')):
                 # URL图片，这里可以下载或直接返回URL
                 return file_data
                 
-            elif Path(file_data).exists():
+            elif os.path.isfile(file_data):
                 # 本地文件路径
                 return file_data
                 
             return None
             
         except Exception as e:
-            logger.error(f"处理图片文件失败: {e}")
+            logger.error("处理图片文件失败: %s", e)
             return None
             
     def _process_voice_file(self, file_data: str) -> Optional[str]:
@@ -406,33 +471,115 @@ class OneBotV11Converter:
             本地文件路径
         """
         try:
-            if file_data.startswith('base64://'):
-                # Base64编码的语音
-                base64_data = file_data[9:]
-                voice_bytes = base64.b64decode(base64_data)
-                
-                # 保存到缓存目录
-                project_root = Path(__file__).parent.parent
-                cache_dir = project_root / self.config_manager.get('message.file_cache_dir', 'cache/files')
-                cache_dir.mkdir(parents=True, exist_ok=True)
+            if file_data.startswith(_BASE64_PREFIX):
+                # Base64编码的语音，保存到缓存目录
+                self._ensure_config_snapshot()
+                cache_dir = self._voice_cache_dir
                 
-                timestamp = int(time.time())
-                file_path = cache_dir / f"received_voice_{timestamp}.wav"
-                
-                with open(file_path, 'wb') as f:
-                    f.write(voice_bytes)
-                    
-                return str(file_path)
+                return self._save_base64_file(file_data, cache_dir, 'received_voice_', '.wav')
                 
-            elif Path(file_data).exists():
+            elif os.path.isfile(file_data):
                 return file_data
                 
             return None
             
         except Exception as e:
-            logger.error(f"处理语音文件失败: {e}")
+            logger.error("处理语音文件失败: %s", e)
             return None
             
+    def _ensure_config_snapshot(self):
+        """配置发生变化时重新解析缓存的配置项，缓存目录只在路径变化时创建"""
+        config_manager = self.config_manager
+        if self._config_version == config_manager.version:
+            return
+            
+        self._heartbeat_ms = config_manager.get('onebot.heartbeat_interval', 30) * 1000
+        self._heartbeat_base = {
+            "time": 0,
+            "self_id": self.self_id,
+            "post_type": "meta_event",
+            "meta_event_type": "heartbeat",
+            "status": {
+                "online": True,
+                "good": True
+            },
+            "interval": self._heartbeat_ms
+        }
+            
+        image_cache_dir = _PROJECT_ROOT / config_manager.get('message.image_cache_dir', 'cache/images')
+        if image_cache_dir != self._image_cache_dir:
+            image_cache_dir.mkdir(parents=True, exist_ok=True)
+            self._image_cache_dir = image_cache_dir
+            
+        voice_cache_dir = _PROJECT_ROOT / config_manager.get('message.file_cache_dir', 'cache/files')
+        if voice_cache_dir != self._voice_cache_dir:
+            voice_cache_dir.mkdir(parents=True, exist_ok=True)
+            self._voice_cache_dir = voice_cache_dir
+            
+        self._config_version = config_manager.version
+        
+    def _save_base64_file(self, file_data: str, cache_dir: Path, prefix: str, suffix: str) -> str:
+        """按内容哈希保存Base64数据，相同内容只解码和写入一次
+        
+        Args:
+            file_data: base64://开头的数据
+            cache_dir: 缓存目录
+            prefix: 文件名前缀
+            suffix: 文件扩展名
+            
+        Returns:
+            本地文件路径
+        """
+        # 只编码一次，之后通过memoryview跳过前缀，不再切片复制整段数据
+        payload = memoryview(file_data.encode('ascii'))[_BASE64_PREFIX_LEN:]
+        digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+        file_path = cache_dir / f"{prefix}{digest}{suffix}"
+        
+        if not file_path.exists():
+            # 先解码再写入，解码失败时不留下空文件
+            data = base64.b64decode(payload)
+            # 写入临时文件后再替换到最终路径，写入中途失败不会留下被当作缓存命中的残缺文件
+            fd, tmp_name = tempfile.mkstemp(dir=cache_dir, prefix=prefix, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_name, file_path)
+            except OSError:
+                # 其他线程已写好相同内容时直接使用（Windows下目标被占用会替换失败）
+                if not file_path.exists():
+                    raise
+            finally:
+                if os.path.exists(tmp_name):
+                    os.unlink(tmp_name)
+                    
+        return str(file_path)
+        
+    def _new_onebot_msg(self, wechat_msg: Dict[str, Any], timestamp: int, message_id: int) -> Dict[str, Any]:
+        """基于模板创建OneBotV11私聊消息，只填充随消息变化的字段
+        
+        Args:
+            wechat_msg: 微信消息
+            timestamp: 消息时间
+            message_id: 消息ID
+            
+        Returns:
+            OneBotV11格式的消息
+        """
+        user_id = wechat_msg.get('user_id', '')
+        
+        sender = self._SENDER_TEMPLATE.copy()
+        sender["user_id"] = user_id
+        sender["nickname"] = wechat_msg.get('user_name', '')
+        
+        onebot_msg = self._ONEBOT_TEMPLATE.copy()
+        onebot_msg["time"] = timestamp
+        onebot_msg["self_id"] = self.self_id
+        onebot_msg["message_id"] = message_id
+        onebot_msg["user_id"] = user_id
+        onebot_msg["message"] = []
+        onebot_msg["sender"] = sender
+        return onebot_msg
+        
     def _create_error_message(self, wechat_msg: Dict[str, Any], error: str) -> Dict[str, Any]:
         """创建错误消息
         
@@ -443,36 +590,11 @@ class OneBotV11Converter:
         Returns:
             错误消息的OneBotV11格式
         """
-        return {
-            "time": int(time.time()),
-            "self_id": self.self_id,
-            "post_type": "message",
-            "message_type": "private",
-            "sub_type": "friend",
-            "message_id": int(time.time()),
-            "user_id": wechat_msg.get('user_id', ''),
-            "message": [
-                {
-                    "type": "text",
-                    "data": {
-                        "text": f"[消息转换失败: {error}]"
-                    }
-                }
-            ],
-            "raw_message": f"[消息转换失败: {error}]",
-            "font": 0,
-            "sender": {
-                "user_id": wechat_msg.get('user_id', ''),
-                "nickname": wechat_msg.get('user_name', ''),
-                "card": "",
-                "sex": "unknown",
-                "age": 0,
-                "area": "",
-                "level": "1",
-                "role": "member",
-                "title": ""
-            }
-        }
+        now = int(time.time())
+        
+        onebot_msg = self._new_onebot_msg(wechat_msg, now, now)
+        onebot_msg.update(_text_payload(f"[消息转换失败: {error}]"))
+        return onebot_msg
         
     def _format_file_size(self, size_bytes: int) -> str:
         """格式化文件大小
@@ -486,15 +608,11 @@ class OneBotV11Converter:
         if size_bytes == 0:
             return "0 B"
             
-        size_names = ["B", "KB", "MB", "GB"]
-        i = 0
-        size = float(size_bytes)
+        # 由二进制位数直接得到1024的幂次，无需逐次除法循环
+        i = min((int(size_bytes).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+        size = size_bytes / (1 << (10 * i))
         
-        while size >= 1024.0 and i < len(size_names) - 1:
-            size /= 1024.0
-            i += 1
-            
-        return f"{size:.1f} {size_names[i]}"
+        return f"{size:.1f} {_SIZE_UNITS[i]}"
         
     def create_heartbeat(self) -> Dict[str, Any]:
         """创建心跳包
@@ -502,17 +620,12 @@ class OneBotV11Converter:
         Returns:
             心跳包数据
         """
-        return {
-            "time": int(time.time()),
-            "self_id": self.self_id,
-            "post_type": "meta_event",
-            "meta_event_type": "heartbeat",
-            "status": {
-                "online": True,
-                "good": True
-            },
-            "interval": self.config_manager.get('onebot.heartbeat_interval', 30) * 1000
-        }
+        self._ensure_config_snapshot()
+        
+        # 心跳包只有时间字段会变化，status字典在各次心跳间共享（只用于序列化）
+        heartbeat = self._heartbeat_base.copy()
+        heartbeat["time"] = int(time.time())
+        return heartbeat
         
     def create_lifecycle_event(self, sub_type: str = "connect") -> Dict[str, Any]:
         """创建生命周期事件
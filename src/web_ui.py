@@ -6,381 +6,42 @@ Web UI模块
 """
 
 import json
+import time
+import gzip
+import atexit
+import mimetypes
+import hashlib
 import threading
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from flask_cors import CORS
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from pathlib import Path
 import os
 
-class WebUI:
-    """Web用户界面"""
+# orjson为可选依赖，未安装时使用Flask默认的标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# waitress为可选依赖（多线程WSGI服务器），未安装时使用Flask自带的开发服务器
+try:
+    from waitress import serve
+except ImportError:
+    serve = None
+
+# rcssmin/rjsmin为可选依赖，用于压缩页面引用的CSS/JS，未安装时直接使用源文件内容
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
     
-    def __init__(self, config_manager, wechat_monitor=None, onebot_client=None, websocket_client=None, message_handler=None):
-        """初始化WebUI
-        
-        Args:
-            config_manager: 配置管理器
-            wechat_monitor: 微信监听器
-            onebot_client: OneBot客户端
-            websocket_client: WebSocket客户端
-            message_handler: 消息处理器
-        """
-        self.config_manager = config_manager
-        self.wechat_monitor = wechat_monitor
-        self.onebot_client = onebot_client
-        self.websocket_client = websocket_client
-        self.message_handler = message_handler
-        
-        # 创建Flask应用
-        self.app = Flask(__name__, 
-                        template_folder=self._get_template_dir(),
-                        static_folder=self._get_static_dir())
-        CORS(self.app)
-        
-        # 设置路由
-        self._setup_routes()
-        
-        self.running = False
-        
-    def _get_template_dir(self):
-        """获取模板目录"""
-        # 模板目录在src/templates
-        template_dir = Path(__file__).parent / "templates"
-        template_dir.mkdir(parents=True, exist_ok=True)
-        return str(template_dir)
-        
-    def _get_static_dir(self):
-        """获取静态文件目录"""
-        project_root = Path(__file__).parent.parent
-        static_dir = project_root / "static"
-        static_dir.mkdir(parents=True, exist_ok=True)
-        return str(static_dir)
-        
-    def _setup_routes(self):
-        """设置路由"""
-        
-        @self.app.route('/')
-        def index():
-            """主页"""
-            return render_template('index.html')
-            
-        @self.app.route('/api/config', methods=['GET'])
-        def get_config():
-            """获取配置"""
-            try:
-                config = self.config_manager.get_all()
-                return jsonify({
-                    'success': True,
-                    'data': config
-                })
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-                
-        @self.app.route('/api/config', methods=['POST'])
-        def update_config():
-            """更新配置"""
-            try:
-                data = request.get_json()
-                if not data:
-                    return jsonify({
-                        'success': False,
-                        'error': '无效的JSON数据'
-                    }), 400
-                    
-                # 更新配置
-                success = self.config_manager.update(data)
-                if success:
-                    # 保存配置
-                    self.config_manager.save_config()
-                    return jsonify({
-                        'success': True,
-                        'message': '配置更新成功'
-                    })
-                else:
-                    return jsonify({
-                        'success': False,
-                        'error': '配置更新失败'
-                    }), 500
-                    
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-                
-        @self.app.route('/api/config/validate', methods=['POST'])
-        def validate_config():
-            """验证配置"""
-            try:
-                data = request.get_json()
-                if not data:
-                    return jsonify({
-                        'success': False,
-                        'error': '无效的JSON数据'
-                    }), 400
-                    
-                # 临时更新配置进行验证
-                old_config = self.config_manager.get_all()
-                self.config_manager.update(data)
-                
-                # 验证配置
-                errors = self.config_manager.validate_config()
-                
-                # 恢复原配置
-                self.config_manager.config_data = old_config
-                
-                return jsonify({
-                    'success': True,
-                    'valid': len(errors) == 0,
-                    'errors': errors
-                })
-                
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-                
-        @self.app.route('/api/monitor/users', methods=['GET'])
-        def get_monitor_users():
-            """获取监听用户列表"""
-            try:
-                users = self.config_manager.get_monitor_users()
-                return jsonify({
-                    'success': True,
-                    'data': users
-                })
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-                
-        @self.app.route('/api/monitor/users', methods=['POST'])
-        def add_monitor_user():
-            """添加监听用户"""
-            try:
-                data = request.get_json()
-                
-                # 支持新格式（nickname + user_id）和旧格式（username）
-                if 'nickname' in data and 'user_id' in data:
-                    # 新格式：包含昵称和用户ID的映射
-                    nickname = data.get('nickname', '').strip()
-                    user_id = data.get('user_id', '').strip()
-                    
-                    if not nickname:
-                        return jsonify({
-                            'success': False,
-                            'error': '昵称不能为空'
-                        }), 400
-                        
-                    if not user_id:
-                        return jsonify({
-                            'success': False,
-                            'error': '用户ID不能为空'
-                        }), 400
-                    
-                    user_data = {
-                        'nickname': nickname,
-                        'user_id': user_id
-                    }
-                    success = self.config_manager.add_monitor_user(user_data)
-                    display_name = f'{nickname} (QQ: {user_id})'
-                else:
-                    # 旧格式：仅用户名
-                    username = data.get('username', '').strip()
-                    
-                    if not username:
-                        return jsonify({
-                            'success': False,
-                            'error': '用户名不能为空'
-                        }), 400
-                        
-                    success = self.config_manager.add_monitor_user(username)
-                    display_name = username
-                
-                if success:
-                    self.config_manager.save_config()
-                    return jsonify({
-                        'success': True,
-                        'message': f'已添加监听用户: {display_name}'
-                    })
-                else:
-                    return jsonify({
-                        'success': False,
-                        'error': '添加用户失败'
-                    }), 500
-                    
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-                
-        @self.app.route('/api/monitor/users/<username>', methods=['DELETE'])
-        def remove_monitor_user(username):
-            """移除监听用户"""
-            try:
-                success = self.config_manager.remove_monitor_user(username)
-                if success:
-                    self.config_manager.save_config()
-                    return jsonify({
-                        'success': True,
-                        'message': f'已移除监听用户: {username}'
-                    })
-                else:
-                    return jsonify({
-                        'success': False,
-                        'error': '移除用户失败'
-                    }), 500
-                    
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-                
-        @self.app.route('/api/status', methods=['GET'])
-        def get_status():
-            """获取系统状态"""
-            try:
-                status = {
-                    'wechat': {
-                        'enabled': self.config_manager.get('wechat.enabled', False),
-                        'running': self.wechat_monitor.running if self.wechat_monitor else False,
-                        'monitor_users': self.config_manager.get_monitor_users()
-                    },
-                    'onebot': {
-                        'enabled': self.config_manager.get('onebot.enabled', False),
-                        'connected': self.websocket_client.is_connected if self.websocket_client else False,
-                        'ws_url': self.config_manager.get('onebot.ws_url', '')
-                    },
-                    'webui': {
-                        'running': self.running,
-                        'port': self.config_manager.get('webui.port', 10001)
-                    }
-                }
-                
-                return jsonify({
-                    'success': True,
-                    'data': status
-                })
-                
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-                
-        @self.app.route('/api/control/<service>/<action>', methods=['POST'])
-        def control_service(service, action):
-            """控制服务"""
-            try:
-                if service == 'wechat' and self.wechat_monitor:
-                    if action == 'start':
-                        result = self.wechat_monitor.start()
-                        message = '微信监听已启动' if result else '微信监听启动失败'
-                    elif action == 'stop':
-                        result = self.wechat_monitor.stop()
-                        message = '微信监听已停止' if result else '微信监听停止失败'
-                    else:
-                        return jsonify({
-                            'success': False,
-                            'error': '无效的操作'
-                        }), 400
-                        
-                elif service == 'onebot' and self.onebot_client:
-                    if action == 'start':
-                        result = self.onebot_client.start()
-                        message = 'OneBot客户端已启动' if result else 'OneBot客户端启动失败'
-                    elif action == 'stop':
-                        result = self.onebot_client.stop()
-                        message = 'OneBot客户端已停止' if result else 'OneBot客户端停止失败'
-                    else:
-                        return jsonify({
-                            'success': False,
-                            'error': '无效的操作'
-                        }), 400
-                else:
-                    return jsonify({
-                        'success': False,
-                        'error': '无效的服务'
-                    }), 400
-                    
-                return jsonify({
-                    'success': result,
-                    'message': message
-                })
-                
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-                
-    def run(self):
-        """启动Web服务器"""
-        if self.running:
-            return
-            
-        self.running = True
-        
-        # 创建静态文件
-        self._create_static_files()
-        
-        host = self.config_manager.get('webui.host', '0.0.0.0')
-        port = self.config_manager.get('webui.port', 10001)
-        debug = self.config_manager.get('webui.debug', False)
-        
-        try:
-            self.app.run(host=host, port=port, debug=debug, threaded=True)
-        except Exception as e:
-            print(f"Web服务器启动失败: {e}")
-            self.running = False
-            
-    def start(self):
-        """启动Web UI服务"""
-        try:
-            port = self.config_manager.get('webui.port', 10001)
-            print(f"启动Web UI服务，端口: {port}")
-            # 在单独的线程中启动Flask应用，避免阻塞主线程
-            self.web_thread = threading.Thread(target=self.run, daemon=True)
-            self.web_thread.start()
-        except Exception as e:
-            print(f"Web UI启动失败: {e}")
-            raise
-            
-    def stop(self):
-        """停止Web服务器"""
-        self.running = False
-        print("Web UI服务停止")
-        
-    def _create_static_files(self):
-        """创建静态文件"""
-        # 创建HTML模板
-        self._create_html_template()
-        
-        # 创建CSS文件
-        self._create_css_files()
-        
-        # 创建JavaScript文件
-        self._create_js_files()
-        
-    def _create_html_template(self):
-        """创建HTML模板 - 现在使用独立的模板文件"""
-        # HTML模板已移动到 templates/index.html
-        # 不再需要动态创建HTML文件
-        pass
-            
-    def _create_css_files(self):
-        """创建CSS文件"""
-        css_dir = Path(self._get_static_dir()) / "css"
-        css_dir.mkdir(exist_ok=True)
-        
-        css_content = '''/* 基础样式 */
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# 静态资源内容，导入时编码一次，写文件时直接使用bytes
+_CSS_CONTENT: bytes = '''/* 基础样式 */
 * {
     margin: 0;
     padding: 0;
@@ -771,18 +432,9 @@ main {
 @keyframes spin {
     0% { transform: rotate(0deg); }
     100% { transform: rotate(360deg); }
-}'''
-        
-        css_file = css_dir / "style.css"
-        with open(css_file, 'w', encoding='utf-8') as f:
-            f.write(css_content)
-            
-    def _create_js_files(self):
-        """创建JavaScript文件"""
-        js_dir = Path(self._get_static_dir()) / "js"
-        js_dir.mkdir(exist_ok=True)
-        
-        js_content = '''// 全局变量
+}'''.encode('utf-8')
+
+_JS_CONTENT: bytes = '''// 全局变量
 let currentConfig = {};
 
 // 页面加载完成后初始化
@@ -825,378 +477,924 @@ function initializePage() {
         if (e.key === 'Enter') {
             addMonitorUser();
         }
-    });
+    });
+    
+    document.getElementById('new-userid').addEventListener('keypress', function(e) {
+        if (e.key === 'Enter') {
+            addMonitorUser();
+        }
+    });
+}
+
+// 加载配置
+async function loadConfig() {
+    try {
+        const response = await fetch('/api/config');
+        const result = await response.json();
+        
+        if (result.success) {
+            currentConfig = result.data;
+            updateConfigForm();
+            showToast('配置加载成功', 'success');
+        } else {
+            showToast('加载配置失败: ' + result.error, 'error');
+        }
+    } catch (error) {
+        showToast('加载配置失败: ' + error.message, 'error');
+    }
+}
+
+// 更新配置表单
+function updateConfigForm() {
+    // WebUI配置
+    document.getElementById('webui-port').value = currentConfig.webui?.port || 10001;
+    
+    // 微信配置
+    document.getElementById('wechat-enabled').checked = currentConfig.wechat?.enabled || false;
+    document.getElementById('check-interval').value = currentConfig.wechat?.check_interval || 1.0;
+    
+    // OneBot配置
+    document.getElementById('onebot-enabled').checked = currentConfig.onebot?.enabled || false;
+    document.getElementById('ws-url').value = currentConfig.onebot?.ws_url || '';
+    document.getElementById('access-token').value = currentConfig.onebot?.access_token || '';
+}
+
+// 保存配置
+async function saveConfig() {
+    try {
+        // 收集表单数据
+        const config = {
+            webui: {
+                ...currentConfig.webui,
+                port: parseInt(document.getElementById('webui-port').value)
+            },
+            wechat: {
+                ...currentConfig.wechat,
+                enabled: document.getElementById('wechat-enabled').checked,
+                check_interval: parseFloat(document.getElementById('check-interval').value)
+            },
+            onebot: {
+                ...currentConfig.onebot,
+                enabled: document.getElementById('onebot-enabled').checked,
+                ws_url: document.getElementById('ws-url').value.trim(),
+                access_token: document.getElementById('access-token').value.trim()
+            }
+        };
+        
+        // 验证配置
+        const validateResponse = await fetch('/api/config/validate', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(config)
+        });
+        
+        const validateResult = await validateResponse.json();
+        
+        if (!validateResult.success) {
+            showToast('配置验证失败: ' + validateResult.error, 'error');
+            return;
+        }
+        
+        if (!validateResult.valid) {
+            showToast('配置验证失败: ' + validateResult.errors.join(', '), 'error');
+            return;
+        }
+        
+        // 保存配置
+        const response = await fetch('/api/config', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(config)
+        });
+        
+        const result = await response.json();
+        
+        if (result.success) {
+            currentConfig = config;
+            showToast('配置保存成功', 'success');
+        } else {
+            showToast('保存配置失败: ' + result.error, 'error');
+        }
+    } catch (error) {
+        showToast('保存配置失败: ' + error.message, 'error');
+    }
+}
+
+// 重置配置
+async function resetConfig() {
+    if (!confirm('确定要重置为默认配置吗？这将清除所有自定义设置。')) {
+        return;
+    }
+    
+    try {
+        // 这里应该调用重置API，暂时重新加载
+        await loadConfig();
+        showToast('配置已重置', 'info');
+    } catch (error) {
+        showToast('重置配置失败: ' + error.message, 'error');
+    }
+}
+
+// 加载监听用户列表
+async function loadMonitorUsers() {
+    try {
+        const response = await fetch('/api/monitor/users');
+        const result = await response.json();
+        
+        if (result.success) {
+            updateUsersList(result.data);
+        } else {
+            showToast('加载用户列表失败: ' + result.error, 'error');
+        }
+    } catch (error) {
+        showToast('加载用户列表失败: ' + error.message, 'error');
+    }
+}
+
+// 更新用户列表显示
+function updateUsersList(users) {
+    const usersList = document.getElementById('monitor-users-list');
+    usersList.innerHTML = '';
+    
+    if (users.length === 0) {
+        usersList.innerHTML = '<li style="text-align: center; color: #718096;">暂无监听用户</li>';
+        return;
+    }
+    
+    users.forEach(user => {
+        const li = document.createElement('li');
+        let displayName, removeKey;
+        
+        // 处理两种格式：字符串和对象
+        if (typeof user === 'string') {
+            displayName = user;
+            removeKey = user;
+        } else if (typeof user === 'object' && user.nickname) {
+            displayName = `${user.nickname} (QQ: ${user.user_id || 'N/A'})`;
+            removeKey = user.nickname;
+        } else {
+            displayName = JSON.stringify(user);
+            removeKey = user.nickname || user;
+        }
+        
+        li.innerHTML = `
+            <span><i class="fas fa-user"></i> ${displayName}</span>
+            <button class="btn btn-danger" onclick="removeMonitorUser('${removeKey.replace(/'/g, "\\'")}')">移除</button>
+        `;
+        usersList.appendChild(li);
+    });
+}
+
+// 添加监听用户
+async function addMonitorUser() {
+    const usernameInput = document.getElementById('new-username');
+    const useridInput = document.getElementById('new-userid');
+    const nickname = usernameInput.value.trim();
+    const user_id = useridInput.value.trim();
+    
+    if (!nickname) {
+        showToast('请输入用户昵称', 'error');
+        return;
+    }
+    
+    if (!user_id) {
+        showToast('请输入QQ号', 'error');
+        return;
+    }
+    
+    // 验证QQ号格式（纯数字）
+    if (!/^\d+$/.test(user_id)) {
+        showToast('QQ号必须是纯数字', 'error');
+        return;
+    }
+    
+    try {
+        const response = await fetch('/api/monitor/users', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ nickname, user_id })
+        });
+        
+        const result = await response.json();
+        
+        if (result.success) {
+            usernameInput.value = '';
+            useridInput.value = '';
+            await loadMonitorUsers();
+            showToast(result.message, 'success');
+        } else {
+            showToast('添加用户失败: ' + result.error, 'error');
+        }
+    } catch (error) {
+        showToast('添加用户失败: ' + error.message, 'error');
+    }
+}
+
+// 移除监听用户
+async function removeMonitorUser(username) {
+    if (!confirm(`确定要移除监听用户 "${username}" 吗？`)) {
+        return;
+    }
     
-    document.getElementById('new-userid').addEventListener('keypress', function(e) {
-        if (e.key === 'Enter') {
-            addMonitorUser();
+    try {
+        const response = await fetch(`/api/monitor/users/${encodeURIComponent(username)}`, {
+            method: 'DELETE'
+        });
+        
+        const result = await response.json();
+        
+        if (result.success) {
+            await loadMonitorUsers();
+            showToast(result.message, 'success');
+        } else {
+            showToast('移除用户失败: ' + result.error, 'error');
         }
-    });
+    } catch (error) {
+        showToast('移除用户失败: ' + error.message, 'error');
+    }
 }
 
-// 加载配置
-async function loadConfig() {
+// 更新系统状态
+async function updateStatus() {
     try {
-        const response = await fetch('/api/config');
+        const response = await fetch('/api/status');
         const result = await response.json();
         
         if (result.success) {
-            currentConfig = result.data;
-            updateConfigForm();
-            showToast('配置加载成功', 'success');
-        } else {
-            showToast('加载配置失败: ' + result.error, 'error');
+            const status = result.data;
+            
+            // 更新头部状态栏
+            updateStatusBar(status);
+            
+            // 更新状态页面
+            updateStatusPage(status);
         }
     } catch (error) {
-        showToast('加载配置失败: ' + error.message, 'error');
+        console.error('更新状态失败:', error);
     }
 }
 
-// 更新配置表单
-function updateConfigForm() {
-    // WebUI配置
-    document.getElementById('webui-port').value = currentConfig.webui?.port || 10001;
+// 更新状态栏
+function updateStatusBar(status) {
+    const wechatStatus = document.querySelector('#wechat-status .status-text');
+    const onebotStatus = document.querySelector('#onebot-status .status-text');
     
-    // 微信配置
-    document.getElementById('wechat-enabled').checked = currentConfig.wechat?.enabled || false;
-    document.getElementById('check-interval').value = currentConfig.wechat?.check_interval || 1.0;
+    if (wechatStatus) {
+        wechatStatus.textContent = status.wechat.running ? '运行中' : '已停止';
+        wechatStatus.style.color = status.wechat.running ? '#48bb78' : '#f56565';
+    }
     
-    // OneBot配置
-    document.getElementById('onebot-enabled').checked = currentConfig.onebot?.enabled || false;
-    document.getElementById('ws-url').value = currentConfig.onebot?.ws_url || '';
-    document.getElementById('access-token').value = currentConfig.onebot?.access_token || '';
+    if (onebotStatus) {
+        onebotStatus.textContent = status.onebot.connected ? '已连接' : '未连接';
+        onebotStatus.style.color = status.onebot.connected ? '#48bb78' : '#f56565';
+    }
 }
 
-// 保存配置
-async function saveConfig() {
+// 更新状态页面
+function updateStatusPage(status) {
+    // 微信状态
+    const wechatRunning = document.getElementById('wechat-running');
+    const wechatUsersCount = document.getElementById('wechat-users-count');
+    
+    if (wechatRunning) {
+        wechatRunning.textContent = status.wechat.running ? '运行中' : '已停止';
+        wechatRunning.style.color = status.wechat.running ? '#48bb78' : '#f56565';
+    }
+    
+    if (wechatUsersCount) {
+        wechatUsersCount.textContent = status.wechat.monitor_users.length;
+    }
+    
+    // OneBot状态
+    const onebotConnected = document.getElementById('onebot-connected');
+    const onebotUrl = document.getElementById('onebot-url');
+    
+    if (onebotConnected) {
+        onebotConnected.textContent = status.onebot.connected ? '已连接' : '未连接';
+        onebotConnected.style.color = status.onebot.connected ? '#48bb78' : '#f56565';
+    }
+    
+    if (onebotUrl) {
+        onebotUrl.textContent = status.onebot.ws_url || '未配置';
+    }
+}
+
+// 控制服务
+async function controlService(service, action) {
     try {
-        // 收集表单数据
-        const config = {
-            webui: {
-                ...currentConfig.webui,
-                port: parseInt(document.getElementById('webui-port').value)
-            },
-            wechat: {
-                ...currentConfig.wechat,
-                enabled: document.getElementById('wechat-enabled').checked,
-                check_interval: parseFloat(document.getElementById('check-interval').value)
-            },
-            onebot: {
-                ...currentConfig.onebot,
-                enabled: document.getElementById('onebot-enabled').checked,
-                ws_url: document.getElementById('ws-url').value.trim(),
-                access_token: document.getElementById('access-token').value.trim()
-            }
-        };
-        
-        // 验证配置
-        const validateResponse = await fetch('/api/config/validate', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(config)
-        });
-        
-        const validateResult = await validateResponse.json();
-        
-        if (!validateResult.success) {
-            showToast('配置验证失败: ' + validateResult.error, 'error');
-            return;
-        }
-        
-        if (!validateResult.valid) {
-            showToast('配置验证失败: ' + validateResult.errors.join(', '), 'error');
-            return;
-        }
-        
-        // 保存配置
-        const response = await fetch('/api/config', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(config)
+        const response = await fetch(`/api/control/${service}/${action}`, {
+            method: 'POST'
         });
         
         const result = await response.json();
         
         if (result.success) {
-            currentConfig = config;
-            showToast('配置保存成功', 'success');
+            showToast(result.message, 'success');
+            // 延迟更新状态
+            setTimeout(updateStatus, 1000);
         } else {
-            showToast('保存配置失败: ' + result.error, 'error');
+            showToast('操作失败: ' + result.error, 'error');
         }
     } catch (error) {
-        showToast('保存配置失败: ' + error.message, 'error');
+        showToast('操作失败: ' + error.message, 'error');
     }
 }
 
-// 重置配置
-async function resetConfig() {
-    if (!confirm('确定要重置为默认配置吗？这将清除所有自定义设置。')) {
-        return;
+// 刷新日志
+function refreshLogs() {
+    showToast('日志刷新功能开发中', 'info');
+}
+
+// 清空日志
+function clearLogs() {
+    if (confirm('确定要清空日志吗？')) {
+        document.getElementById('log-content').textContent = '日志已清空';
+        showToast('日志已清空', 'info');
     }
+}
+
+// 显示消息提示
+function showToast(message, type = 'info') {
+    const toast = document.getElementById('message-toast');
+    toast.textContent = message;
+    toast.className = `toast ${type}`;
     
-    try {
-        // 这里应该调用重置API，暂时重新加载
-        await loadConfig();
-        showToast('配置已重置', 'info');
-    } catch (error) {
-        showToast('重置配置失败: ' + error.message, 'error');
-    }
+    // 显示提示
+    setTimeout(() => {
+        toast.classList.add('show');
+    }, 100);
+    
+    // 3秒后隐藏
+    setTimeout(() => {
+        toast.classList.remove('show');
+    }, 3000);
 }
 
-// 加载监听用户列表
-async function loadMonitorUsers() {
-    try {
-        const response = await fetch('/api/monitor/users');
-        const result = await response.json();
+// 工具函数
+function formatBytes(bytes) {
+    if (bytes === 0) return '0 Bytes';
+    const k = 1024;
+    const sizes = ['Bytes', 'KB', 'MB', 'GB'];
+    const i = Math.floor(Math.log(bytes) / Math.log(k));
+    return parseFloat((bytes / Math.pow(k, i)).toFixed(2)) + ' ' + sizes[i];
+}
+
+function formatTime(timestamp) {
+    return new Date(timestamp).toLocaleString('zh-CN');
+}'''.encode('utf-8')
+
+# 页面实际引用的style.min.css/app.min.js内容
+_CSS_MIN_CONTENT: bytes = rcssmin.cssmin(_CSS_CONTENT.decode('utf-8')).encode('utf-8') if rcssmin else _CSS_CONTENT
+_JS_MIN_CONTENT: bytes = rjsmin.jsmin(_JS_CONTENT.decode('utf-8')).encode('utf-8') if rjsmin else _JS_CONTENT
+
+def _dumps_bytes(obj) -> bytes:
+    """将对象序列化为紧凑的JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# /api/status读取的配置路径，预先拆分避免每次轮询解析点号键
+_WECHAT_ENABLED_PATH = ('wechat', 'enabled')
+_MONITOR_USERS_PATH = ('wechat', 'monitor_users')
+_ONEBOT_ENABLED_PATH = ('onebot', 'enabled')
+_WS_URL_PATH = ('onebot', 'ws_url')
+_WEBUI_PORT_PATH = ('webui', 'port')
+
+def _json_response(body: bytes, status: int = 200) -> Response:
+    """用预先序列化的JSON bytes构造响应"""
+    return Response(body, status=status, mimetype='application/json', direct_passthrough=True)
+
+# 常见的固定响应，在导入时序列化一次
+_ERR_INVALID_JSON = _dumps_bytes({'success': False, 'error': '无效的JSON数据'})
+_ERR_EMPTY_NICKNAME = _dumps_bytes({'success': False, 'error': '昵称不能为空'})
+_ERR_EMPTY_USER_ID = _dumps_bytes({'success': False, 'error': '用户ID不能为空'})
+_ERR_EMPTY_USERNAME = _dumps_bytes({'success': False, 'error': '用户名不能为空'})
+_ERR_UPDATE_FAILED = _dumps_bytes({'success': False, 'error': '配置更新失败'})
+_ERR_ADD_USER_FAILED = _dumps_bytes({'success': False, 'error': '添加用户失败'})
+_ERR_REMOVE_USER_FAILED = _dumps_bytes({'success': False, 'error': '移除用户失败'})
+_ERR_INVALID_ACTION = _dumps_bytes({'success': False, 'error': '无效的操作'})
+_ERR_INVALID_SERVICE = _dumps_bytes({'success': False, 'error': '无效的服务'})
+_MSG_UPDATE_OK = _dumps_bytes({'success': True, 'message': '配置更新成功'})
+
+class ORJSONProvider(DefaultJSONProvider):
+    """基于orjson的Flask JSON提供器，jsonify和request.get_json都会经过这里"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=self._option()).decode('utf-8')
+        
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+        
+    def response(self, *args, **kwargs) -> Response:
+        # 直接使用orjson输出的bytes作为响应体，省去str编解码
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._option() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+        
+    def _option(self) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+class WebUI:
+    """Web用户界面"""
+    
+    def __init__(self, config_manager, wechat_monitor=None, onebot_client=None, websocket_client=None, message_handler=None):
+        """初始化WebUI
+        
+        Args:
+            config_manager: 配置管理器
+            wechat_monitor: 微信监听器
+            onebot_client: OneBot客户端
+            websocket_client: WebSocket客户端
+            message_handler: 消息处理器
+        """
+        self.config_manager = config_manager
+        self.wechat_monitor = wechat_monitor
+        self.onebot_client = onebot_client
+        self.websocket_client = websocket_client
+        self.message_handler = message_handler
+        
+        # 模板和静态文件目录只解析、创建一次
+        self._template_dir = self._get_template_dir()
+        self._static_dir = self._get_static_dir()
+        
+        # 创建Flask应用
+        # 静态文件由_setup_routes中的自定义路由提供，以便设置缓存策略
+        self.app = Flask(__name__, 
+                        template_folder=str(self._template_dir),
+                        static_folder=None)
+        if orjson is not None:
+            self.app.json = ORJSONProvider(self.app)
+        
+        # 设置路由
+        self._setup_routes()
         
-        if (result.success) {
-            updateUsersList(result.data);
-        } else {
-            showToast('加载用户列表失败: ' + result.error, 'error');
-        }
-    } catch (error) {
-        showToast('加载用户列表失败: ' + error.message, 'error');
-    }
-}
-
-// 更新用户列表显示
-function updateUsersList(users) {
-    const usersList = document.getElementById('monitor-users-list');
-    usersList.innerHTML = '';
-    
-    if (users.length === 0) {
-        usersList.innerHTML = '<li style="text-align: center; color: #718096;">暂无监听用户</li>';
-        return;
-    }
-    
-    users.forEach(user => {
-        const li = document.createElement('li');
-        let displayName, removeKey;
+        self.running = False
         
-        // 处理两种格式：字符串和对象
-        if (typeof user === 'string') {
-            displayName = user;
-            removeKey = user;
-        } else if (typeof user === 'object' && user.nickname) {
-            displayName = `${user.nickname} (QQ: ${user.user_id || 'N/A'})`;
-            removeKey = user.nickname;
-        } else {
-            displayName = JSON.stringify(user);
-            removeKey = user.nickname || user;
-        }
+        # /api/status响应缓存（生成时间, 响应体），前端每5秒轮询，短时间内复用
+        self._status_cache = (0.0, b'')
+        self._status_ttl = 1.5
+        
+        # 上次成功更新配置的(请求体摘要, 更新后的配置版本号)
+        self._last_update = (b'', -1)
+        
+        # 渲染后的主页HTML，首次访问时生成
+        self._index_html = None
+        
+        # 已预压缩的静态文件（相对static目录的路径），由_create_static_files填充
+        self._gzip_files = set()
+        
+        # 配置保存延迟合并，避免在请求线程中同步写文件
+        self._save_delay = 0.5
+        self._save_timer = None
+        self._save_lock = threading.Lock()
+        atexit.register(self._flush_save)
+        
+    def _invalidate_status(self):
+        """使状态缓存失效，下一次请求重新生成"""
+        self._status_cache = (0.0, b'')
+        
+    def _schedule_save(self):
+        """延迟保存配置，窗口期内的多次变更只写一次文件"""
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self._save_delay, self._flush_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+            
+    def _flush_save(self):
+        """立即保存待写入的配置变更"""
+        with self._save_lock:
+            if self._save_timer is None:
+                return
+            self._save_timer.cancel()
+            self._save_timer = None
+            
+        self.config_manager.save_config()
+        
+    def _get_template_dir(self) -> Path:
+        """获取模板目录"""
+        # 模板目录在src/templates
+        template_dir = Path(__file__).parent / "templates"
+        if not template_dir.is_dir():
+            template_dir.mkdir(parents=True, exist_ok=True)
+        return template_dir
+        
+    def _get_static_dir(self) -> Path:
+        """获取静态文件目录"""
+        project_root = Path(__file__).parent.parent
+        static_dir = project_root / "static"
+        if not static_dir.is_dir():
+            static_dir.mkdir(parents=True, exist_ok=True)
+        return static_dir
+        
+    def _setup_routes(self):
+        """设置路由"""
+        
+        # 跨域：界面只在本地访问，固定允许所有来源，无需逐请求解析Origin
+        @self.app.before_request
+        def handle_preflight():
+            """预检请求直接返回，不进入视图逻辑"""
+            if request.method == 'OPTIONS':
+                response = Response(status=204)
+                response.headers['Access-Control-Allow-Methods'] = 'GET, POST, DELETE, OPTIONS'
+                return response
+                
+        @self.app.after_request
+        def add_cors_headers(response):
+            """为所有响应添加跨域头"""
+            headers = response.headers
+            headers['Access-Control-Allow-Origin'] = '*'
+            headers['Access-Control-Allow-Headers'] = 'Content-Type'
+            return response
+        
+        @self.app.route('/static/<path:filename>', endpoint='static')
+        def static_files(filename):
+            """静态文件，允许浏览器缓存1小时，并支持条件请求返回304"""
+            if filename in self._gzip_files and 'gzip' in request.headers.get('Accept-Encoding', ''):
+                # 客户端支持gzip时直接发送启动时压缩好的文件
+                response = send_from_directory(self._static_dir, filename + '.gz',
+                                               mimetype=mimetypes.guess_type(filename)[0],
+                                               conditional=True, max_age=3600)
+                response.headers['Content-Encoding'] = 'gzip'
+            else:
+                response = send_from_directory(self._static_dir, filename, conditional=True, max_age=3600)
+            response.vary.add('Accept-Encoding')
+            return response
+        
+        @self.app.route('/')
+        def index():
+            """主页"""
+            # 模板不依赖请求参数，首次请求渲染后缓存结果；调试模式下每次重新渲染便于修改模板
+            html = self._index_html
+            if html is None or self.app.debug:
+                html = render_template('index.html').encode('utf-8')
+                self._index_html = html
+            return Response(html, mimetype='text/html')
+            
+        @self.app.route('/api/config', methods=['GET'])
+        def get_config():
+            """获取配置"""
+            try:
+                # 直接拼接缓存的配置JSON，避免每次请求复制并重新序列化整份配置
+                config_json = self.config_manager.get_all_json_bytes()
+                response = _json_response(b'{"success":true,"data":' + config_json + b'}')
+                
+                # 配置未变化时返回304，浏览器复用已缓存的响应
+                response.set_etag(hashlib.blake2b(config_json, digest_size=8).hexdigest())
+                response.cache_control.no_cache = True
+                return response.make_conditional(request)
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+                
+        @self.app.route('/api/config', methods=['POST'])
+        def update_config():
+            """更新配置"""
+            try:
+                # 与上次成功提交的内容相同且配置未被其他途径修改时，无需重复更新
+                digest = hashlib.blake2b(request.get_data(), digest_size=16).digest()
+                if self._last_update == (digest, self.config_manager.version):
+                    return _json_response(_MSG_UPDATE_OK)
+                    
+                data = request.get_json()
+                if not data:
+                    return _json_response(_ERR_INVALID_JSON, 400)
+                    
+                # 更新配置
+                success = self.config_manager.update(data)
+                if success:
+                    self._last_update = (digest, self.config_manager.version)
+                    # 保存配置（延迟写入）
+                    self._schedule_save()
+                    self._invalidate_status()
+                    return _json_response(_MSG_UPDATE_OK)
+                else:
+                    return _json_response(_ERR_UPDATE_FAILED, 500)
+                    
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+                
+        @self.app.route('/api/config/validate', methods=['POST'])
+        def validate_config():
+            """验证配置"""
+            try:
+                data = request.get_json()
+                if not data:
+                    return _json_response(_ERR_INVALID_JSON, 400)
+                    
+                # 在合并后的副本上验证，不修改当前配置
+                errors = self.config_manager.validate(data)
+                
+                return jsonify({
+                    'success': True,
+                    'valid': len(errors) == 0,
+                    'errors': errors
+                })
+                
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+                
+        @self.app.route('/api/monitor/users', methods=['GET'])
+        def get_monitor_users():
+            """获取监听用户列表"""
+            try:
+                users = self.config_manager.get_monitor_users()
+                return jsonify({
+                    'success': True,
+                    'data': users
+                })
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+                
+        @self.app.route('/api/monitor/users', methods=['POST'])
+        def add_monitor_user():
+            """添加监听用户"""
+            try:
+                data = request.get_json()
+                
+                # 支持新格式（nickname + user_id）和旧格式（username）
+                if 'nickname' in data and 'user_id' in data:
+                    # 新格式：包含昵称和用户ID的映射
+                    nickname = data.get('nickname', '').strip()
+                    user_id = data.get('user_id', '').strip()
+                    
+                    if not nickname:
+                        return _json_response(_ERR_EMPTY_NICKNAME, 400)
+                        
+                    if not user_id:
+                        return _json_response(_ERR_EMPTY_USER_ID, 400)
+                    
+                    user_data = {
+                        'nickname': nickname,
+                        'user_id': user_id
+                    }
+                    success = self.config_manager.add_monitor_user(user_data)
+                    display_name = f'{nickname} (QQ: {user_id})'
+                else:
+                    # 旧格式：仅用户名
+                    username = data.get('username', '').strip()
+                    
+                    if not username:
+                        return _json_response(_ERR_EMPTY_USERNAME, 400)
+                        
+                    success = self.config_manager.add_monitor_user(username)
+                    display_name = username
+                
+                if success:
+                    self._schedule_save()
+                    self._invalidate_status()
+                    return jsonify({
+                        'success': True,
+                        'message': f'已添加监听用户: {display_name}'
+                    })
+                else:
+                    return _json_response(_ERR_ADD_USER_FAILED, 500)
+                    
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+                
+        @self.app.route('/api/monitor/users/<username>', methods=['DELETE'])
+        def remove_monitor_user(username):
+            """移除监听用户"""
+            try:
+                success = self.config_manager.remove_monitor_user(username)
+                if success:
+                    self._schedule_save()
+                    self._invalidate_status()
+                    return jsonify({
+                        'success': True,
+                        'message': f'已移除监听用户: {username}'
+                    })
+                else:
+                    return _json_response(_ERR_REMOVE_USER_FAILED, 500)
+                    
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+                
+        @self.app.route('/api/status', methods=['GET'])
+        def get_status():
+            """获取系统状态"""
+            try:
+                now = time.monotonic()
+                cached_at, body = self._status_cache
+                if body and now - cached_at < self._status_ttl:
+                    return _json_response(body)
+                    
+                # is_connected是WebSocketClient维护的普通属性（不会发起ping），
+                # 整个响应体已按_status_ttl缓存，无需对连接状态单独缓存
+                get_path = self.config_manager.get_path
+                status = {
+                    'wechat': {
+                        'enabled': get_path(_WECHAT_ENABLED_PATH, False),
+                        'running': self.wechat_monitor.is_running if self.wechat_monitor else False,
+                        'monitor_users': get_path(_MONITOR_USERS_PATH, [])
+                    },
+                    'onebot': {
+                        'enabled': get_path(_ONEBOT_ENABLED_PATH, False),
+                        'connected': self.websocket_client.is_connected if self.websocket_client else False,
+                        'ws_url': get_path(_WS_URL_PATH, '')
+                    },
+                    'webui': {
+                        'running': self.running,
+                        'port': get_path(_WEBUI_PORT_PATH, 10001)
+                    }
+                }
+                
+                body = _dumps_bytes({
+                    'success': True,
+                    'data': status
+                })
+                self._status_cache = (now, body)
+                return _json_response(body)
+                
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+                
+        @self.app.route('/api/control/<service>/<action>', methods=['POST'])
+        def control_service(service, action):
+            """控制服务"""
+            try:
+                if service == 'wechat' and self.wechat_monitor:
+                    if action == 'start':
+                        result = self.wechat_monitor.start()
+                        message = '微信监听已启动' if result else '微信监听启动失败'
+                    elif action == 'stop':
+                        result = self.wechat_monitor.stop()
+                        message = '微信监听已停止' if result else '微信监听停止失败'
+                    else:
+                        return _json_response(_ERR_INVALID_ACTION, 400)
+                        
+                elif service == 'onebot' and self.onebot_client:
+                    if action == 'start':
+                        result = self.onebot_client.start()
+                        message = 'OneBot客户端已启动' if result else 'OneBot客户端启动失败'
+                    elif action == 'stop':
+                        result = self.onebot_client.stop()
+                        message = 'OneBot客户端已停止' if result else 'OneBot客户端停止失败'
+                    else:
+                        return _json_response(_ERR_INVALID_ACTION, 400)
+                else:
+                    return _json_response(_ERR_INVALID_SERVICE, 400)
+                    
+                if result:
+                    self._invalidate_status()
+                    
+                return jsonify({
+                    'success': result,
+                    'message': message
+                })
+                
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+                
+    def run(self):
+        """启动Web服务器"""
+        if self.running:
+            return
+            
+        self.running = True
         
-        li.innerHTML = `
-            <span><i class="fas fa-user"></i> ${displayName}</span>
-            <button class="btn btn-danger" onclick="removeMonitorUser('${removeKey.replace(/'/g, "\\'")}')">移除</button>
-        `;
-        usersList.appendChild(li);
-    });
-}
-
-// 添加监听用户
-async function addMonitorUser() {
-    const usernameInput = document.getElementById('new-username');
-    const useridInput = document.getElementById('new-userid');
-    const nickname = usernameInput.value.trim();
-    const user_id = useridInput.value.trim();
-    
-    if (!nickname) {
-        showToast('请输入用户昵称', 'error');
-        return;
-    }
-    
-    if (!user_id) {
-        showToast('请输入QQ号', 'error');
-        return;
-    }
-    
-    // 验证QQ号格式（纯数字）
-    if (!/^\d+$/.test(user_id)) {
-        showToast('QQ号必须是纯数字', 'error');
-        return;
-    }
-    
-    try {
-        const response = await fetch('/api/monitor/users', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ nickname, user_id })
-        });
+        # 创建静态文件
+        self._create_static_files()
         
-        const result = await response.json();
+        host = self.config_manager.get('webui.host', '0.0.0.0')
+        port = self.config_manager.get('webui.port', 10001)
+        debug = self.config_manager.get('webui.debug', False)
         
-        if (result.success) {
-            usernameInput.value = '';
-            useridInput.value = '';
-            await loadMonitorUsers();
-            showToast(result.message, 'success');
-        } else {
-            showToast('添加用户失败: ' + result.error, 'error');
-        }
-    } catch (error) {
-        showToast('添加用户失败: ' + error.message, 'error');
-    }
-}
-
-// 移除监听用户
-async function removeMonitorUser(username) {
-    if (!confirm(`确定要移除监听用户 "${username}" 吗？`)) {
-        return;
-    }
-    
-    try {
-        const response = await fetch(`/api/monitor/users/${encodeURIComponent(username)}`, {
-            method: 'DELETE'
-        });
+        try:
+            if serve is not None and not debug:
+                serve(self.app, host=host, port=port, threads=self.config_manager.get('webui.threads', 8))
+            else:
+                # 调试模式需要Werkzeug的调试器，仍使用开发服务器
+                self.app.run(host=host, port=port, debug=debug, threaded=True)
+        except Exception as e:
+            print(f"Web服务器启动失败: {e}")
+            self.running = False
+            
+    def start(self):
+        """启动Web UI服务"""
+        try:
+            port = self.config_manager.get('webui.port', 10001)
+            print(f"启动Web UI服务，端口: {port}")
+            # 在单独的线程中启动Flask应用，避免阻塞主线程
+            self.web_thread = threading.Thread(target=self.run, daemon=True)
+            self.web_thread.start()
+        except Exception as e:
+            print(f"Web UI启动失败: {e}")
+            raise
+            
+    def stop(self):
+        """停止Web服务器"""
+        self.running = False
+        self._flush_save()
+        print("Web UI服务停止")
         
-        const result = await response.json();
+    def _create_static_files(self):
+        """创建静态文件"""
+        # 创建HTML模板
+        self._create_html_template()
         
-        if (result.success) {
-            await loadMonitorUsers();
-            showToast(result.message, 'success');
-        } else {
-            showToast('移除用户失败: ' + result.error, 'error');
-        }
-    } catch (error) {
-        showToast('移除用户失败: ' + error.message, 'error');
-    }
-}
-
-// 更新系统状态
-async function updateStatus() {
-    try {
-        const response = await fetch('/api/status');
-        const result = await response.json();
+        # 创建CSS文件
+        self._create_css_files()
         
-        if (result.success) {
-            const status = result.data;
+        # 创建JavaScript文件
+        self._create_js_files()
+        
+    def _create_html_template(self):
+        """创建HTML模板 - 现在使用独立的模板文件"""
+        # HTML模板已移动到 templates/index.html
+        # 不再需要动态创建HTML文件
+        pass
             
-            // 更新头部状态栏
-            updateStatusBar(status);
+    def _create_css_files(self):
+        """创建CSS文件"""
+        css_dir = self._static_dir / "css"
+        css_dir.mkdir(exist_ok=True)
+        
+        self._write_if_changed(css_dir / "style.css", _CSS_CONTENT)
+        self._write_if_changed(css_dir / "style.min.css", _CSS_MIN_CONTENT)
+        self._write_gzip(css_dir / "style.min.css")
             
-            // 更新状态页面
-            updateStatusPage(status);
-        }
-    } catch (error) {
-        console.error('更新状态失败:', error);
-    }
-}
-
-// 更新状态栏
-function updateStatusBar(status) {
-    const wechatStatus = document.querySelector('#wechat-status .status-text');
-    const onebotStatus = document.querySelector('#onebot-status .status-text');
-    
-    if (wechatStatus) {
-        wechatStatus.textContent = status.wechat.running ? '运行中' : '已停止';
-        wechatStatus.style.color = status.wechat.running ? '#48bb78' : '#f56565';
-    }
-    
-    if (onebotStatus) {
-        onebotStatus.textContent = status.onebot.connected ? '已连接' : '未连接';
-        onebotStatus.style.color = status.onebot.connected ? '#48bb78' : '#f56565';
-    }
-}
-
-// 更新状态页面
-function updateStatusPage(status) {
-    // 微信状态
-    const wechatRunning = document.getElementById('wechat-running');
-    const wechatUsersCount = document.getElementById('wechat-users-count');
-    
-    if (wechatRunning) {
-        wechatRunning.textContent = status.wechat.running ? '运行中' : '已停止';
-        wechatRunning.style.color = status.wechat.running ? '#48bb78' : '#f56565';
-    }
-    
-    if (wechatUsersCount) {
-        wechatUsersCount.textContent = status.wechat.monitor_users.length;
-    }
-    
-    // OneBot状态
-    const onebotConnected = document.getElementById('onebot-connected');
-    const onebotUrl = document.getElementById('onebot-url');
-    
-    if (onebotConnected) {
-        onebotConnected.textContent = status.onebot.connected ? '已连接' : '未连接';
-        onebotConnected.style.color = status.onebot.connected ? '#48bb78' : '#f56565';
-    }
-    
-    if (onebotUrl) {
-        onebotUrl.textContent = status.onebot.ws_url || '未配置';
-    }
-}
-
-// 控制服务
-async function controlService(service, action) {
-    try {
-        const response = await fetch(`/api/control/${service}/${action}`, {
-            method: 'POST'
-        });
+    def _create_js_files(self):
+        """创建JavaScript文件"""
+        js_dir = self._static_dir / "js"
+        js_dir.mkdir(exist_ok=True)
         
-        const result = await response.json();
+        self._write_if_changed(js_dir / "app.js", _JS_CONTENT)
+        self._write_if_changed(js_dir / "app.min.js", _JS_MIN_CONTENT)
+        self._write_gzip(js_dir / "app.min.js")
         
-        if (result.success) {
-            showToast(result.message, 'success');
-            // 延迟更新状态
-            setTimeout(updateStatus, 1000);
-        } else {
-            showToast('操作失败: ' + result.error, 'error');
-        }
-    } catch (error) {
-        showToast('操作失败: ' + error.message, 'error');
-    }
-}
-
-// 刷新日志
-function refreshLogs() {
-    showToast('日志刷新功能开发中', 'info');
-}
-
-// 清空日志
-function clearLogs() {
-    if (confirm('确定要清空日志吗？')) {
-        document.getElementById('log-content').textContent = '日志已清空';
-        showToast('日志已清空', 'info');
-    }
-}
-
-// 显示消息提示
-function showToast(message, type = 'info') {
-    const toast = document.getElementById('message-toast');
-    toast.textContent = message;
-    toast.className = `toast ${type}`;
-    
-    // 显示提示
-    setTimeout(() => {
-        toast.classList.add('show');
-    }, 100);
-    
-    // 3秒后隐藏
-    setTimeout(() => {
-        toast.classList.remove('show');
-    }, 3000);
-}
-
-// 工具函数
-function formatBytes(bytes) {
-    if (bytes === 0) return '0 Bytes';
-    const k = 1024;
-    const sizes = ['Bytes', 'KB', 'MB', 'GB'];
-    const i = Math.floor(Math.log(bytes) / Math.log(k));
-    return parseFloat((bytes / Math.pow(k, i)).toFixed(2)) + ' ' + sizes[i];
-}
-
-function formatTime(timestamp) {
-    return new Date(timestamp).toLocaleString('zh-CN');
-}'''
+    def _write_gzip(self, file_path: Path):
+        """为静态文件生成预压缩的.gz副本，请求时无需再压缩
+        
+        Args:
+            file_path: 静态文件路径
+        """
+        try:
+            # mtime固定为0，内容不变时压缩结果也不变
+            compressed = gzip.compress(file_path.read_bytes(), compresslevel=9, mtime=0)
+            gz_path = file_path.with_name(file_path.name + '.gz')
+            try:
+                unchanged = gz_path.read_bytes() == compressed
+            except OSError:
+                unchanged = False
+            if not unchanged:
+                gz_path.write_bytes(compressed)
+            self._gzip_files.add(file_path.relative_to(self._static_dir).as_posix())
+        except OSError as e:
+            print(f"生成压缩静态文件失败: {e}")
+            
+    def _write_if_changed(self, file_path: Path, content: bytes) -> bool:
+        """仅当文件内容变化时写入，避免每次启动都重写静态文件
         
-        js_file = js_dir / "app.js"
-        with open(js_file, 'w', encoding='utf-8') as f:
-            f.write(js_content)
\ No newline at end of file
+        Args:
+            file_path: 目标文件
+            content: 文件内容
+            
+        Returns:
+            是否写入了文件
+        """
+        try:
+            existing = file_path.read_bytes()
+        except OSError:
+            existing = None
+            
+        # 比较时忽略换行符差异（仓库中的文件为CRLF）
+        if existing is not None and existing.replace(b'\r\n', b'\n') == content:
+            return False
+            
+        file_path.write_bytes(content)
+        return True
\ No newline at end of file
@@ -7,20 +7,40 @@
 
 import json
 import time
+import random
+import socket
 import threading
 from typing import Dict, Any, Callable, Optional
 import websocket
-from queue import Queue, Empty
+from collections import deque
 
 try:
     from astrbot.api import logger
 except ImportError:
-    # 独立运行模式的简单日志记录器
-    class SimpleLogger:
-        def info(self, msg): print(f"[INFO] {msg}")
-        def error(self, msg): print(f"[ERROR] {msg}")
-        def warning(self, msg): print(f"[WARNING] {msg}")
-    logger = SimpleLogger()
+    # 在独立运行模式下，使用标准库logging输出到stderr
+    import logging
+    logger = logging.getLogger('wxauto_repost')
+    if not logger.handlers:
+        _handler = logging.StreamHandler()
+        _handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
+        logger.addHandler(_handler)
+        logger.setLevel(logging.INFO)
+
+# orjson为可选依赖，未安装时回退到标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _dumps(obj: Any) -> bytes:
+    """序列化消息为UTF-8 bytes，以文本帧发送时websocket-client不再重复编码"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    # 与orjson输出保持一致：紧凑分隔符，非ASCII字符直接输出（比\uXXXX转义更短）
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# orjson.JSONDecodeError是json.JSONDecodeError的子类，异常处理无需区分
+_loads = orjson.loads if orjson is not None else json.loads
 
 class WebSocketClient:
     """反向WebSocket客户端"""
@@ -38,16 +58,25 @@ class WebSocketClient:
         # WebSocket连接
         self.ws = None
         self.ws_url = ""
+        # 连接参数在start()/update_config()时从配置读取并缓存
+        self._access_token = None
+        self._headers: Dict[str, str] = {}
+        self._sockopt: tuple = ()
         self.is_connected = False
         self.is_running = False
         
         # 线程管理
         self.connect_thread = None
-        self.heartbeat_thread = None
+        # 连接线程在该事件上等待：start()触发首次连接，需要重连或stop()时唤醒
+        self._reconnect_event = threading.Event()
+        # 心跳由一次性定时器驱动，发送后重新定时，无需常驻线程轮询
+        self._hb_timer: Optional[threading.Timer] = None
+        self._hb_lock = threading.Lock()
         
-        # 消息队列
-        self.send_queue = Queue()
-        self.receive_queue = Queue()
+        # 消息队列：deque的append/popleft是原子操作，无需Queue额外的锁和条件变量
+        # 发送队列有上限，长时间断线时不会无限积压；满时丢弃最早的消息
+        self.send_queue = deque(maxlen=1024)
+        self.receive_queue = deque()
         
         # 回调函数
         self.on_message_callback = None
@@ -55,13 +84,22 @@ class WebSocketClient:
         self.on_disconnect_callback = None
         
         # 重连配置
-        self.reconnect_interval = 5  # 重连间隔（秒）
-        self.max_reconnect_attempts = 10  # 最大重连次数
+        self.reconnect_interval = 5  # 重连间隔（秒），即每次重连的最短等待时间和退避基数
+        self.max_reconnect_attempts = 10  # 最大重连次数，超过后按退避上限间隔持续重试
         self.reconnect_attempts = 0
+        # 指数退避（带抖动）：第n次重连等待 uniform(interval, min(cap, interval * 2^n)) 秒
+        self.backoff_cap = 60.0
+        # 下一次重连的最短等待时间：服务端要求稍后再连（1012/1013）或配置变更冷却期内
+        self._backoff_floor = 0.0
+        # 配置变更导致的重连之间至少间隔的时间（秒）
+        self._restart_cooldown = 10.0
+        self._last_restart = float('-inf')
         
         # 心跳配置
         self.heartbeat_interval = 30  # 心跳间隔（秒）
         self.last_heartbeat = 0
+        # 心跳包除time外的JSON片段 (配置版本号, 已编码的片段)，配置变化后重新生成
+        self._hb_template = (-1, b'')
         
     def set_callbacks(self, on_message: Callable = None, on_connect: Callable = None, on_disconnect: Callable = None):
         """设置回调函数
@@ -82,29 +120,27 @@ class WebSocketClient:
             是否启动成功
         """
         try:
-            # 获取WebSocket地址
+            # 获取WebSocket地址及连接参数
             self.ws_url = self.config_manager.get('onebot.ws_url', '')
+            self._load_config()
             if not self.ws_url:
                 logger.error("错误: 未配置反向WebSocket地址")
                 return False
                 
-            logger.info(f"启动WebSocket客户端，连接地址: {self.ws_url}")
+            logger.info("启动WebSocket客户端，连接地址: %s", self.ws_url)
             
             self.is_running = True
             self.reconnect_attempts = 0
             
-            # 启动连接线程
+            # 启动连接线程，并立即触发首次连接
+            self._reconnect_event.set()
             self.connect_thread = threading.Thread(target=self._connect_loop, daemon=True)
             self.connect_thread.start()
             
-            # 启动心跳线程
-            self.heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
-            self.heartbeat_thread.start()
-            
             return True
             
         except Exception as e:
-            logger.error(f"启动WebSocket客户端失败: {e}")
+            logger.error("启动WebSocket客户端失败: %s", e)
             return False
             
     def stop(self):
@@ -112,6 +148,9 @@ class WebSocketClient:
         logger.info("停止WebSocket客户端")
         
         self.is_running = False
+        self._cancel_heartbeat()
+        # 唤醒可能正在等待重连的连接线程
+        self._reconnect_event.set()
         
         # 关闭WebSocket连接
         if self.ws:
@@ -127,9 +166,6 @@ class WebSocketClient:
         if self.connect_thread and self.connect_thread.is_alive():
             self.connect_thread.join(timeout=2)
             
-        if self.heartbeat_thread and self.heartbeat_thread.is_alive():
-            self.heartbeat_thread.join(timeout=2)
-            
     def send_message(self, message: Dict[str, Any]) -> bool:
         """发送消息
         
@@ -139,25 +175,81 @@ class WebSocketClient:
         Returns:
             是否发送成功
         """
+        ws = self.ws
+        if not self.is_connected or not ws:
+            logger.warning("WebSocket未连接，消息加入发送队列")
+            self._enqueue(message)
+            return False
+            
+        # 转换为JSON；序列化失败的消息重发也不会成功，不放入队列
         try:
-            if not self.is_connected or not self.ws:
-                logger.warning("WebSocket未连接，消息加入发送队列")
-                self.send_queue.put(message)
-                return False
-                
-            # 转换为JSON并发送
-            json_data = json.dumps(message, ensure_ascii=False)
-            self.ws.send(json_data)
+            json_data = _dumps(message)
+        except Exception as e:
+            logger.error("序列化消息失败: %s", e)
+            return False
             
-            logger.info(f"发送消息: {message.get('post_type', 'unknown')}")
-            return True
+        try:
+            ws.send(json_data)
+        except Exception as e:
+            logger.error("发送消息失败: %s", e)
+            # 只有连接已断开时才入队等待重连后重发；连接仍标记为可用说明是偶发错误，
+            # 重新入队可能导致已部分发出的消息被重复发送
+            if not self.is_connected:
+                self._enqueue(message)
+            return False
+            
+        logger.debug("发送消息: %s", message.get('post_type', 'unknown'))
+        return True
+        
+    def _enqueue(self, message: Dict[str, Any]):
+        """将消息加入发送队列，队列已满时丢弃最早的消息
+        
+        Args:
+            message: 待发送的消息
+        """
+        if len(self.send_queue) >= self.send_queue.maxlen:
+            logger.warning("发送队列已满(%s)，丢弃最早的消息", self.send_queue.maxlen)
+        self.send_queue.append(message)
+            
+    def send_raw(self, payload: bytes) -> bool:
+        """直接发送已序列化的消息，连接不可用时直接丢弃（不进入发送队列）
+        
+        Args:
+            payload: UTF-8编码的JSON
+            
+        Returns:
+            是否发送成功
+        """
+        ws = self.ws
+        if not self.is_connected or not ws:
+            return False
             
+        try:
+            ws.send(payload)
+            return True
         except Exception as e:
-            logger.error(f"发送消息失败: {e}")
-            # 将消息加入队列等待重发
-            self.send_queue.put(message)
+            logger.error("发送消息失败: %s", e)
             return False
             
+    def _heartbeat_payload(self, timestamp: int) -> bytes:
+        """生成心跳包JSON，只有time字段需要每次拼接
+        
+        Args:
+            timestamp: 心跳时间戳
+            
+        Returns:
+            UTF-8编码的心跳包JSON
+        """
+        version = self.config_manager.version
+        template_version, template = self._hb_template
+        if template_version != version:
+            heartbeat = self.onebot_converter.create_heartbeat()
+            heartbeat.pop('time', None)
+            # 去掉开头的'{'，发送时把time字段拼接在最前面
+            template = _dumps(heartbeat)[1:]
+            self._hb_template = (version, template)
+        return b'{"time":%d,' % timestamp + template
+        
     def send_wechat_message(self, wechat_msg: Dict[str, Any]) -> bool:
         """发送微信消息（自动转换为OneBotV11格式）
         
@@ -173,7 +265,7 @@ class WebSocketClient:
             return self.send_message(onebot_msg)
             
         except Exception as e:
-            logger.error(f"❌ 发送微信消息失败: {e}")
+            logger.error("❌ 发送微信消息失败: %s", e)
             return False
             
     def get_received_message(self) -> Optional[Dict[str, Any]]:
@@ -183,43 +275,40 @@ class WebSocketClient:
             接收到的消息，如果没有则返回None
         """
         try:
-            return self.receive_queue.get_nowait()
-        except Empty:
+            return self.receive_queue.popleft()
+        except IndexError:
             return None
             
     def _connect_loop(self):
         """连接循环"""
+        event = self._reconnect_event
         while self.is_running:
-            try:
-                if not self.is_connected:
-                    self._connect()
-                    
-                time.sleep(1)
+            # 没有需要建立的连接时阻塞等待，不再每秒轮询连接状态
+            event.wait()
+            event.clear()
+            if not self.is_running:
+                break
                 
+            try:
+                # run_forever返回说明连接已断开或未能建立
+                self._connect()
             except Exception as e:
-                logger.error(f"连接循环异常: {e}")
-                time.sleep(self.reconnect_interval)
+                logger.error("连接循环异常: %s", e)
+                
+            # 只有停止时才结束连接线程，后端长时间不可用也会持续重试
+            if not (self.is_running and self._handle_reconnect()):
+                break
+            event.set()
                 
     def _connect(self):
         """建立WebSocket连接"""
         try:
-            logger.info(f"尝试连接WebSocket: {self.ws_url}")
-            
-            # 准备连接头
-            headers = {}
-            access_token = self.config_manager.get('onebot.access_token', '')
-            if access_token:
-                headers['Authorization'] = f'Bearer {access_token}'
-                logger.info("已添加access_token认证")
+            logger.info("尝试连接WebSocket: %s", self.ws_url)
             
-            # 添加OneBotV11标准要求的头部信息
-            headers['X-Self-ID'] = '10001000'  # 机器人QQ号，可以从配置获取
-            headers['X-Client-Role'] = 'Universal'  # 客户端类型：Universal支持API和Event
-            
-            # 创建WebSocket连接
+            # 创建WebSocket连接（连接头在读取配置时已生成，重连时直接复用）
             self.ws = websocket.WebSocketApp(
                 self.ws_url,
-                header=headers,
+                header=self._headers,
                 on_open=self._on_open,
                 on_message=self._on_message,
                 on_error=self._on_error,
@@ -227,11 +316,12 @@ class WebSocketClient:
             )
             
             # 启动连接（阻塞）
-            self.ws.run_forever()
+            # 收到的文本帧随后会交给JSON解析（本身会校验UTF-8），跳过库内的重复校验；
+            # 保持ping_interval为默认的0，连接保活由OneBot心跳负责
+            self.ws.run_forever(skip_utf8_validation=True, sockopt=self._sockopt)
             
         except Exception as e:
-            logger.error(f"WebSocket连接失败: {e}")
-            self._handle_reconnect()
+            logger.error("WebSocket连接失败: %s", e)
             
     def _on_open(self, ws):
         """WebSocket连接打开回调"""
@@ -247,99 +337,158 @@ class WebSocketClient:
         # 处理发送队列中的消息
         self._process_send_queue()
         
+        # 连接建立后开始定时发送心跳
+        self._arm_heartbeat()
+        
         # 调用连接回调
         if self.on_connect_callback:
             try:
                 self.on_connect_callback()
             except Exception as e:
-                logger.error(f"连接回调执行失败: {e}")
+                logger.error("连接回调执行失败: %s", e)
                 
     def _on_message(self, ws, message):
         """WebSocket消息接收回调"""
         try:
             # 解析JSON消息
-            data = json.loads(message)
-            logger.info(f"收到消息: {data.get('action', 'unknown')}")
-            
-            # 将消息加入接收队列
-            self.receive_queue.put(data)
-            
-            # 调用消息回调
-            if self.on_message_callback:
-                try:
-                    self.on_message_callback(data)
-                except Exception as e:
-                    logger.error(f"消息回调执行失败: {e}")
+            data = _loads(message)
+            logger.debug("收到消息: %s", data.get('action', 'unknown'))
+            
+            # 已注册回调时在接收线程中直接分发；否则放入接收队列，供get_received_message读取
+            callback = self.on_message_callback
+            if callback is None:
+                self.receive_queue.append(data)
+                return
+                
+            try:
+                callback(data)
+            except Exception as e:
+                logger.error("消息回调执行失败: %s", e)
                     
         except json.JSONDecodeError as e:
-            logger.error(f"解析消息JSON失败: {e}")
+            logger.error("解析消息JSON失败: %s", e)
         except Exception as e:
-            logger.error(f"处理接收消息失败: {e}")
+            logger.error("处理接收消息失败: %s", e)
             
     def _on_error(self, ws, error):
         """WebSocket错误回调"""
-        logger.error(f"WebSocket错误: {error}")
+        logger.error("WebSocket错误: %s", error)
         
     def _on_close(self, ws, close_status_code, close_msg):
         """WebSocket连接关闭回调"""
-        logger.info(f"WebSocket连接已关闭: {close_status_code} - {close_msg}")
+        logger.info("WebSocket连接已关闭: %s - %s", close_status_code, close_msg)
         
         self.is_connected = False
+        self._cancel_heartbeat()
+        
+        # 1012(服务重启)/1013(稍后重试)：服务端明确要求延后重连，至少等待一个重连间隔
+        if close_status_code in (1012, 1013):
+            self._backoff_floor = self.reconnect_interval
         
         # 调用断开连接回调
         if self.on_disconnect_callback:
             try:
                 self.on_disconnect_callback()
             except Exception as e:
-                logger.error(f"断开连接回调执行失败: {e}")
+                logger.error("断开连接回调执行失败: %s", e)
                 
-        # 如果还在运行状态，尝试重连
-        if self.is_running:
-            self._handle_reconnect()
-            
-    def _handle_reconnect(self):
-        """处理重连"""
-        if self.reconnect_attempts >= self.max_reconnect_attempts:
-            logger.warning(f"达到最大重连次数({self.max_reconnect_attempts})，停止重连")
-            return
-            
-        self.reconnect_attempts += 1
-        logger.info(f"准备重连 ({self.reconnect_attempts}/{self.max_reconnect_attempts})，{self.reconnect_interval}秒后重试")
+    def _handle_reconnect(self) -> bool:
+        """等待重连退避时间（连接线程调用）
         
-        time.sleep(self.reconnect_interval)
+        Returns:
+            是否应当继续重连（仅在客户端已停止时为False）
+        """
+        attempts = self.reconnect_attempts
+        interval = max(float(self.reconnect_interval or 0), 0.0)
+        # 重连间隔大于退避上限时以重连间隔为准
+        cap = max(self.backoff_cap, interval)
+        if attempts >= self.max_reconnect_attempts:
+            # 超过最大重连次数后不再放弃，降低频率按退避上限持续重试，后端恢复后自动连上
+            if attempts == self.max_reconnect_attempts:
+                logger.warning("达到最大重连次数(%s)，之后每%.0f秒重试一次", self.max_reconnect_attempts, cap)
+            delay = cap
+        else:
+            # 随机分散各客户端的重连时间，避免服务端重启后被同时涌入的重连压垮
+            delay = random.uniform(interval, min(cap, interval * (2 ** attempts)))
+        delay = max(delay, self._backoff_floor)
+        self._backoff_floor = 0.0
+        
+        self.reconnect_attempts = attempts + 1
+        if attempts < self.max_reconnect_attempts:
+            logger.info("准备重连 (%s/%s)，%.1f秒后重试", attempts + 1, self.max_reconnect_attempts, delay)
+        else:
+            logger.debug("重连第%s次，%.1f秒后重试", attempts + 1, delay)
+        
+        # stop()会设置事件，等待期间可被立即打断
+        self._reconnect_event.wait(delay)
+        return self.is_running
         
     def _process_send_queue(self):
         """处理发送队列中的消息"""
-        while not self.send_queue.empty():
+        # 一次性取出当前积压的全部消息，发送失败重新入队的消息留到下次连接再处理
+        send_queue = self.send_queue
+        batch = []
+        while True:
             try:
-                message = self.send_queue.get_nowait()
-                self.send_message(message)
-            except Empty:
+                batch.append(send_queue.popleft())
+            except IndexError:
                 break
+                
+        if not batch:
+            return
+            
+        payloads = []
+        for message in batch:
+            try:
+                payloads.append((message, _dumps(message)))
             except Exception as e:
-                logger.error(f"处理发送队列消息失败: {e}")
+                logger.error("处理发送队列消息失败: %s", e)
                 
-    def _heartbeat_loop(self):
-        """心跳循环"""
-        while self.is_running:
+        ws = self.ws
+        for i, (message, payload) in enumerate(payloads):
             try:
-                current_time = time.time()
+                ws.send(payload)
+            except Exception as e:
+                logger.error("发送队列消息失败: %s", e)
+                # 连接已不可用，剩余消息按原顺序放回队首
+                send_queue.extendleft(message for message, _ in reversed(payloads[i:]))
+                return
                 
-                # 检查是否需要发送心跳
-                if (self.is_connected and 
-                    current_time - self.last_heartbeat >= self.heartbeat_interval):
-                    
-                    # 发送心跳包
-                    heartbeat = self.onebot_converter.create_heartbeat()
-                    if self.send_message(heartbeat):
-                        self.last_heartbeat = current_time
-                        
-                time.sleep(5)  # 每5秒检查一次
+        logger.info("已发送队列中的 %s 条消息", len(payloads))
                 
-            except Exception as e:
-                logger.error(f"心跳循环异常: {e}")
-                time.sleep(5)
+    def _arm_heartbeat(self):
+        """安排下一次心跳"""
+        with self._hb_lock:
+            if self._hb_timer is not None:
+                self._hb_timer.cancel()
+            timer = threading.Timer(self.heartbeat_interval, self._fire_heartbeat)
+            timer.daemon = True
+            self._hb_timer = timer
+            timer.start()
+            
+    def _cancel_heartbeat(self):
+        """取消尚未触发的心跳"""
+        with self._hb_lock:
+            if self._hb_timer is not None:
+                self._hb_timer.cancel()
+                self._hb_timer = None
                 
+    def _fire_heartbeat(self):
+        """发送心跳包，并在连接仍可用时安排下一次"""
+        if not (self.is_running and self.is_connected):
+            return
+            
+        try:
+            current_time = time.time()
+            # 发送心跳包（失败时不入队，过期的心跳没有重发意义）
+            if self.send_raw(self._heartbeat_payload(int(current_time))):
+                self.last_heartbeat = current_time
+        except Exception as e:
+            logger.error("发送心跳失败: %s", e)
+            
+        if self.is_running and self.is_connected:
+            self._arm_heartbeat()
+            
     def get_status(self) -> Dict[str, Any]:
         """获取客户端状态
         
@@ -351,8 +500,8 @@ class WebSocketClient:
             'is_connected': self.is_connected,
             'ws_url': self.ws_url,
             'reconnect_attempts': self.reconnect_attempts,
-            'send_queue_size': self.send_queue.qsize(),
-            'receive_queue_size': self.receive_queue.qsize(),
+            'send_queue_size': len(self.send_queue),
+            'receive_queue_size': len(self.receive_queue),
             'last_heartbeat': self.last_heartbeat
         }
         
@@ -361,28 +510,108 @@ class WebSocketClient:
         try:
             # 获取新的WebSocket地址
             new_ws_url = self.config_manager.get('onebot.ws_url', '')
+            old_heartbeat_interval = self.heartbeat_interval
+            
+            # 先更新访问令牌、心跳间隔和重连配置，重连时使用新的参数
+            self._load_config()
             
             # 如果地址发生变化，重新连接
             if new_ws_url != self.ws_url and new_ws_url:
-                logger.info(f"WebSocket地址已更新: {self.ws_url} -> {new_ws_url}")
+                logger.info("WebSocket地址已更新: %s -> %s", self.ws_url, new_ws_url)
                 self.ws_url = new_ws_url
                 
-                # 重新连接
                 if self.is_running:
-                    self.stop()
-                    time.sleep(1)
-                    self.start()
+                    self._reconnect_for_update()
                     
-            # 更新心跳间隔
-            self.heartbeat_interval = self.config_manager.get('onebot.heartbeat_interval', 30)
+            elif self.is_connected and self.heartbeat_interval != old_heartbeat_interval:
+                # 心跳间隔变化只需重新定时，无需重连
+                self._arm_heartbeat()
+                
+        except Exception as e:
+            logger.error("更新WebSocket配置失败: %s", e)
             
-            # 更新重连配置
-            self.reconnect_interval = self.config_manager.get('onebot.reconnect_interval', 5)
-            self.max_reconnect_attempts = self.config_manager.get('onebot.max_reconnect_attempts', 10)
+    def _reconnect_for_update(self):
+        """配置变化后按新地址重连，短时间内多次变更时推迟重连"""
+        now = time.monotonic()
+        remaining = self._restart_cooldown - (now - self._last_restart)
+        self._last_restart = now
+        if remaining > 0:
+            # 冷却期内的变更不立即重连，由连接线程在退避等待后使用最新地址
+            self._backoff_floor = remaining
             
-        except Exception as e:
-            logger.error(f"更新WebSocket配置失败: {e}")
+        if self.connect_thread and self.connect_thread.is_alive():
+            # 关闭当前连接，连接线程会按新地址重连，无需重启整个客户端
+            ws = self.ws
+            if ws:
+                ws.close()
+        else:
+            # 连接线程已退出（如达到最大重连次数），重新启动客户端
+            self.start()
+            
+    def _load_config(self):
+        """读取连接相关配置并缓存为属性，连接和重连时直接使用"""
+        get = self.config_manager.get
+        access_token = get('onebot.access_token', '')
+        if access_token != self._access_token or not self._headers:
+            self._access_token = access_token
+            self._headers = self._build_headers(access_token)
+        self.heartbeat_interval = get('onebot.heartbeat_interval', 30)
+        self.reconnect_interval = get('onebot.reconnect_interval', 5)
+        self.max_reconnect_attempts = get('onebot.max_reconnect_attempts', 10)
+        self._sockopt = self._build_sockopt(self.heartbeat_interval)
+        
+    @staticmethod
+    def _build_headers(access_token: str) -> Dict[str, str]:
+        """生成连接头
+        
+        Args:
+            access_token: 访问令牌，为空时不添加认证头
+            
+        Returns:
+            连接头字典
+        """
+        headers = {}
+        if access_token:
+            headers['Authorization'] = f'Bearer {access_token}'
+            logger.info("已添加access_token认证")
             
+        # 添加OneBotV11标准要求的头部信息
+        headers['X-Self-ID'] = '10001000'  # 机器人QQ号，可以从配置获取
+        headers['X-Client-Role'] = 'Universal'  # 客户端类型：Universal支持API和Event
+        return headers
+        
+    @staticmethod
+    def _build_sockopt(heartbeat_interval) -> tuple:
+        """生成连接套接字选项
+        
+        OneBot帧都很小，关闭Nagle算法避免发送延迟；TCP保活探测在一个心跳间隔内
+        完成，对端失联时由内核发现并断开连接，而不是等待心跳超时
+        
+        Args:
+            heartbeat_interval: 心跳间隔（秒）
+            
+        Returns:
+            传给run_forever的sockopt
+        """
+        interval = max(2, int(heartbeat_interval))
+        options = [
+            (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        ]
+        # 各平台支持的保活参数不同，只设置当前平台存在的选项
+        keepalive = (
+            ('TCP_KEEPIDLE', interval // 2),
+            ('TCP_KEEPINTVL', max(1, interval // 6)),
+            ('TCP_KEEPCNT', 3),
+            # 未确认的数据超过一个心跳间隔即判定连接失效（仅Linux）
+            ('TCP_USER_TIMEOUT', interval * 1000),
+        )
+        for name, value in keepalive:
+            opt = getattr(socket, name, None)
+            if opt is not None:
+                options.append((socket.IPPROTO_TCP, opt, value))
+        return tuple(options)
+        
     def send_api_response(self, echo: str, data: Any = None, retcode: int = 0, status: str = "ok"):
         """发送API响应
         
@@ -401,6 +630,13 @@ class WebSocketClient:
         
         self.send_message(response)
         
+    # action -> 处理方法名，按字典查找分发
+    _ACTION_TABLE = {
+        'get_login_info': '_handle_get_login_info',
+        'get_status': '_handle_get_status',
+        'send_private_msg': '_handle_send_private_msg',
+    }
+    
     def handle_api_request(self, request: Dict[str, Any]) -> bool:
         """处理API请求
         
@@ -410,36 +646,17 @@ class WebSocketClient:
         Returns:
             是否处理成功
         """
+        echo = ''
         try:
             action = request.get('action', '')
             echo = request.get('echo', '')
             params = request.get('params', {})
             
-            logger.info(f"收到API请求: {action}")
+            logger.debug("收到API请求: %s", action)
             
-            # 根据不同的action处理请求
-            if action == 'get_login_info':
-                # 获取登录信息
-                data = {
-                    "user_id": self.onebot_converter.self_id,
-                    "nickname": "WxAuto Bot"
-                }
-                self.send_api_response(echo, data)
-                
-            elif action == 'get_status':
-                # 获取状态
-                data = {
-                    "online": self.is_connected,
-                    "good": True
-                }
-                self.send_api_response(echo, data)
-                
-            elif action == 'send_private_msg':
-                # 发送私聊消息 - 这个需要在消息处理模块中实现
-                # 这里只是发送成功响应
-                data = {"message_id": int(time.time())}
-                self.send_api_response(echo, data)
-                
+            handler_name = self._ACTION_TABLE.get(action)
+            if handler_name:
+                getattr(self, handler_name)(params, echo)
             else:
                 # 未知的API请求
                 self.send_api_response(echo, None, 1404, "failed")
@@ -447,7 +664,44 @@ class WebSocketClient:
             return True
             
         except Exception as e:
-            logger.error(f"处理API请求失败: {e}")
-            if 'echo' in locals():
-                self.send_api_response(echo, None, 1500, "failed")
-            return False
\ No newline at end of file
+            logger.error("处理API请求失败: %s", e)
+            self.send_api_response(echo, None, 1500, "failed")
+            return False
+            
+    def _handle_get_login_info(self, params: Dict[str, Any], echo: str):
+        """处理获取登录信息请求
+        
+        Args:
+            params: API参数
+            echo: 回声标识
+        """
+        data = {
+            "user_id": self.onebot_converter.self_id,
+            "nickname": "WxAuto Bot"
+        }
+        self.send_api_response(echo, data)
+        
+    def _handle_get_status(self, params: Dict[str, Any], echo: str):
+        """处理获取状态请求
+        
+        Args:
+            params: API参数
+            echo: 回声标识
+        """
+        data = {
+            "online": self.is_connected,
+            "good": True
+        }
+        self.send_api_response(echo, data)
+        
+    def _handle_send_private_msg(self, params: Dict[str, Any], echo: str):
+        """处理发送私聊消息请求
+        
+        实际发送在消息处理模块中实现，这里只返回成功响应
+        
+        Args:
+            params: API参数
+            echo: 回声标识
+        """
+        data = {"message_id": int(time.time())}
+        self.send_api_response(echo, data)
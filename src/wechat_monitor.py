@@ -5,21 +5,28 @@
 使用wxauto库监听微信消息
 """
 
+import re
 import time
+import hashlib
+import itertools
 import threading
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 import os
 
 try:
     from astrbot.api import logger
 except ImportError:
-    # 独立运行模式的简单日志记录器
-    class SimpleLogger:
-        def info(self, msg): print(f"[INFO] {msg}")
-        def error(self, msg): print(f"[ERROR] {msg}")
-        def warning(self, msg): print(f"[WARNING] {msg}")
-    logger = SimpleLogger()
+    # 在独立运行模式下，使用标准库logging输出到stderr
+    import logging
+    logger = logging.getLogger('wxauto_repost')
+    if not logger.handlers:
+        _handler = logging.StreamHandler()
+        _handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
+        logger.addHandler(_handler)
+        logger.setLevel(logging.INFO)
 
 try:
     import pythoncom
@@ -29,6 +36,143 @@ except ImportError:
     WeChat = None
     pythoncom = None
 
+# COM按线程初始化，记录本模块已在哪些线程初始化过，避免重复初始化和多余的反初始化
+_com_state = threading.local()
+
+def _com_initialize():
+    """在当前线程初始化COM组件，同一线程只初始化一次"""
+    if pythoncom is None or getattr(_com_state, 'initialized', False):
+        return
+    pythoncom.CoInitialize()
+    _com_state.initialized = True
+    
+def _com_uninitialize():
+    """反初始化本模块在当前线程初始化的COM组件"""
+    if pythoncom is None or not getattr(_com_state, 'initialized', False):
+        return
+    _com_state.initialized = False
+    try:
+        pythoncom.CoUninitialize()
+    except Exception:
+        pass
+
+# xxhash为可选依赖，未安装时回退到标准库blake2b
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+def _hash64(data: bytes) -> int:
+    """计算64位内容哈希，与内置hash()不同，结果跨进程稳定"""
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+# 项目根目录，媒体保存目录相对于此解析
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# pyahocorasick为可选依赖，未安装时回退到合并后的正则
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+def _build_keyword_matcher(keywords) -> Callable[[str], Optional[str]]:
+    """构建多关键词子串匹配器，一次扫描判断是否包含任一关键词
+    
+    Args:
+        keywords: 关键词序列
+        
+    Returns:
+        匹配函数，返回命中的第一个关键词，未命中返回None
+    """
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        
+        def match(text: str) -> Optional[str]:
+            for _, keyword in automaton.iter(text):
+                return keyword
+            return None
+        return match
+        
+    # 长关键词优先，避免被其前缀抢先匹配
+    pattern = re.compile('|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)))
+    
+    def match(text: str) -> Optional[str]:
+        found = pattern.search(text)
+        return found.group(0) if found else None
+    return match
+
+# 系统消息关键词列表（已转为小写，与小写化后的消息内容比较）
+_SYSTEM_KEYWORDS = tuple(keyword.lower() for keyword in (
+    "以下为新消息",
+    "以上为历史消息",
+    "消息记录",
+    "聊天记录",
+    "历史消息",
+    "系统消息",
+    "新消息",
+    "--- 以上为历史消息 ---",
+    "--- 以下为新消息 ---",
+    "撤回了一条消息",
+    "撤回了消息",
+    "withdrew a message",
+    "base消息",
+    "消息提醒",
+    "系统提示",
+    "消息通知",
+))
+_match_system_keyword = _build_keyword_matcher(_SYSTEM_KEYWORDS)
+
+# wxauto库调试消息特征
+_match_wxauto_debug = _build_keyword_matcher((
+    "[system base]",
+    "[time base]",
+    "[base消息]",
+    "获取到新消息：",
+    "以下为新消息",
+    "以上为历史消息",
+))
+
+# 各种括号格式的系统消息，模块加载时合并编译为一个正则
+_BRACKET_RE = re.compile('|'.join((
+    r'^\s*\[.*base.*\]\s*$',  # [任何内容base任何内容]
+    r'^\s*\[.*消息.*\]\s*$',  # [任何内容消息任何内容]
+    r'^\s*\[.*提示.*\]\s*$',  # [任何内容提示任何内容]
+    r'^\s*\[.*通知.*\]\s*$',  # [任何内容通知任何内容]
+    r'^\s*\[.*记录.*\]\s*$',  # [任何内容记录任何内容]
+    r'^\s*\[.*历史.*\]\s*$',  # [任何内容历史任何内容]
+    r'^\s*\[.*系统.*\]\s*$',  # [任何内容系统任何内容]
+    r'^\s*\[[^\]]{1,20}\]\s*$',  # 短的纯括号消息
+    r'^\s*\[.*\]\s*\.{3,}\s*$',  # [任何内容]...
+    r'^\s*\[.*\]\s*…+\s*$',  # [任何内容]…
+)), re.IGNORECASE)
+
+# 括号格式与符号格式的系统消息只可能以这些字符开头（内容已去除首尾空白）
+_SYSTEM_FIRST_CHARS = frozenset('[.…-=*_。')
+
+# 纯符号和省略号消息
+_SYMBOL_RE = re.compile('|'.join((
+    r'^\s*\.{3,}\s*$',  # 纯省略号
+    r'^\s*…+\s*$',  # 纯中文省略号
+    r'^\s*[-=*_]{3,}\s*$',  # 纯分隔符
+    r'^\s*[。]{3,}\s*$',  # 纯中文句号
+    r'^\s*[\s\.…。\-=*_]+\s*$',  # 只包含空格和符号
+)))
+
+# 包含"新消息"、"历史"等关键词的短消息
+_SHORT_SYSTEM_RE = re.compile('|'.join((
+    r'.*新消息.*',
+    r'.*历史.*消息.*',
+    r'.*消息.*记录.*',
+    r'.*以下.*消息.*',
+    r'.*以上.*消息.*',
+    r'.*base.*',
+)))
+
 class WeChatMonitor:
     """微信消息监听器"""
     
@@ -40,32 +184,66 @@ class WeChatMonitor:
         """
         self.config_manager = config_manager
         self.wechat = None  # 修复：统一使用wechat属性
-        self.is_running = False
         self.monitor_thread = None
         
         # 消息回调函数
         self.message_callback = None
         
-        # 运行状态
-        self.running = False
+        # 运行状态，通过只读属性is_running对外暴露
+        self._running = False
+        
+        # 微信消息类型 -> 解析方法
+        self._parsers = {
+            'text': self._parse_text,
+            'image': self._parse_image,
+            'file': self._parse_file,
+            'voice': self._parse_voice,
+        }
+        
+        # 附件文件名序号，避免同一秒内收到的附件重名，next()在GIL下是原子的
+        self._file_seq = itertools.count()
+        
+        # 好友列表缓存(获取时间, 昵称列表)，GetAllFriends需要遍历界面，开销很大
+        self._friends_cache: Tuple[float, Optional[List[str]]] = (0.0, None)
+        self._friends_ttl = 60.0
+        
+        # 停止信号：监听线程阻塞等待，stop()时立即唤醒
+        self._stop_event = threading.Event()
+        
+        # 消息处理线程池（start时创建），wxauto回调线程只做快速过滤后立即返回。
+        # 默认单线程以保持消息的先后顺序：wechat.worker_threads大于1时，
+        # 同一聊天的消息会并发处理，转发到OneBot的顺序不再有保证
+        self._msg_pool: Optional[ThreadPoolExecutor] = None
+        self._msg_workers = 1
+        # 保护线程池的提交与关闭，stop()关闭入口后不会再有消息提交到线程池
+        self._msg_intake_lock = threading.Lock()
+        # 限制待处理的消息数：处理过慢时阻塞回调线程形成背压，而不是无限堆积
+        self._msg_slots = threading.BoundedSemaphore(self.config_manager.get('wechat.max_pending_messages', 256))
         
         # 监听的用户列表
         self.monitored_users = []
         
         # 消息去重缓存（防止处理自己发送的消息）
-        self.sent_message_cache = {}  # content -> timestamp
-        self.cache_expire_time = 30  # 缓存过期时间（秒）
-        
-        # 文件保存目录
-        project_root = Path(__file__).parent.parent
-        self.image_save_dir = project_root / self.config_manager.get('message.image_save_dir', 'cache/images')
-        self.file_save_dir = project_root / self.config_manager.get('message.file_save_dir', 'cache/files')
-        self.voice_save_dir = project_root / self.config_manager.get('message.voice_save_dir', 'cache/voices')
+        # 按记录时间排序的有界LRU，最旧的条目在头部，查询与插入均为O(1)
+        # 时间戳取自单调时钟（整数纳秒），不受系统时间调整影响；
+        # 以64位内容哈希为键，不保留完整消息内容
+        self.sent_message_cache = OrderedDict()  # content_hash -> monotonic_ns
+        self.cache_expire_ns = 30 * 1_000_000_000  # 缓存过期时间（30秒）
+        self.sent_cache_size = self.config_manager.get('message.sent_cache_size', 512)
+        # 发送线程与wxauto回调线程都会访问缓存
+        self._sent_cache_lock = threading.Lock()
         
-        # 创建保存目录
-        self.image_save_dir.mkdir(parents=True, exist_ok=True)
-        self.file_save_dir.mkdir(parents=True, exist_ok=True)
-        self.voice_save_dir.mkdir(parents=True, exist_ok=True)
+        # 配置快照（媒体保存目录、消息类型开关、昵称->用户ID映射），配置版本变化时重新解析
+        self._config_version = None
+        self._users: List[Tuple[str, str]] = []  # (昵称, 用户ID)
+        self._nick_to_uid: Dict[str, str] = {}
+        self.image_save_dir: Optional[str] = None
+        self.file_save_dir: Optional[str] = None
+        self.voice_save_dir: Optional[str] = None
+        self._enable_image = True
+        self._enable_file = True
+        self._enable_voice = False
+        self._ensure_config_snapshot()
         
     def set_message_callback(self, callback):
         """设置消息回调函数
@@ -75,17 +253,52 @@ class WeChatMonitor:
         """
         self.message_callback = callback
         
-    def _create_cache_dirs(self):
-        """创建缓存目录"""
-        project_root = Path(__file__).parent.parent
+    def _ensure_config_snapshot(self):
+        """配置发生变化时重新解析缓存的配置项，保存目录只在路径变化时创建"""
+        config_manager = self.config_manager
+        if self._config_version == config_manager.version:
+            return
+            
+        self._enable_image = config_manager.get('message.enable_image', True)
+        self._enable_file = config_manager.get('message.enable_file', True)
+        self._enable_voice = config_manager.get('message.enable_voice', False)
         
-        # 图片缓存目录
-        image_cache_dir = project_root / self.config_manager.get('message.image_cache_dir', 'cache/images')
-        image_cache_dir.mkdir(parents=True, exist_ok=True)
+        # 目录保存为字符串，保存附件时直接用os.path.join拼接文件路径
+        image_save_dir = str(_PROJECT_ROOT / config_manager.get('message.image_cache_dir', 'cache/images'))
+        if image_save_dir != self.image_save_dir:
+            os.makedirs(image_save_dir, exist_ok=True)
+            self.image_save_dir = image_save_dir
+            
+        file_save_dir = str(_PROJECT_ROOT / config_manager.get('message.file_cache_dir', 'cache/files'))
+        if file_save_dir != self.file_save_dir:
+            os.makedirs(file_save_dir, exist_ok=True)
+            self.file_save_dir = file_save_dir
+            
+        # 语音与文件共用缓存目录
+        self.voice_save_dir = self.file_save_dir
         
-        # 文件缓存目录
-        file_cache_dir = project_root / self.config_manager.get('message.file_cache_dir', 'cache/files')
-        file_cache_dir.mkdir(parents=True, exist_ok=True)
+        # 监听用户统一为 (昵称, 用户ID)，之后的使用方无需再区分配置格式。
+        # 整体替换，消息线程读取时不会看到构建到一半的数据
+        users = []
+        nick_to_uid = {}
+        for user in config_manager.get('wechat.monitor_users', []):
+            # 支持两种格式：字符串和对象
+            if isinstance(user, str):
+                # 字符串格式以昵称作为用户ID
+                nickname, user_id = user, user
+            elif isinstance(user, dict):
+                nickname = user.get('nickname')
+                user_id = str(user.get('user_id', nickname))
+            else:
+                continue
+            # 与原先的线性查找一致，保留第一次出现的映射
+            nick_to_uid.setdefault(nickname, user_id)
+            if nickname:
+                users.append((nickname, user_id))
+        self._users = users
+        self._nick_to_uid = nick_to_uid
+        
+        self._config_version = config_manager.version
         
     def start(self) -> bool:
         """启动微信监听
@@ -93,7 +306,7 @@ class WeChatMonitor:
         Returns:
             是否启动成功
         """
-        if self.running:
+        if self._running:
             logger.info("微信监听器已在运行中")
             return True
             
@@ -103,8 +316,7 @@ class WeChatMonitor:
             
         try:
             # 初始化COM组件
-            if pythoncom:
-                pythoncom.CoInitialize()
+            _com_initialize()
             
             # 初始化微信客户端
             self.wechat = WeChat()
@@ -112,10 +324,21 @@ class WeChatMonitor:
             # 检查微信是否已登录
             if not self._check_wechat_login():
                 logger.error("错误: 微信未登录或无法连接")
-                self.running = False
+                self._running = False
                 return False
                 
-            self.running = True
+            self._running = True
+            self._stop_event.clear()
+            
+            # 创建消息处理线程池
+            # 工作线程会调用wxauto的save_*等UIAutomation接口，需要各自初始化COM
+            if self._msg_pool is None:
+                self._msg_workers = max(1, int(self.config_manager.get('wechat.worker_threads', 1)))
+                self._msg_pool = ThreadPoolExecutor(
+                    max_workers=self._msg_workers,
+                    thread_name_prefix='wx-msg',
+                    initializer=_com_initialize
+                )
             
             # 启动监听线程
             self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
@@ -125,8 +348,8 @@ class WeChatMonitor:
             return True
             
         except Exception as e:
-            logger.error(f"启动微信监听器失败: {e}")
-            self.running = False
+            logger.error("启动微信监听器失败: %s", e)
+            self._running = False
             return False
             
     def stop(self) -> bool:
@@ -135,34 +358,34 @@ class WeChatMonitor:
         Returns:
             是否停止成功
         """
-        if not self.running:
+        if not self._running:
             logger.info("微信监听器未在运行")
             return True
             
-        self.running = False
+        self._running = False
+        self._stop_event.set()
         
         # 等待监听线程结束
         if self.monitor_thread and self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=5)
             
-        # 清理COM组件
-        if pythoncom:
-            try:
-                pythoncom.CoUninitialize()
-            except:
-                pass
+        # 关闭消息入口，处理完已接收的消息后关闭线程池
+        with self._msg_intake_lock:
+            pool, self._msg_pool = self._msg_pool, None
+        if pool:
+            self._shutdown_msg_pool(pool)
             
+        # 调用线程的COM组件有意不在此反初始化：stop()不一定与start()在同一线程，
+        # 且其他线程可能仍在使用COM对象，由进程退出时统一回收
         self.wechat = None
+        self.refresh_user_list()
         logger.info("微信监听器已停止")
         return True
         
+    @property
     def is_running(self) -> bool:
-        """检查是否正在运行
-        
-        Returns:
-            是否正在运行
-        """
-        return self.running
+        """是否正在运行"""
+        return self._running
         
     def _check_wechat_login(self) -> bool:
         """检查微信是否已登录
@@ -178,7 +401,7 @@ class WeChatMonitor:
                 return True
             return False
         except Exception as e:
-            logger.error(f"检查微信登录状态失败: {e}")
+            logger.error("检查微信登录状态失败: %s", e)
             return False
             
     def _on_message_callback(self, msg, chat):
@@ -206,79 +429,103 @@ class WeChatMonitor:
             
             # 过滤wxauto库内部的调试消息
             if self._is_wxauto_debug_message(content):
-                logger.info(f"🚫 过滤wxauto调试消息: {content[:30]}{'...' if len(content) > 30 else ''}")
+                logger.debug("🚫 过滤wxauto调试消息: %.30s", content)
                 return
                 
-            logger.info(f"收到来自 {username} 的消息: {content}")
-            
-            # 处理消息
+            logger.debug("收到来自 %s 的消息: %s", username, content)
+            
+            # 交给线程池处理，线程池未启动时同步处理
+            with self._msg_intake_lock:
+                pool = self._msg_pool
+                if pool is not None:
+                    self._msg_slots.acquire()
+                    future = pool.submit(self._process_message, username, msg)
+                    future.add_done_callback(self._release_msg_slot)
+                    return
+                    
+            if not self._running:
+                # 监听器已停止
+                return
             self._process_message(username, msg)
             
         except Exception as e:
-            logger.error(f"处理回调消息时出错: {e}")
+            logger.error("处理回调消息时出错: %s", e)
+            
+    def _release_msg_slot(self, future: Future):
+        """消息处理完成后释放待处理名额"""
+        self._msg_slots.release()
+        
+    def _shutdown_msg_pool(self, pool: ThreadPoolExecutor):
+        """处理完已提交的消息后关闭线程池，并在每个工作线程中反初始化COM组件
+        
+        Args:
+            pool: 已从self._msg_pool摘下的线程池
+        """
+        workers = self._msg_workers
+        barrier = threading.Barrier(workers)
+        
+        def release_com():
+            # 所有清理任务先在屏障处等齐，保证每个工作线程各执行一次
+            try:
+                barrier.wait(timeout=5)
+            except threading.BrokenBarrierError:
+                pass
+            _com_uninitialize()
+            
+        # 清理任务排在已提交的消息之后执行
+        for _ in range(workers):
+            pool.submit(release_com)
+        pool.shutdown(wait=True)
     
     def _monitor_loop(self):
         """监听循环"""
         try:
             # 在监听线程中初始化COM组件
-            if pythoncom:
-                pythoncom.CoInitialize()
+            _com_initialize()
                 
             logger.info("开始监听微信消息...")
             
             # 添加监听用户
             self._setup_listeners()
             
-            # 使用回调机制时，只需要保持程序运行
-            while self.is_running:
-                time.sleep(1)  # 保持程序运行
+            # 使用回调机制时，只需要保持线程存活直到收到停止信号
+            self._stop_event.wait()
                     
         except Exception as e:
-            logger.error(f"监听循环异常退出: {e}")
+            logger.error("监听循环异常退出: %s", e)
         finally:
-            # 清理COM组件
-            if pythoncom:
-                try:
-                    pythoncom.CoUninitialize()
-                except:
-                    pass
+            # 清理监听线程的COM组件
+            _com_uninitialize()
                 
     def _setup_listeners(self):
         """设置监听用户"""
         try:
             # 获取监听用户列表
-            monitor_users = self.config_manager.get('wechat.monitor_users', [])
+            self._ensure_config_snapshot()
+            users = self._users
             
-            if not monitor_users:
+            if not users:
                 logger.warning("未配置监听用户")
                 return
                 
             # 为每个用户添加监听
-            for user in monitor_users:
+            for nickname, _ in users:
                 try:
-                    # 支持两种格式：字符串和对象
-                    if isinstance(user, str):
-                        nickname = user
-                    elif isinstance(user, dict):
-                        nickname = user.get('nickname', '')
-                    else:
-                        continue
-                        
-                    if nickname:
-                        # 使用回调函数方式监听消息
-                        self.wechat.AddListenChat(nickname=nickname, callback=self._on_message_callback)
-                        logger.info(f"已添加监听用户: {nickname}")
+                    # 使用回调函数方式监听消息
+                    self.wechat.AddListenChat(nickname=nickname, callback=self._on_message_callback)
+                    logger.info("已添加监听用户: %s", nickname)
                 except Exception as e:
-                    logger.error(f"添加监听用户失败: {e}")
+                    logger.error("添加监听用户失败: %s", e)
                 
         except Exception as e:
-            logger.error(f"设置监听用户失败: {e}")
+            logger.error("设置监听用户失败: %s", e)
             
-    def _get_message_timestamp(self, message) -> int:
+    def _get_message_timestamp(self, message, now: Optional[int] = None) -> int:
         """获取消息时间戳
         
         Args:
             message: 消息对象
+            now: 当前时间戳（秒），消息不带时间时使用，未提供时读取系统时间
             
         Returns:
             消息时间戳
@@ -288,10 +535,9 @@ class WeChatMonitor:
                 return int(message.time)
             elif hasattr(message, 'timestamp'):
                 return int(message.timestamp)
-            else:
-                return int(time.time())
         except:
-            return int(time.time())
+            pass
+        return now if now is not None else int(time.time())
         
     def _get_user_id_by_nickname(self, nickname: str) -> str:
         """根据昵称获取用户ID
@@ -302,29 +548,16 @@ class WeChatMonitor:
         Returns:
             用户ID（数字字符串）
         """
-        try:
-            monitor_users = self.config_manager.get('wechat.monitor_users', [])
-            
-            for user in monitor_users:
-                if isinstance(user, dict):
-                    if user.get('nickname') == nickname:
-                        return str(user.get('user_id', nickname))
-                elif isinstance(user, str) and user == nickname:
-                    # 如果是字符串格式，返回昵称作为用户ID
-                    return nickname
-                    
-            # 如果没找到，返回昵称
-            return nickname
+        self._ensure_config_snapshot()
+        # 如果没找到，返回昵称
+        return self._nick_to_uid.get(nickname, nickname)
             
-        except Exception as e:
-            logger.error(f"查找用户ID失败: {e}")
-            return nickname
-            
-    def _get_message_id(self, message) -> str:
+    def _get_message_id(self, message, timestamp: Optional[int] = None) -> str:
         """获取消息唯一标识
         
         Args:
             message: 消息对象
+            timestamp: 已获取的消息时间戳，未提供时重新获取
             
         Returns:
             消息唯一标识
@@ -335,12 +568,13 @@ class WeChatMonitor:
                 return str(message.id)
             elif hasattr(message, 'time'):
                 return str(message.time)
-            elif hasattr(message, 'content'):
-                return str(hash(f"{message.content}_{self._get_message_timestamp(message)}"))
-            else:
-                return str(hash(f"{str(message)}_{self._get_message_timestamp(message)}"))
+            content = message.content if hasattr(message, 'content') else message
+            if timestamp is None:
+                timestamp = self._get_message_timestamp(message)
+            # 内容哈希与时间戳异或，无需拼接临时字符串
+            return str(_hash64(str(content).encode('utf-8')) ^ timestamp)
         except:
-            return str(hash(f"{str(message)}_{int(time.time())}"))
+            return str(_hash64(str(message).encode('utf-8', 'surrogatepass')) ^ int(time.time()))
             
     def _process_message(self, username: str, message):
         """处理消息
@@ -357,20 +591,20 @@ class WeChatMonitor:
                 # 检查是否是刚刚发送的消息（防止循环）
                 content = parsed_msg.get('content', '')
                 if self._is_recently_sent_message(content):
-                    logger.info(f"⏭️  跳过回显消息: {content[:30]}{'...' if len(content) > 30 else ''}")
+                    logger.debug("⏭️  跳过回显消息: %.30s", content)
                     return
                     
-                logger.info(f"📨 {username}: {content[:50]}{'...' if len(content) > 50 else ''}")
+                logger.debug("📨 %s: %.50s", username, content)
                 
                 # 调用消息回调函数
                 if self.message_callback:
                     try:
                         self.message_callback(parsed_msg)
                     except Exception as e:
-                        logger.error(f"消息回调执行失败: {e}")
+                        logger.error("消息回调执行失败: %s", e)
             
         except Exception as e:
-            logger.error(f"❌ 处理消息失败: {e}")
+            logger.error("❌ 处理消息失败: %s", e)
             
     def _parse_message(self, username: str, message) -> Optional[Dict[str, Any]]:
         """解析消息
@@ -383,111 +617,110 @@ class WeChatMonitor:
             解析后的消息字典
         """
         try:
+            self._ensure_config_snapshot()
+            
+            # 每条消息只读取一次系统时间，时间戳、消息ID和附件文件名共用
+            now = int(time.time())
+            timestamp = self._get_message_timestamp(message, now)
+            
             # 根据昵称查找用户ID
             user_id = self._get_user_id_by_nickname(username)
             
             parsed = {
                 'user_id': user_id,
                 'user_name': username,
-                'message_id': self._get_message_id(message),
-                'timestamp': self._get_message_timestamp(message),
+                'message_id': self._get_message_id(message, timestamp),
+                'timestamp': timestamp,
                 'raw_message': message
             }
             
-            # 根据消息类型解析内容
-            if hasattr(message, 'type'):
-                msg_type = message.type
-            else:
-                msg_type = 'text'  # 默认为文本消息
-                
-            if msg_type == 'text' or not hasattr(message, 'type'):
-                # 文本消息
-                content = str(message.content) if hasattr(message, 'content') else str(message)
-                
-                # 过滤系统提示消息
-                if self._is_system_message(content):
-                    logger.info(f"🚫 过滤系统消息: {content[:30]}{'...' if len(content) > 30 else ''}")
-                    return None
-                
-                parsed.update({
-                    'message_type': 'text',
-                    'content': content
-                })
-                
-            elif msg_type == 'image':
-                # 图片消息
-                image_path = self._save_image(message)
-                parsed.update({
-                    'message_type': 'image',
-                    'content': '[图片]',
-                    'image_path': image_path,
-                    'image_url': f'file://{image_path}' if image_path else None
-                })
-                
-            elif msg_type == 'file':
-                # 文件消息
-                file_path = self._save_file(message)
-                parsed.update({
-                    'message_type': 'file',
-                    'content': '[文件]',
-                    'file_path': file_path,
-                    'file_name': getattr(message, 'filename', 'unknown_file')
-                })
-                
-            elif msg_type == 'voice':
-                # 语音消息
-                if self.config_manager.get('message.enable_voice', False):
-                    voice_path = self._save_voice(message)
-                    parsed.update({
-                        'message_type': 'voice',
-                        'content': '[语音]',
-                        'voice_path': voice_path
-                    })
-                else:
-                    parsed.update({
-                        'message_type': 'text',
-                        'content': '[语音消息]'
-                    })
-                    
-            else:
-                # 其他类型消息
-                parsed.update({
-                    'message_type': 'text',
-                    'content': f'[{msg_type}消息]'
-                })
-                
-            return parsed
+            # 根据消息类型分派解析方法，未知类型按其他消息处理
+            msg_type = getattr(message, 'type', 'text')  # 默认为文本消息
+            handler = self._parsers.get(msg_type, self._parse_other)
+            return handler(parsed, message, now)
             
         except Exception as e:
-            logger.error(f"❌ 解析消息失败: {e}")
+            logger.error("❌ 解析消息失败: %s", e)
+            return None
+            
+    def _parse_text(self, parsed: Dict[str, Any], message, now: int) -> Optional[Dict[str, Any]]:
+        """解析文本消息，系统提示消息返回None"""
+        content = str(message.content) if hasattr(message, 'content') else str(message)
+        
+        # 过滤系统提示消息
+        if self._is_system_message(content):
+            logger.debug("🚫 过滤系统消息: %.30s", content)
             return None
             
-    def _save_image(self, message) -> Optional[str]:
+        parsed['message_type'] = 'text'
+        parsed['content'] = content
+        return parsed
+        
+    def _parse_image(self, parsed: Dict[str, Any], message, now: int) -> Dict[str, Any]:
+        """解析图片消息"""
+        image_path = self._save_image(message, now)
+        parsed.update({
+            'message_type': 'image',
+            'content': '[图片]',
+            'image_path': image_path,
+            'image_url': f'file://{image_path}' if image_path else None
+        })
+        return parsed
+        
+    def _parse_file(self, parsed: Dict[str, Any], message, now: int) -> Dict[str, Any]:
+        """解析文件消息"""
+        file_path = self._save_file(message, now)
+        parsed.update({
+            'message_type': 'file',
+            'content': '[文件]',
+            'file_path': file_path,
+            'file_name': getattr(message, 'filename', 'unknown_file')
+        })
+        return parsed
+        
+    def _parse_voice(self, parsed: Dict[str, Any], message, now: int) -> Dict[str, Any]:
+        """解析语音消息，未启用语音时转为文本提示"""
+        if self._enable_voice:
+            voice_path = self._save_voice(message, now)
+            parsed.update({
+                'message_type': 'voice',
+                'content': '[语音]',
+                'voice_path': voice_path
+            })
+        else:
+            parsed['message_type'] = 'text'
+            parsed['content'] = '[语音消息]'
+        return parsed
+        
+    def _parse_other(self, parsed: Dict[str, Any], message, now: int) -> Dict[str, Any]:
+        """解析其他类型消息"""
+        parsed['message_type'] = 'text'
+        parsed['content'] = f'[{message.type}消息]'
+        return parsed
+        
+    def _save_image(self, message, now: Optional[int] = None) -> Optional[str]:
         """保存图片
         
         Args:
             message: 消息对象
+            now: 当前时间戳（秒），用于生成文件名
             
         Returns:
             保存的图片路径
         """
         try:
-            if not self.config_manager.get('message.enable_image', True):
+            if not self._enable_image:
                 return None
                 
-            # 获取图片缓存目录
-            project_root = Path(__file__).parent.parent
-            cache_dir = project_root / self.config_manager.get('message.image_cache_dir', 'cache/images')
-            
             # 生成文件名
-            timestamp = int(time.time())
-            filename = f"image_{timestamp}.jpg"
-            file_path = cache_dir / filename
+            timestamp = now if now is not None else int(time.time())
+            filename = f"image_{timestamp}_{next(self._file_seq)}.jpg"
+            file_path = os.path.join(self.image_save_dir, filename)
             
             # 保存图片（这里需要根据wxauto的实际API调整）
             if hasattr(message, 'save_image'):
-                message.save_image(str(file_path))
-                return str(file_path)
+                message.save_image(file_path)
+                return file_path
             elif hasattr(message, 'image_path'):
                 # 如果消息已包含图片路径，直接返回
                 return message.image_path
@@ -495,74 +728,68 @@ class WeChatMonitor:
             return None
             
         except Exception as e:
-            logger.error(f"保存图片失败: {e}")
+            logger.error("保存图片失败: %s", e)
             return None
             
-    def _save_file(self, message) -> Optional[str]:
+    def _save_file(self, message, now: Optional[int] = None) -> Optional[str]:
         """保存文件
         
         Args:
             message: 消息对象
+            now: 当前时间戳（秒），用于生成文件名
             
         Returns:
             保存的文件路径
         """
         try:
-            if not self.config_manager.get('message.enable_file', True):
+            if not self._enable_file:
                 return None
                 
-            # 获取文件缓存目录
-            project_root = Path(__file__).parent.parent
-            cache_dir = project_root / self.config_manager.get('message.file_cache_dir', 'cache/files')
-            
             # 生成文件名
-            timestamp = int(time.time())
+            timestamp = now if now is not None else int(time.time())
             original_name = getattr(message, 'filename', f'file_{timestamp}')
-            file_path = cache_dir / f"{timestamp}_{original_name}"
+            file_path = os.path.join(self.file_save_dir, f"{timestamp}_{next(self._file_seq)}_{original_name}")
             
             # 保存文件（这里需要根据wxauto的实际API调整）
             if hasattr(message, 'save_file'):
-                message.save_file(str(file_path))
-                return str(file_path)
+                message.save_file(file_path)
+                return file_path
             elif hasattr(message, 'file_path'):
                 return message.file_path
                 
             return None
             
         except Exception as e:
-            logger.error(f"保存文件失败: {e}")
+            logger.error("保存文件失败: %s", e)
             return None
             
-    def _save_voice(self, message) -> Optional[str]:
+    def _save_voice(self, message, now: Optional[int] = None) -> Optional[str]:
         """保存语音
         
         Args:
             message: 消息对象
+            now: 当前时间戳（秒），用于生成文件名
             
         Returns:
             保存的语音路径
         """
         try:
-            # 获取文件缓存目录
-            project_root = Path(__file__).parent.parent
-            cache_dir = project_root / self.config_manager.get('message.file_cache_dir', 'cache/files')
-            
             # 生成文件名
-            timestamp = int(time.time())
-            filename = f"voice_{timestamp}.wav"
-            file_path = cache_dir / filename
+            timestamp = now if now is not None else int(time.time())
+            filename = f"voice_{timestamp}_{next(self._file_seq)}.wav"
+            file_path = os.path.join(self.voice_save_dir, filename)
             
             # 保存语音（这里需要根据wxauto的实际API调整）
             if hasattr(message, 'save_voice'):
-                message.save_voice(str(file_path))
-                return str(file_path)
+                message.save_voice(file_path)
+                return file_path
             elif hasattr(message, 'voice_path'):
                 return message.voice_path
                 
             return None
             
         except Exception as e:
-            logger.error(f"保存语音失败: {e}")
+            logger.error("保存语音失败: %s", e)
             return None
             
     def _is_recently_sent_message(self, content: str) -> bool:
@@ -575,22 +802,21 @@ class WeChatMonitor:
             是否是最近发送的消息
         """
         try:
-            current_time = time.time()
-            
-            # 清理过期的缓存
-            expired_keys = []
-            for cached_content, timestamp in self.sent_message_cache.items():
-                if current_time - timestamp > self.cache_expire_time:
-                    expired_keys.append(cached_content)
-                    
-            for key in expired_keys:
-                del self.sent_message_cache[key]
-                
-            # 检查是否是最近发送的消息
-            return content in self.sent_message_cache
+            current_time = time.monotonic_ns()
+            key = _hash64(content.encode('utf-8', 'surrogatepass'))
+            
+            with self._sent_cache_lock:
+                timestamp = self.sent_message_cache.get(key)
+                if timestamp is None:
+                    return False
+                # 只检查命中的条目是否过期，无需遍历整个缓存
+                if current_time - timestamp > self.cache_expire_ns:
+                    del self.sent_message_cache[key]
+                    return False
+                return True
             
         except Exception as e:
-            logger.error(f"检查消息缓存失败: {e}")
+            logger.error("检查消息缓存失败: %s", e)
             return False
             
     def _record_sent_message(self, content: str):
@@ -600,9 +826,20 @@ class WeChatMonitor:
             content: 消息内容
         """
         try:
-            self.sent_message_cache[content] = time.time()
+            current_time = time.monotonic_ns()
+            key = _hash64(content.encode('utf-8', 'surrogatepass'))
+            cache = self.sent_message_cache
+            with self._sent_cache_lock:
+                cache[key] = current_time
+                cache.move_to_end(key)
+                # 头部条目最旧：先淘汰已过期的，再按容量上限淘汰
+                while cache:
+                    oldest = next(iter(cache.values()))
+                    if current_time - oldest <= self.cache_expire_ns and len(cache) <= self.sent_cache_size:
+                        break
+                    cache.popitem(last=False)
         except Exception as e:
-            logger.error(f"⚠️  记录发送消息失败: {e}")
+            logger.error("⚠️  记录发送消息失败: %s", e)
             
     def _is_wxauto_debug_message(self, content: str) -> bool:
         """判断是否为wxauto库的调试消息
@@ -617,27 +854,11 @@ class WeChatMonitor:
             if not content or not content.strip():
                 return False
                 
-            content_clean = content.strip()
-            
-            # wxauto库调试消息特征
-            wxauto_debug_patterns = [
-                "[system base]",
-                "[time base]",
-                "[base消息]",
-                "获取到新消息：",
-                "以下为新消息",
-                "以上为历史消息"
-            ]
-            
             # 检查是否包含wxauto调试信息
-            for pattern in wxauto_debug_patterns:
-                if pattern in content_clean:
-                    return True
-                    
-            return False
+            return _match_wxauto_debug(content.strip()) is not None
             
         except Exception as e:
-            logger.error(f"⚠️  判断wxauto调试消息失败: {e}")
+            logger.error("⚠️  判断wxauto调试消息失败: %s", e)
             return False
     
     def _is_system_message(self, content: str) -> bool:
@@ -656,87 +877,28 @@ class WeChatMonitor:
             content_clean = content.strip()
             content_lower = content_clean.lower()
             
-            # 调试输出
-            logger.info(f"🔍 检查消息是否为系统消息: '{content_clean[:50]}{'...' if len(content_clean) > 50 else ''}'")
-            
-            # 系统消息关键词列表 - 使用更严格的匹配
-            system_keywords = [
-                "以下为新消息",
-                "以上为历史消息", 
-                "消息记录",
-                "聊天记录", 
-                "历史消息",
-                "系统消息",
-                "新消息",
-                "--- 以上为历史消息 ---",
-                "--- 以下为新消息 ---",
-                "撤回了一条消息",
-                "撤回了消息",
-                "withdrew a message",
-                "base消息",
-                "消息提醒",
-                "系统提示",
-                "消息通知"
-            ]
-            
-            # 检查系统消息关键词 - 精确匹配和包含匹配
-            for keyword in system_keywords:
-                if keyword.lower() in content_lower:
-                    logger.info(f"🚫 匹配到系统消息关键词: '{keyword}'")
-                    return True
+            # 检查系统消息关键词 - 一次扫描匹配全部关键词
+            keyword = _match_system_keyword(content_lower)
+            if keyword is not None:
+                logger.debug("🚫 匹配到系统消息关键词: '%s'", keyword)
+                return True
             
-            # 更严格的正则表达式匹配
-            import re
-            
-            # 匹配各种括号格式的消息
-            bracket_patterns = [
-                r'^\s*\[.*base.*\]\s*$',  # [任何内容base任何内容]
-                r'^\s*\[.*消息.*\]\s*$',  # [任何内容消息任何内容]
-                r'^\s*\[.*提示.*\]\s*$',  # [任何内容提示任何内容]
-                r'^\s*\[.*通知.*\]\s*$',  # [任何内容通知任何内容]
-                r'^\s*\[.*记录.*\]\s*$',  # [任何内容记录任何内容]
-                r'^\s*\[.*历史.*\]\s*$',  # [任何内容历史任何内容]
-                r'^\s*\[.*系统.*\]\s*$',  # [任何内容系统任何内容]
-                r'^\s*\[[^\]]{1,20}\]\s*$',  # 短的纯括号消息
-                r'^\s*\[.*\]\s*\.{3,}\s*$',  # [任何内容]...
-                r'^\s*\[.*\]\s*…+\s*$',  # [任何内容]…
-            ]
-            
-            for pattern in bracket_patterns:
-                if re.search(pattern, content_clean, re.IGNORECASE | re.MULTILINE):
-                    logger.info(f"🚫 匹配到括号格式系统消息: 模式 '{pattern}'")
+            # 普通消息的首字符不会是括号或符号，直接跳过形状匹配
+            if content_clean[0] in _SYSTEM_FIRST_CHARS:
+                # 匹配各种括号格式的消息
+                if _BRACKET_RE.search(content_clean):
+                    logger.debug("🚫 匹配到括号格式系统消息: '%.30s'", content_clean)
                     return True
-            
-            # 匹配纯符号和省略号消息
-            symbol_patterns = [
-                r'^\s*\.{3,}\s*$',  # 纯省略号
-                r'^\s*…+\s*$',  # 纯中文省略号
-                r'^\s*[-=*_]{3,}\s*$',  # 纯分隔符
-                r'^\s*[。]{3,}\s*$',  # 纯中文句号
-                r'^\s*[\s\.…。\-=*_]+\s*$',  # 只包含空格和符号
-            ]
-            
-            for pattern in symbol_patterns:
-                if re.match(pattern, content_clean):
-                    logger.info(f"🚫 匹配到符号格式系统消息: 模式 '{pattern}'")
+                
+                # 匹配纯符号和省略号消息
+                if _SYMBOL_RE.match(content_clean):
+                    logger.debug("🚫 匹配到符号格式系统消息")
                     return True
             
-            # 检查是否包含"新消息"、"历史"等关键词的短消息
-            short_system_patterns = [
-                r'.*新消息.*',
-                r'.*历史.*消息.*',
-                r'.*消息.*记录.*',
-                r'.*以下.*消息.*',
-                r'.*以上.*消息.*',
-                r'.*base.*',
-            ]
-            
             # 对于短消息（少于20个字符）进行更严格的检查
-            if len(content_clean) < 20:
-                for pattern in short_system_patterns:
-                    if re.search(pattern, content_lower):
-                        logger.info(f"🚫 匹配到短系统消息: 模式 '{pattern}'")
-                        return True
+            if len(content_clean) < 20 and _SHORT_SYSTEM_RE.search(content_lower):
+                logger.debug("🚫 匹配到短系统消息: '%s'", content_clean)
+                return True
             
             # 注释掉纯数字和短纯字母的过滤，只保留真正的系统消息过滤
             # if re.match(r'^\s*[0-9]+\s*$', content_clean):  # 纯数字
@@ -747,11 +909,10 @@ class WeChatMonitor:
             #     print(f"🚫 匹配到短纯字母消息")
             #     return True
             
-            logger.info(f"✅ 消息通过系统消息过滤")
             return False
             
         except Exception as e:
-            logger.error(f"⚠️  判断系统消息失败: {e}")
+            logger.error("⚠️  判断系统消息失败: %s", e)
             return False
             
     def send_message(self, username: str, content: str, msg_type: str = 'text') -> bool:
@@ -766,7 +927,7 @@ class WeChatMonitor:
             是否发送成功
         """
         try:
-            if not self.wechat or not self.running:
+            if not self.wechat or not self._running:
                 logger.warning("⚠️  微信监听器未运行")
                 return False
                 
@@ -788,7 +949,8 @@ class WeChatMonitor:
                 self.wechat.SendFiles(content, who=username)
             elif msg_type == 'voice':
                 # 语音消息记录标准化内容
-                if self.config_manager.get('message.enable_voice', False):
+                self._ensure_config_snapshot()
+                if self._enable_voice:
                     self._record_sent_message('[语音]')
                 else:
                     self._record_sent_message('[语音消息]')
@@ -799,11 +961,11 @@ class WeChatMonitor:
                 self._record_sent_message(content)
                 self.wechat.SendMsg(content, who=username)
                 
-            logger.info(f"✅ 发送至 {username}: {content[:30]}{'...' if len(content) > 30 else ''}")
+            logger.debug("✅ 发送至 %s: %.30s", username, content)
             return True
             
         except Exception as e:
-            logger.error(f"❌ 发送消息失败: {e}")
+            logger.error("❌ 发送消息失败: %s", e)
             return False
             
     def send_image(self, username: str, image_path: str) -> bool:
@@ -840,13 +1002,24 @@ class WeChatMonitor:
             if not self.wechat:
                 return []
                 
+            now = time.monotonic()
+            cached_at, names = self._friends_cache
+            if names is not None and now - cached_at < self._friends_ttl:
+                return list(names)
+                
             # 获取好友列表（这里需要根据wxauto的实际API调整）
             if hasattr(self.wechat, 'GetAllFriends'):
                 friends = self.wechat.GetAllFriends()
-                return [friend.name for friend in friends if hasattr(friend, 'name')]
+                names = [friend.name for friend in friends if hasattr(friend, 'name')]
+                self._friends_cache = (now, names)
+                return list(names)
             else:
                 return []
                 
         except Exception as e:
-            logger.error(f"获取好友列表失败: {e}")
-            return []
\ No newline at end of file
+            logger.error("获取好友列表失败: %s", e)
+            return []
+            
+    def refresh_user_list(self):
+        """使好友列表缓存失效，下一次获取时重新读取"""
+        self._friends_cache = (0.0, None)
\ No newline at end of file
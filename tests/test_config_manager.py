@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置管理模块测试
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from config_manager import ConfigManager
+
+
+def test_get_sees_in_place_nested_changes(tmp_path):
+    """原地修改get()返回的嵌套字典后，点号键查询读到的是新值"""
+    config_manager = ConfigManager(str(tmp_path / 'config.json'))
+    assert config_manager.get('wechat.enabled') is False
+    
+    config_manager.get('wechat')['enabled'] = True
+    
+    assert config_manager.get('wechat.enabled') is True
+
+
+def test_get_missing_key_returns_default(tmp_path):
+    """不存在的键与穿过非字典值的键都返回默认值"""
+    config_manager = ConfigManager(str(tmp_path / 'config.json'))
+    assert config_manager.get('nope.key', 5) == 5
+    assert config_manager.get('webui.port.extra', 7) == 7
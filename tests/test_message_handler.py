@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+消息回复处理模块测试
+"""
+
+import os
+import sys
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from config_manager import ConfigManager
+from message_handler import MessageHandler
+
+
+class _FakeResponse:
+    """按URL返回固定内容的HTTP响应"""
+    
+    def __init__(self, body: bytes):
+        self.body = body
+        self.headers = {}
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        return False
+        
+    def raise_for_status(self):
+        pass
+        
+    def iter_content(self, chunk_size=65536):
+        # 分两次写入，放大并发下载写同一路径时的交错
+        half = len(self.body) // 2
+        yield self.body[:half]
+        time.sleep(0.05)
+        yield self.body[half:]
+
+
+class _FakeSession:
+    """替代requests.Session，按URL返回预设内容"""
+    
+    def __init__(self, bodies):
+        self.bodies = bodies
+        
+    def get(self, url, **kwargs):
+        return _FakeResponse(self.bodies[url])
+        
+    def close(self):
+        pass
+
+
+class _FakeMonitor:
+    """替代WechatMonitor，记录发送调用"""
+    
+    def __init__(self, results=()):
+        self.sent = []
+        # 依次作为send_message的返回值，用完后一律成功
+        self.results = list(results)
+        
+    def send_message(self, who, content, msg_type='text'):
+        self.sent.append(('message', who, content))
+        return self.results.pop(0) if self.results else True
+        
+    def send_file(self, who, file_path):
+        self.sent.append(('file', who, file_path))
+        return True
+        
+    def send_image(self, who, image_path):
+        self.sent.append(('image', who, image_path))
+        return True
+
+
+def _make_handler(tmp_path) -> MessageHandler:
+    config_manager = ConfigManager(str(tmp_path / 'config.json'))
+    config_manager.set('message.file_cache_dir', str(tmp_path / 'downloads'))
+    converter = types.SimpleNamespace(self_id='10001000')
+    return MessageHandler(config_manager, None, converter, None)
+
+
+def test_prefetch_same_basename_downloads_to_distinct_files(tmp_path):
+    """末段相同的不同URL在同一批次中预取时，不能写入同一个文件"""
+    url_a = 'https://cdn-a.example.com/files/download?fileid=1'
+    url_b = 'https://cdn-b.example.com/other/download?fileid=2'
+    bodies = {url_a: b'A' * 4096, url_b: b'B' * 4096}
+    
+    handler = _make_handler(tmp_path)
+    handler._http = _FakeSession(bodies)
+    handler._dl_pool = ThreadPoolExecutor(max_workers=2)
+    try:
+        batch = [
+            {
+                'action': 'send_private_msg',
+                'params': {
+                    'user_id': '1',
+                    'message': [{'type': 'image', 'data': {'file': url}}],
+                },
+            }
+            for url in (url_a, url_b)
+        ]
+        handler._prefetch_batch(batch)
+        
+        path_a = handler._resolve_file(url_a)
+        path_b = handler._resolve_file(url_b)
+    finally:
+        handler._dl_pool.shutdown(wait=True)
+        
+    assert path_a and path_b
+    assert path_a != path_b
+    assert Path(path_a).read_bytes() == bodies[url_a]
+    assert Path(path_b).read_bytes() == bodies[url_b]
+
+
+def test_downloaded_file_keeps_original_name(tmp_path):
+    """发送给微信的文件路径保留URL中的原始文件名"""
+    url = 'https://cdn.example.com/files/%E6%8A%A5%E5%91%8A.pdf?token=abc'
+    handler = _make_handler(tmp_path)
+    handler._http = _FakeSession({url: b'%PDF-1.4'})
+    handler.wechat_monitor = _FakeMonitor()
+    
+    assert handler._send_to_wechat('张三', {'message_type': 'file', 'files': [url]})
+    
+    kind, who, file_path = handler.wechat_monitor.sent[0]
+    assert (kind, who) == ('file', '张三')
+    assert Path(file_path).name == '报告.pdf'
+    assert Path(file_path).read_bytes() == b'%PDF-1.4'
+
+
+def test_cleanup_removes_expired_downloads(tmp_path):
+    """过期的下载目录由_cleanup_cache删除，未过期的保留"""
+    url = 'https://cdn.example.com/a.png'
+    handler = _make_handler(tmp_path)
+    handler._http = _FakeSession({url: b'png'})
+    
+    old_path = Path(handler._download_file(url))
+    new_path = Path(handler._download_file(url))
+    expired = time.time() - handler._download_ttl - 60
+    os.utime(old_path.parent, (expired, expired))
+    
+    handler.last_cleanup -= handler.cache_cleanup_interval
+    handler._cleanup_cache()
+    
+    assert not old_path.parent.exists()
+    assert new_path.read_bytes() == b'png'
+
+
+class _TruncatedRaw:
+    """只返回部分数据后就结束的原始响应流，模拟连接中途断开"""
+    
+    def __init__(self, body: bytes):
+        self.body = body
+        
+    def readinto(self, buf):
+        n = min(len(buf), len(self.body))
+        buf[:n] = self.body[:n]
+        self.body = self.body[n:]
+        return n
+
+
+def test_truncated_download_is_reported_as_failure(tmp_path):
+    """收到的数据少于Content-Length时下载失败，且不留下残缺文件"""
+    url = 'https://cdn.example.com/a.png'
+    response = _FakeResponse(b'')
+    response.headers = {'Content-Length': '4096'}
+    response.raw = _TruncatedRaw(b'x' * 1000)
+    
+    handler = _make_handler(tmp_path)
+    handler._http = types.SimpleNamespace(get=lambda url, **kwargs: response)
+    
+    assert handler._download_file(url) is None
+    assert not any(p.is_file() for p in handler.download_cache_dir.rglob('*'))
+
+
+class _FakeWebSocket:
+    """替代WebSocketClient，记录API响应"""
+    
+    def __init__(self):
+        self.responses = []
+        
+    def send_api_response(self, echo, data=None, retcode=0, status='ok'):
+        self.responses.append((echo, data, retcode))
+
+
+def _make_send_handler(tmp_path, results=()) -> MessageHandler:
+    handler = _make_handler(tmp_path)
+    handler.onebot_converter.onebot_to_wechat = lambda msg: {
+        'content': ''.join(seg['data'].get('text', '') for seg in msg['message']),
+        'message_type': 'text',
+    }
+    handler.wechat_monitor = _FakeMonitor(results)
+    handler.websocket_client = _FakeWebSocket()
+    return handler
+
+
+def _send(handler, echo, text='你好'):
+    handler._handle_send_private_msg({'user_id': '张三', 'message': text}, echo)
+    return handler.websocket_client.responses[-1]
+
+
+def test_duplicate_send_is_suppressed(tmp_path):
+    """去重窗口内的相同发送不再驱动微信，返回第一次的message_id"""
+    handler = _make_send_handler(tmp_path)
+    
+    _, first, first_code = _send(handler, 'e1')
+    _, second, second_code = _send(handler, 'e2')
+    _, other, _ = _send(handler, 'e3', text='不同的内容')
+    
+    assert first_code == second_code == 0
+    assert second == first
+    assert other is not None
+    assert handler.wechat_monitor.sent == [
+        ('message', '张三', '你好'),
+        ('message', '张三', '不同的内容'),
+    ]
+
+
+def test_failed_send_is_not_deduplicated(tmp_path):
+    """发送失败不记录去重，重试时会再次发送"""
+    handler = _make_send_handler(tmp_path, results=[False])
+    
+    _, _, failed_code = _send(handler, 'e1')
+    _, retried, retried_code = _send(handler, 'e2')
+    
+    assert failed_code == 1500
+    assert retried_code == 0 and retried is not None
+    assert len(handler.wechat_monitor.sent) == 2
+
+
+def test_send_after_dedupe_ttl_is_delivered(tmp_path):
+    """超过去重窗口后相同内容会再次发送"""
+    handler = _make_send_handler(tmp_path)
+    handler._send_dedupe_ttl = 0.05
+    
+    _send(handler, 'e1')
+    time.sleep(0.1)
+    _, _, retcode = _send(handler, 'e2')
+    
+    assert retcode == 0
+    assert len(handler.wechat_monitor.sent) == 2
+    assert len(handler._send_dedupe) == 1